@@ -0,0 +1,147 @@
+# animation.py
+import pygame
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def linear(progress):
+    return progress
+
+
+def stepped(steps, easing=linear):
+    """`easing` rounded to `steps` equal steps, so a tween takes the same values every time it plays"""
+    def ease(progress):
+        return round(easing(progress) * steps) / steps
+    return ease
+
+
+class Animation:
+    """Something that plays over time. `advance(dt)` moves it on by `dt` milliseconds and returns the
+    time left over once it has finished, or None while it is still running."""
+
+    done = False
+
+    def advance(self, dt):
+        raise NotImplementedError
+
+    def finish(self):
+        """Jump to the end, as if enough time had passed"""
+        raise NotImplementedError
+
+
+class Tween(Animation):
+    """Calls `update(value)` with a value going from `start` to `end` over `duration` milliseconds"""
+
+    def __init__(self, duration, update, start=0.0, end=1.0, easing=linear):
+        self.duration = duration
+        self.update = update
+        self.start = start
+        self.end = end
+        self.easing = easing
+        self.elapsed = 0
+
+    def value(self, progress):
+        return self.start + (self.end - self.start) * self.easing(progress)
+
+    def advance(self, dt):
+        if self.done:
+            return dt
+        self.elapsed += dt
+        progress = min(self.elapsed / self.duration, 1.0) if self.duration > 0 else 1.0
+        self.update(self.value(progress))
+        if progress < 1.0:
+            return None
+        self.done = True
+        return max(self.elapsed - self.duration, 0)
+
+    def finish(self):
+        if not self.done:
+            self.advance(max(self.duration - self.elapsed, 0))
+
+
+class Call(Animation):
+    """Calls `function()` once, taking no time. Used to chain actions onto the end of a Sequence."""
+
+    def __init__(self, function):
+        self.function = function
+
+    def advance(self, dt):
+        if not self.done:
+            self.done = True
+            self.function()
+        return dt
+
+    def finish(self):
+        self.advance(0)
+
+
+class Sequence(Animation):
+    """Plays animations one after another, time left over by one carrying into the next"""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.index = 0
+
+    def advance(self, dt):
+        while self.index < len(self.steps):
+            dt = self.steps[self.index].advance(dt)
+            if dt is None:
+                return None
+            self.index += 1
+        self.done = True
+        return dt
+
+    def finish(self):
+        while self.index < len(self.steps):
+            self.steps[self.index].finish()
+            self.index += 1
+        self.done = True
+
+
+class Timeline:
+    """The animations running in the interface, advanced once per frame of the main loop.
+
+    Each animation plays under a key (usually the layer it moves). Animations under different keys
+    overlap; playing a new one under a key that is busy interrupts the old one where it is, so a tap
+    during an animation is handled on the next frame instead of after it. Each animation is advanced
+    by the time since it was last advanced, so one started after the loop has been idle doesn't jump.
+    """
+
+    def __init__(self, clock=pygame.time.get_ticks):
+        self.clock = clock
+        self.animations = {}
+
+    def play(self, key, animation):
+        self.animations[key] = [animation, self.clock()]
+        return animation
+
+    def stop(self, key, finish=False):
+        """Stop the animation under `key`, jumping it to its end first if `finish`"""
+        entry = self.animations.pop(key, None)
+        if entry is not None and finish:
+            entry[0].finish()
+
+    def get(self, key):
+        """The animation playing under `key`, or None"""
+        entry = self.animations.get(key)
+        return entry[0] if entry is not None else None
+
+    def running(self, key=None):
+        return key in self.animations if key is not None else bool(self.animations)
+
+    def update(self):
+        now = self.clock()
+        for key, entry in list(self.animations.items()):
+            if self.animations.get(key) is not entry:
+                # Replaced or stopped by an animation that finished earlier in this update
+                continue
+            animation, last = entry
+            entry[1] = now
+            try:
+                finished = animation.advance(now - last) is not None
+            except Exception:
+                logger.exception(f'Error in animation {key}')
+                finished = True
+            if finished and self.animations.get(key) is entry:
+                del self.animations[key]
@@ -4,15 +4,21 @@ import base64
 import streamlit as st
 from dotenv import set_key
 import assist
-import shutil
-import datetime
 import requests
 from openai import OpenAI
 from PIL import Image
 from io import BytesIO
 
+# Pick up settings changed by the kiosk (or by hand) since the last rerun
+from settings import registry
+registry.poll()
+
 from settings import *
 from helpers import *
+from history import get_history
+from menus import get_menus
+from menu_index import bit_count, iter_bits
+from measurements import format_measurement, parse_measurement
 
 # Import your controller module
 import controller
@@ -38,14 +44,8 @@ if 'selected_cocktail' not in st.session_state:
 
 
 saved_config = load_saved_config()
-# Load the cocktails from file
-cocktail_data = {}
-if os.path.exists(COCKTAILS_FILE):
-    try:
-        with open(COCKTAILS_FILE, 'r') as f:
-            cocktail_data = json.load(f)
-    except Exception as e:
-        st.error(f'Error loading cocktails: {e}')
+# The catalog keeps the cocktails in memory between reruns and only re-reads the file when it changes
+cocktail_data = load_cocktails()
 
 
 # ---------- Tabs ----------
@@ -86,6 +86,23 @@ with tabs[0]:
                 value=get_default(pump_name)
             )
 
+    # What the current menu can pour with the pumps as entered above
+    coverage = get_menu_coverage(pump_inputs.values())
+    menu_index = get_catalog().menu_index()
+    if menu_index.cocktails:
+        st.markdown(
+            f'<p style="text-align: center;">{bit_count(coverage.makeable)} of {len(menu_index.cocktails)} drinks on the menu can be made with these pumps.</p>',
+            unsafe_allow_html=True
+        )
+        near_misses = [
+            f"{cocktail['normal_name']} (needs {coverage.missing_by_cocktail[position]})"
+            for position, cocktail in zip(iter_bits(coverage.near_misses), menu_index.select(coverage.near_misses))
+        ]
+        if near_misses:
+            st.caption(f"One ingredient away: {', '.join(near_misses[:10])}")
+        if coverage.unlocks:
+            st.caption('Add to unlock the most drinks: ' + ', '.join(f'{ingredient} (+{count})' for ingredient, count in coverage.unlocks[:5]))
+
     st.markdown('<h3 style="text-align: center;">Requests for the bartender</h3>', unsafe_allow_html=True)
     bartender_requests = st.text_area('Enter any special requests for the bartender', height=100)
     clear_cocktails = st.checkbox('Remove existing cocktails from the menu')
@@ -123,18 +140,13 @@ with tabs[0]:
                 'action': 'refresh_cocktails',
                 'timestamp': time.time()
             }
-            with open('interface_signal.json', 'w') as f:
-                json.dump(refresh_signal, f)
+            atomic_write_json('interface_signal.json', refresh_signal)
             st.info('Interface refresh signal sent!')
         except Exception as e:
             st.warning(f'Could not send refresh signal to interface: {e}')
 
-        timestamp = datetime.datetime.now().isoformat().replace(':', '-').split('.')[0]
-        hist_dir = f'history/{timestamp}'
-        os.makedirs(hist_dir, exist_ok=True)
-        shutil.copy('pump_config.json', f'{hist_dir}/pump_config.json')
-        shutil.copy('cocktails.json', f'{hist_dir}/cocktails.json')
-        shutil.copytree('drink_logos', f'{hist_dir}/drink_logos')
+        # Only logos that changed since the last snapshot are stored, on a background thread
+        get_history().snapshot_async(cocktails=load_cocktails() if COCKTAILS_DB else None)
 
 
 # ================ TAB 2: Settings ================
@@ -160,6 +172,17 @@ with tabs[1]:
         except Exception as e:
             st.error(f'Error cleaning pumps: {e}')
 
+    st.subheader('Pump Tuning')
+    oz_coefficient = st.number_input('Seconds per oz', min_value=1.0, max_value=60.0, value=float(OZ_COEFFICIENT), step=0.5)
+    invert_pump_pins = st.checkbox('Reverse pump direction', value=INVERT_PUMP_PINS)
+    if st.button('Save Pump Tuning'):
+        try:
+            registry.set('OZ_COEFFICIENT', oz_coefficient)
+            registry.set('INVERT_PUMP_PINS', invert_pump_pins)
+            st.success('Pump tuning saved. The interface picks it up without a restart.')
+        except Exception as e:
+            st.error(f'Error saving pump tuning: {e}')
+
     # NEW: Refresh Interface
     st.subheader('Interface Control')
     if st.button('Refresh Interface'):
@@ -171,8 +194,7 @@ with tabs[1]:
                 'action': 'refresh_cocktails',
                 'timestamp': time.time()
             }
-            with open('interface_signal.json', 'w') as f:
-                json.dump(refresh_signal, f)
+            atomic_write_json('interface_signal.json', refresh_signal)
             st.success('Interface refresh signal sent!')
         except Exception as e:
             st.error(f'Error sending refresh signal: {e}')
@@ -180,38 +202,41 @@ with tabs[1]:
 # ================ TAB 3: Cocktail Menu ================
 with tabs[2]:
     st.title('History')
-    if not os.path.exists('history') or not os.listdir('history'):
+    menu_history = get_history()
+    history_page, history_pages = menu_history.page(st.session_state.get('history_page', 1) - 1)
+    if not history_page:
         st.info('No historical menus yet.')
     else:
-        hist_dirs = sorted([d for d in os.listdir('history') if os.path.isdir(os.path.join('history', d))], reverse=True)
-        for hist_dir in hist_dirs:
+        for entry in history_page:
+            hist_dir = entry['name']
             try:
-                with open(f'history/{hist_dir}/cocktails.json', 'r') as f:
-                    cocktails = json.load(f)
-                drink_names = ', '.join([c['normal_name'] for c in cocktails.get('cocktails', [])])
-                with open(f'history/{hist_dir}/pump_config.json', 'r') as f:
-                    pump_config = json.load(f)
-                config_str = ', '.join([f"{k}: {v}" for k,v in pump_config.items()])
+                drink_names = ', '.join(entry['drinks'])
+                config_str = ', '.join([f"{k}: {v}" for k,v in entry['pump_config'].items()])
                 st.subheader(f"{hist_dir}: {drink_names}")
+                thumbnail = menu_history.thumbnail_path(entry)
+                if thumbnail and os.path.exists(thumbnail):
+                    st.image(thumbnail, width=96)
                 st.text(config_str)
                 if st.button('Reload Cocktail Menu', key=f'reload_{hist_dir}'):
-                    shutil.copy(f'history/{hist_dir}/pump_config.json', 'pump_config.json')
-                    shutil.copy(f'history/{hist_dir}/cocktails.json', 'cocktails.json')
-                    if os.path.exists('drink_logos'):
-                        shutil.rmtree('drink_logos')
-                    shutil.copytree(f'history/{hist_dir}/drink_logos', 'drink_logos')
+                    # Build the menu aside, then switch to it in one step
+                    menus = get_menus()
+                    menus.activate(menus.create(lambda folder: menu_history.export(hist_dir, folder)))
+                    if COCKTAILS_DB:
+                        with open(os.path.join(HISTORY_FOLDER, hist_dir, 'cocktails.json'), 'r') as f:
+                            save_cocktails(json.load(f), append=False)
                     import time
                     refresh_signal = {
                         'action': 'refresh_cocktails',
                         'timestamp': time.time()
                     }
-                    with open('interface_signal.json', 'w') as f:
-                        json.dump(refresh_signal, f)
+                    atomic_write_json('interface_signal.json', refresh_signal)
                     st.success('Menu reloaded from history!')
                     st.rerun()
             except Exception as e:
                 st.error(f'Error loading {hist_dir}: {e}')
 
+        if history_pages > 1:
+            st.number_input(f'Page (of {history_pages})', min_value=1, max_value=history_pages, key='history_page')
 
 with tabs[3]:
     st.markdown('<h1 style="text-align: center;">Cocktail Menu</h1>', unsafe_allow_html=True)
@@ -250,22 +275,21 @@ with tabs[3]:
             st.markdown('<h2 style="text-align: center;">Recipe</h2>', unsafe_allow_html=True)
             recipe_adjustments = {}
             for ingredient, measurement in selected_cocktail.get('ingredients', {}).items():
-                parts = measurement.split()
-                try:
-                    default_value = float(parts[0])
-                    unit = ' '.join(parts[1:]) if len(parts) > 1 else ''
-                except:
-                    default_value = 1.0
-                    unit = measurement
+                parsed = parse_measurement(measurement)
+                if parsed.amount is None:
+                    # Nothing to scale, e.g. "to taste"
+                    st.text(f'{ingredient} ({measurement})')
+                    recipe_adjustments[ingredient] = measurement
+                    continue
 
                 value = st.slider(
                     f'{ingredient} ({measurement})',
                     min_value=0.0,
-                    max_value=default_value * 4,
-                    value=default_value,
+                    max_value=max(parsed.amount * 4, 1.0),
+                    value=parsed.amount,
                     step=0.1,
                 )
-                recipe_adjustments[ingredient] = f'{value} {unit}'.strip()
+                recipe_adjustments[ingredient] = format_measurement(parsed, value)
 
             st.markdown('<h3 style="text-align: center;"><strong>Adjusted Recipe</strong></h3>', unsafe_allow_html=True)
             st.json(recipe_adjustments)
@@ -273,20 +297,9 @@ with tabs[3]:
             cols = st.columns([1, 1])
             with cols[0]:
                 if st.button('Save Recipe'):
-                    updated = False
-                    # Overwrite the JSON with new measurements
-                    for idx, cktl in enumerate(cocktail_data.get('cocktails', [])):
-                        if get_safe_name(cktl.get('normal_name', '')) == safe_name:
-                            cocktail_data['cocktails'][idx]['ingredients'] = recipe_adjustments
-                            updated = True
-                            break
-                    if updated:
-                        try:
-                            with open(COCKTAILS_FILE, 'w') as f:
-                                json.dump(cocktail_data, f, indent=2)
-                            st.success('Recipe saved!')
-                        except Exception as e:
-                            st.error(f'Error saving recipe: {e}')
+                    # Only the selected recipe is written, not the whole menu
+                    if update_recipe(selected_cocktail.get('normal_name', ''), recipe_adjustments):
+                        st.success('Recipe saved!')
                     else:
                         st.error('Failed to update recipe.')
 
@@ -299,8 +312,7 @@ with tabs[3]:
                     # so we can pass it directly.
                     try:
                         executor_watcher = controller.make_drink(selected_cocktail, single_or_double='single')
-                        while not executor_watcher.done():
-                            pass
+                        executor_watcher.wait()
                         note.empty()
                     except Exception as e:
                         st.error(f'Error while pouring: {e}')
@@ -343,8 +355,7 @@ with tabs[3]:
                         note = st.info(f'Pouring a single serving of {normal_name} ...')
                         try:
                             executor_watcher = controller.make_drink(cocktail, single_or_double='single')
-                            while not executor_watcher.done():
-                                pass
+                            executor_watcher.wait()
                             note.empty()
                         except Exception as e:
                             st.error(f'Error while pouring: {e}')
@@ -377,7 +388,7 @@ with tabs[4]:
             recipe['ingredients'][ingredient] = f'{value} oz'.strip()
 
     if st.button('Save') and recipe['normal_name'] and len(recipe['ingredients']) > 0:
-        if recipe['normal_name'] not in list(map(lambda x: x['normal_name'], cocktail_data['cocktails'])):
+        if get_catalog().get(recipe['normal_name']) is None:
             api_key = st.session_state.get('openai_api_key') or OPENAI_API_KEY
             generate_image(recipe['normal_name'], False, recipe['ingredients'], api_key=api_key)
             save_cocktails({'cocktails': [recipe]})
@@ -389,8 +400,7 @@ with tabs[4]:
                     'action': 'refresh_cocktails',
                     'timestamp': time.time()
                 }
-                with open('interface_signal.json', 'w') as f:
-                    json.dump(refresh_signal, f)
+                atomic_write_json('interface_signal.json', refresh_signal)
                 st.success('Cocktail saved and interface refresh signal sent!')
             except Exception as e:
                 st.warning(f'Cocktail saved but could not send refresh signal: {e}')
@@ -471,8 +481,8 @@ with tabs[5]:
             if selected_name and st.button('Confirm update'):
                 selected_cocktail = cocktail_options_dict[selected_name]
                 image_path = get_cocktail_image_path(selected_cocktail)
-                with open(image_path, 'wb') as f:
-                    f.write(st.session_state.temp_image_data)
+                image_data = st.session_state.temp_image_data
+                atomic_write(image_path, lambda f: f.write(image_data), mode='wb')
                 st.success(f'Image updated for {selected_name}!')
                 # Send refresh signal
                 try:
@@ -481,8 +491,7 @@ with tabs[5]:
                         'action': 'refresh_cocktails',
                         'timestamp': time.time()
                     }
-                    with open('interface_signal.json', 'w') as f:
-                        json.dump(refresh_signal, f)
+                    atomic_write_json('interface_signal.json', refresh_signal)
                     st.info('Interface refresh signal sent!')
                 except Exception as e:
                     st.warning(f'Could not send refresh signal: {e}')
@@ -0,0 +1,165 @@
+# assets.py
+import json
+import mmap
+import os
+import threading
+
+import pygame
+
+import settings
+from atomic_file import atomic_write, file_hash
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+HASHES_FILE = '.hashes.jsonl'
+
+
+class AssetCache:
+    """Images converted to the display's pixel format, baked to disk at the size they are shown.
+
+    Decoding a PNG and scaling it is by far the slowest part of loading an image, so the scaled pixels
+    are written to `folder` as a raw buffer named after the source file's hash and the target size.
+    The next boot memory-maps that buffer and converts it straight to the display format instead.
+    Source hashes are kept in `folder` by the file's inode, mtime and size, so a file is only read
+    again to hash it when that changes. Baked files for images that changed or sizes no longer used
+    are pruned, oldest first, once the folder grows past `max_bytes`.
+    """
+
+    def __init__(self, folder, max_bytes=256 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        # Absolute path -> (inode, mtime, size) and the hash at that signature, loaded on first use
+        self.hashes = None
+        self.lock = threading.Lock()
+
+    def load_hashes(self):
+        """Read the hashes file, newest line last. Lines are only appended, so it is rewritten without the
+        superseded ones once they make up most of it."""
+        hashes = {}
+        lines = 0
+        try:
+            with open(os.path.join(self.folder, HASHES_FILE), 'r') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        path, signature, digest = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash mid-append
+                        continue
+                    hashes[path] = (tuple(signature), digest)
+        except OSError:
+            return hashes
+        if lines > 2 * len(hashes) + 100:
+            try:
+                atomic_write(os.path.join(self.folder, HASHES_FILE), lambda f: f.writelines(
+                    json.dumps([path, signature, digest]) + '\n' for path, (signature, digest) in hashes.items()
+                ), durable=False)
+            except OSError:
+                logger.exception('Error compacting the asset hashes')
+        return hashes
+
+    def source_hash(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if self.hashes is None:
+                self.hashes = self.load_hashes()
+            cached = self.hashes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        digest = file_hash(path)
+        with self.lock:
+            self.hashes[path] = (signature, digest)
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                with open(os.path.join(self.folder, HASHES_FILE), 'a') as f:
+                    f.write(json.dumps([path, signature, digest]) + '\n')
+            except OSError:
+                logger.exception(f'Error saving the hash of {path}')
+        return digest
+
+    def baked_path(self, digest, size, alpha):
+        return os.path.join(self.folder, f'{digest}-{size[0]}x{size[1]}.{"rgba" if alpha else "rgbx"}')
+
+    def load(self, path, size=None, alpha=True):
+        """Load `path` scaled to `size` (its own size if None) in the display's pixel format"""
+        if size is None:
+            return to_display_format(pygame.image.load(path), alpha)
+        size = (int(size[0]), int(size[1]))
+        if not self.folder:
+            return to_display_format(pygame.transform.scale(pygame.image.load(path), size), alpha)
+        baked_path = self.baked_path(self.source_hash(path), size, alpha)
+        surface = self.read_baked(baked_path, size, alpha)
+        if surface is None:
+            surface = to_display_format(pygame.transform.scale(pygame.image.load(path), size), alpha)
+            self.bake(baked_path, surface, alpha)
+        return surface
+
+    def read_baked(self, baked_path, size, alpha):
+        try:
+            with open(baked_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size != size[0] * size[1] * 4:
+                    logger.warning(f'Ignoring truncated baked image {baked_path}')
+                    return None
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pixels:
+                    # The borrowed surface uses the mapped pixels, converting it copies them out
+                    borrowed = pygame.image.frombuffer(pixels, size, 'RGBA' if alpha else 'RGBX')
+                    surface = to_display_format(borrowed, alpha, copy=True)
+                    del borrowed
+                return surface
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, pygame.error):
+            logger.exception(f'Error reading baked image {baked_path}')
+            return None
+
+    def bake(self, baked_path, surface, alpha):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            pixels = pygame.image.tobytes(surface, 'RGBA' if alpha else 'RGBX')
+            atomic_write(baked_path, lambda f: f.write(pixels), mode='wb', durable=False)
+        except (OSError, pygame.error):
+            logger.exception(f'Error baking image {baked_path}')
+            return
+        self.prune()
+
+    def prune(self):
+        """Delete the oldest baked images while the folder is over `max_bytes`"""
+        try:
+            entries = sorted((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                             for entry in os.scandir(self.folder) if entry.is_file() and not entry.name.startswith('.'))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def to_display_format(surface, alpha=True, copy=False):
+    """Convert a surface to the display's pixel format so blitting it needs no per-pixel conversion.
+    Before a display mode is set (e.g. in tests) it is returned unconverted."""
+    if pygame.display.get_surface() is None:
+        return surface.copy() if copy else surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+asset_cache = None
+def get_asset_cache():
+    global asset_cache
+    if asset_cache is None or asset_cache.folder != settings.ASSET_CACHE_FOLDER:
+        asset_cache = AssetCache(settings.ASSET_CACHE_FOLDER)
+    return asset_cache
+
+
+def load_image(path, size=None, alpha=True):
+    """Load an image scaled to `size` in the display's pixel format, from the baked cache when possible"""
+    return get_asset_cache().load(path, size, alpha)
@@ -0,0 +1,129 @@
+# atomic_file.py
+import atexit
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows, where the kiosk and the app don't run side by side
+    fcntl = None
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path):
+    """SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on `path` shared by every process (the kiosk, the app) that uses it.
+    The lock is taken on a separate `<path>.lock` file since the file itself gets replaced.
+    Not reentrant: don't take the same lock again while holding it."""
+    with open(f'{path}.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write(path, write, mode='w', durable=True):
+    """Write a file by calling `write(f)` on a temp file next to it, then renaming it over `path`.
+    Readers see either the old or the new file, never a partial one. With `durable` the data is
+    fsynced so that also holds after a power cut."""
+    # Write through symlinks (e.g. cocktails.json -> active_menu/cocktails.json) rather than replacing them
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path) or '.'
+    try:
+        file_mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        file_mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, file_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    if durable and hasattr(os, 'O_DIRECTORY'):
+        # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def atomic_write_json(path, data, durable=True, **kwargs):
+    """json.dump `data` to `path` atomically. Other keyword arguments are passed to json.dump."""
+    atomic_write(path, lambda f: json.dump(data, f, **kwargs), durable=durable)
+
+
+class CoalescingWriter:
+    """Batch rapid changes into one write.
+
+    `submit(key, value)` records a change; `write(changes)` is called with every change recorded
+    since the last write once none arrived for `delay` seconds, but never later than `max_delay`
+    seconds after the first one. Anything still pending is written at exit.
+    """
+
+    def __init__(self, write, delay=0.5, max_delay=2.0):
+        self.write = write
+        self.delay = delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        # Held while writing so batches land in the order they were taken
+        self.write_lock = threading.Lock()
+        self.pending = {}
+        self.first_change = None
+        self.timer = None
+        atexit.register(self.flush)
+
+    def submit(self, key, value):
+        with self.lock:
+            now = time.monotonic()
+            if not self.pending:
+                self.first_change = now
+            self.pending[key] = value
+            if self.timer is not None:
+                self.timer.cancel()
+            delay = max(0, min(self.delay, self.first_change + self.max_delay - now))
+            self.timer = threading.Timer(delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        """Write pending changes now. Returns True if there were any."""
+        with self.write_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                changes, self.pending = self.pending, {}
+            if not changes:
+                return False
+            try:
+                self.write(changes)
+            except Exception:
+                logger.exception('Error writing batched changes')
+            return True
@@ -0,0 +1,188 @@
+# catalog.py
+import copy
+import json
+import os
+import threading
+
+from menu_index import MenuIndex
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def get_safe_name(name):
+    """Convert a cocktail name to a safe filename-friendly string."""
+    return f'{name.lower().replace(" ", "_")}.png'
+
+
+def path_signature(path):
+    """Cheap change marker for a file or folder: inode, mtime and size, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def without(cocktails, cocktail):
+    """A copy of `cocktails` without `cocktail` (the same object, not an equal one), and where it was"""
+    position = next(index for index, other in enumerate(cocktails) if other is cocktail)
+    return cocktails[:position] + cocktails[position + 1:], position
+
+
+def leading_favorites(cocktails):
+    """How many cocktails at the start of a favorites first list are favorites"""
+    for position, cocktail in enumerate(cocktails):
+        if not cocktail.get('favorite', False):
+            return position
+    return len(cocktails)
+
+
+class CocktailCatalog:
+    """In-memory copy of the cocktails file, indexed by cocktail name.
+
+    `refresh()` only re-reads the cocktails file and re-lists the logo folder when one of them changed
+    on disk, so lookups are a couple of stat calls rather than a parse. With a CocktailStore the
+    cocktails come from the database instead, and its commit counters take the place of the file stat.
+    The cocktails held here are shared between callers and must not be modified in place.
+    """
+
+    def __init__(self, cocktails_file, logo_folder, store=None):
+        self.cocktails_file = cocktails_file
+        self.logo_folder = logo_folder
+        self.store = store
+        self.lock = threading.RLock()
+        self.signature = None
+        self.data = {}
+        self.cocktails = []
+        # normal_name -> cocktail, for every cocktail in the file
+        self.by_name = {}
+        # Cocktails that have an image, in file order, and normal_name -> position in that list
+        self.valid = []
+        self.valid_index = {}
+        # normal_name -> image path with the case it has on disk
+        self.image_paths = {}
+        # Ingredient index over `valid`, built on first use
+        self.index = None
+        self.makeable_cache = None
+
+    def file_signature(self):
+        source = self.store.signature() if self.store is not None else path_signature(self.cocktails_file)
+        return (source, path_signature(self.logo_folder))
+
+    def refresh(self, force=False):
+        """Reload if the cocktails file or logo folder changed. Returns True if anything was reloaded."""
+        signature = self.file_signature()
+        if not force and signature == self.signature:
+            return False
+        with self.lock:
+            data = {}
+            if self.store is not None:
+                data = self.store.load_cocktails()
+            elif signature[0] is not None:
+                try:
+                    with open(self.cocktails_file, 'r') as f:
+                        data = json.load(f)
+                except Exception:
+                    logger.exception('Error loading cocktails')
+            self.build(data, signature)
+        return True
+
+    def replace(self, data):
+        """Use data that was just written to the cocktails file without reading it back"""
+        with self.lock:
+            self.build(copy.deepcopy(data), self.file_signature())
+
+    def set_favorite(self, name, favorite, position=None, signature=None):
+        """Favorite or unfavorite one cocktail without rebuilding the catalog. It moves to `position` in
+        `cocktails`, by default where sort_favorites_first would put it: the end of the favorites, or the
+        start of the others, if it changed. `signature` is noted as the file signature if given, for a change that was
+        just written. Returns False if there is no such cocktail."""
+        with self.lock:
+            old = self.by_name.get(name)
+            if old is None:
+                return False
+            cocktail = {**old, 'favorite': favorite}
+            cocktails, old_position = without(self.cocktails, old)
+            if position is None:
+                position = old_position if old.get('favorite', False) == favorite else leading_favorites(cocktails)
+            cocktails.insert(position, cocktail)
+            self.cocktails = cocktails
+            self.data = {**self.data, 'cocktails': cocktails}
+            self.by_name[name] = cocktail
+            if name in self.image_paths:
+                valid, old_valid_position = without(self.valid, old)
+                valid_position = sum(1 for other in cocktails[:position] if other.get('normal_name', '') in self.image_paths)
+                valid.insert(valid_position, cocktail)
+                self.valid = valid
+                low, high = sorted((old_valid_position, valid_position))
+                # Only the cocktails between the old and new positions moved
+                valid_index = dict(self.valid_index)
+                seen = set()
+                for index in range(low, high + 1):
+                    other = valid[index].get('normal_name', '')
+                    if other not in seen and valid_index[other] >= low:
+                        valid_index[other] = index
+                    seen.add(other)
+                self.valid_index = valid_index
+                if self.index is not None:
+                    self.index.move(old_valid_position, valid_position, valid)
+                self.makeable_cache = None
+            if signature is not None:
+                self.signature = signature
+        return True
+
+    def build(self, data, signature):
+        if os.path.isdir(self.logo_folder):
+            # Accept case-insensitive matches
+            existing_files = {f.lower(): f for f in os.listdir(self.logo_folder)}
+        else:
+            existing_files = {}
+        cocktails = data.get('cocktails', [])
+        by_name = {}
+        valid = []
+        valid_index = {}
+        image_paths = {}
+        for cocktail in cocktails:
+            name = cocktail.get('normal_name', '')
+            by_name.setdefault(name, cocktail)
+            file_name = existing_files.get(get_safe_name(name))
+            if file_name:
+                valid_index.setdefault(name, len(valid))
+                valid.append(cocktail)
+                image_paths.setdefault(name, os.path.join(self.logo_folder, file_name))
+        self.data = data
+        self.cocktails = cocktails
+        self.by_name = by_name
+        self.valid = valid
+        self.valid_index = valid_index
+        self.image_paths = image_paths
+        self.index = None
+        self.makeable_cache = None
+        self.signature = signature
+
+    def menu_index(self):
+        with self.lock:
+            if self.index is None:
+                self.index = MenuIndex(self.valid)
+            return self.index
+
+    def makeable(self, available):
+        """Cocktails from `valid` that can be made from the `available` ingredients, and normal_name -> position"""
+        index = self.menu_index()
+        coverage = index.coverage(available)
+        cached = self.makeable_cache
+        if cached is not None and cached[0] is coverage:
+            return cached[1], cached[2]
+        cocktails = index.select(coverage.makeable)
+        positions = {}
+        for position, cocktail in enumerate(cocktails):
+            positions.setdefault(cocktail.get('normal_name', ''), position)
+        self.makeable_cache = (coverage, cocktails, positions)
+        return cocktails, positions
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def image_path(self, name):
+        return self.image_paths.get(name)
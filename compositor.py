@@ -0,0 +1,203 @@
+# compositor.py
+import pygame
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def arg_signature(arg):
+    """How a layer argument is compared between frames: surfaces by identity (they're replaced, not
+    drawn on, when they change) and rects by value, since they're often moved in place"""
+    if isinstance(arg, pygame.Surface):
+        return id(arg)
+    if isinstance(arg, pygame.Rect):
+        return tuple(arg)
+    return arg
+
+
+def merge_rects(rects):
+    """Union overlapping rects so no area is redrawn twice"""
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        overlapping = rect.collidelist(merged)
+        while overlapping != -1:
+            rect.union_ip(merged.pop(overlapping))
+            overlapping = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class Compositor:
+    """A retained scene of named layers, drawn onto the screen bottom first in order of their `z`, and
+    in the order they were added among layers with the same `z`.
+
+    Between frames it compares each layer with how it was last drawn and only redraws and pushes the
+    regions that changed with `pygame.display.update(rects)`; a frame where nothing changed costs
+    nothing. Blits and fills are bounded by their rects, any other drawing function is assumed to
+    cover the whole screen. Hidden layers keep their place but aren't drawn. Code that draws into a
+    surface that is already on screen must call `invalidate(key)` or `mark_dirty()`. When the changes
+    cover more than `full_redraw_ratio` of the screen, or `draw` is called with `full=True` (during
+    swipes), the whole screen is redrawn and flipped instead.
+
+    The `static` blits and fills at the bottom of the scene (the background and the buttons) are
+    composited once into a cached surface, so redrawing them anywhere is a single blit. The cache is
+    only redrawn where one of them changes.
+    """
+
+    def __init__(self, screen, full_redraw_ratio=0.5):
+        self.screen = screen
+        self.full_redraw_ratio = full_redraw_ratio
+        self.layers = {}
+        # Layer key -> (signature, bounds, args) as last drawn. The args are kept so the ids of the
+        # surfaces in the signature can't be reused by new surfaces.
+        self.drawn = {}
+        self.drawn_order = []
+        self.dirty = []
+        self.static_surface = None
+        self.static_drawn = {}
+        self.stats = {'frames': 0, 'full': 0, 'partial': 0, 'skipped': 0, 'pixels': 0, 'static_pixels': 0}
+
+    def add(self, key, function, args, z=None, static=None):
+        """Add or update a layer, showing it. `z` and `static` are kept from the layer being updated
+        unless given, and default to 0 and False."""
+        layer = self.layers.get(key)
+        if layer is None:
+            layer = self.layers[key] = {'z': 0, 'static': False, 'dirty': False}
+        layer.update(function=function, args=args, visible=True)
+        if z is not None:
+            layer['z'] = z
+        if static is not None:
+            layer['static'] = static
+
+    def remove(self, key):
+        self.layers.pop(key, None)
+
+    def show(self, key, visible=True):
+        if key in self.layers:
+            self.layers[key]['visible'] = visible
+
+    def hide(self, key):
+        self.show(key, False)
+
+    def invalidate(self, key):
+        """Redraw a layer on the next frame, e.g. after drawing into its surface"""
+        if key in self.layers:
+            self.layers[key]['dirty'] = True
+
+    def mark_dirty(self, rect=None):
+        self.dirty.append(self.screen.get_rect() if rect is None else pygame.Rect(rect))
+
+    def bounds(self, function, args):
+        screen_rect = self.screen.get_rect()
+        if function == self.screen.blit and len(args) >= 2 and isinstance(args[0], pygame.Surface):
+            dest = args[1]
+            x, y = dest.topleft if isinstance(dest, pygame.Rect) else dest[:2]
+            width, height = pygame.Rect(args[2]).size if len(args) > 2 and args[2] is not None else args[0].get_size()
+            return pygame.Rect(x, y, width, height).clip(screen_rect)
+        if function == self.screen.fill:
+            return pygame.Rect(args[1]).clip(screen_rect) if len(args) > 1 and args[1] is not None else screen_rect
+        return screen_rect
+
+    def ordered(self):
+        """The visible layers' keys, bottom first"""
+        return [key for key, layer in sorted(self.layers.items(), key=lambda item: item[1]['z']) if layer['visible']]
+
+    def static_keys(self, order):
+        """The static layers the scene starts with. Only blits and fills can be drawn into the cache."""
+        keys = []
+        for key in order:
+            layer = self.layers[key]
+            if not layer['static'] or layer['function'] not in (self.screen.blit, self.screen.fill):
+                break
+            keys.append(key)
+        return keys
+
+    def layer_states(self, order):
+        states = {}
+        for key in order:
+            layer = self.layers[key]
+            signature = (layer['function'], tuple(arg_signature(arg) for arg in layer['args']))
+            if layer['dirty']:
+                signature = None  # Never equal to how it was drawn
+                layer['dirty'] = False
+            states[key] = (signature, self.bounds(layer['function'], layer['args']), layer['args'])
+        return states
+
+    def changed_rects(self, drawn, states):
+        rects = []
+        for key in drawn.keys() | states.keys():
+            before, after = drawn.get(key), states.get(key)
+            if before is not None and after is not None and before[0] == after[0] and before[1] == after[1]:
+                continue
+            rects.extend(state[1] for state in (before, after) if state is not None and state[1].width and state[1].height)
+        return rects
+
+    def draw_static(self, states, static_keys):
+        """Bring the cached composite of the static layers up to date, returning the rects redrawn"""
+        static_states = {key: states[key] for key in static_keys}
+        if self.static_surface is None or list(self.static_drawn) != static_keys:
+            if self.static_surface is None:
+                self.static_surface = self.screen.copy()
+            rects = [self.static_surface.get_rect()]
+        else:
+            rects = merge_rects(self.changed_rects(self.static_drawn, static_states) + self.dirty)
+        self.static_drawn = static_states
+        target = self.static_surface
+        for rect in rects:
+            target.set_clip(rect)
+            for key in static_keys:
+                layer = self.layers[key]
+                if states[key][1].colliderect(rect):
+                    function = target.blit if layer['function'] == self.screen.blit else target.fill
+                    function(*layer['args'])
+            self.stats['static_pixels'] += rect.width * rect.height
+        target.set_clip(None)
+        return rects
+
+    def draw(self, full=False):
+        """Draw the frame, redrawing only what changed unless `full`. Returns the rects pushed."""
+        order = self.ordered()
+        states = self.layer_states(order)
+        static_keys = self.static_keys(order)
+        screen_rect = self.screen.get_rect()
+        rects = list(self.dirty) + self.changed_rects(self.drawn, states)
+        # A layer moving above or below another changes what overlaps what
+        kept = [key for key in self.drawn_order if key in states]
+        if full or not self.drawn_order or kept != [key for key in order if key in self.drawn]:
+            full = True
+        if static_keys:
+            self.draw_static(states, static_keys)
+        else:
+            self.static_surface, self.static_drawn = None, {}
+        rects = [screen_rect] if full else merge_rects(rects)
+        self.drawn, self.drawn_order, self.dirty = states, order, []
+        self.stats['frames'] += 1
+        if not rects:
+            self.stats['skipped'] += 1
+            return []
+
+        dynamic_keys = order[len(static_keys):]
+        area = sum(rect.width * rect.height for rect in rects)
+        if full or area > self.full_redraw_ratio * screen_rect.width * screen_rect.height:
+            if static_keys:
+                self.screen.blit(self.static_surface, (0, 0))
+            for key in dynamic_keys:
+                self.layers[key]['function'](*self.layers[key]['args'])
+            pygame.display.flip()
+            self.stats['full'] += 1
+            self.stats['pixels'] += screen_rect.width * screen_rect.height
+            return [screen_rect]
+
+        for rect in rects:
+            self.screen.set_clip(rect)
+            if static_keys:
+                self.screen.blit(self.static_surface, rect, rect)
+            for key in dynamic_keys:
+                if states[key][1].colliderect(rect):
+                    self.layers[key]['function'](*self.layers[key]['args'])
+        self.screen.set_clip(None)
+        pygame.display.update(rects)
+        self.stats['partial'] += 1
+        self.stats['pixels'] += area
+        return rects
@@ -8,6 +8,7 @@ import json
 import concurrent.futures
 
 from settings import *
+from measurements import parse_measurement, to_oz
 
 if not DEBUG:
     try:
@@ -19,6 +20,15 @@ if not DEBUG:
 
 pin_devices = {}
 
+# Settings that are re-read while the controller is running, e.g. after the kiosk slider moves
+LIVE_SETTINGS = ('OZ_COEFFICIENT', 'PUMP_CONCURRENCY', 'RETRACTION_TIME', 'INVERT_PUMP_PINS')
+
+
+@registry.subscribe
+def apply_settings(changed):
+    """Rebind live settings pushed by the settings registry"""
+    globals().update({name: value for name, value in changed.items() if name in LIVE_SETTINGS})
+
 # Define GPIO pins for each motor here (same as your test).
 # Adjust these if needed to match your hardware.
 MOTORS = [
@@ -93,9 +103,45 @@ class Pour:
         self.amount = amount
         self.ingredient_name = ingredient_name
         self.running = False
+        self.started = None
+        self.finished = None
+        self.duration = self.seconds()
+
+    def seconds(self):
+        """How long the pour takes, retracting the pump included"""
+        seconds = self.amount * OZ_COEFFICIENT
+        if RETRACTION_TIME:
+            seconds += 2 * RETRACTION_TIME
+        return seconds
+
+    def remaining(self, now=None):
+        """Seconds until the pour finishes, its whole duration if it hasn't started"""
+        if self.finished is not None:
+            return 0.0
+        if self.started is None:
+            return self.duration
+        now = time.monotonic() if now is None else now
+        return max(self.duration - (now - self.started), 0.0)
+
+    def progress(self, now=None):
+        """How far through the pour is, from 0 to 1"""
+        if self.finished is not None:
+            return 1.0
+        if not self.duration:
+            return 0.0
+        return 1.0 - self.remaining(now) / self.duration
 
     def run(self):
+        self.duration = self.seconds()
+        self.started = time.monotonic()
         self.running = True
+        try:
+            self.pour()
+        finally:
+            self.running = False
+            self.finished = time.monotonic()
+
+    def pour(self):
         ia, ib = MOTORS[self.pump_index]
         seconds_to_pour = self.amount * OZ_COEFFICIENT
 
@@ -113,7 +159,6 @@ class Pour:
             time.sleep(RETRACTION_TIME)
 
         motor_stop(ia, ib)
-        self.running = False
 
 
 def prime_pumps(duration=10):
@@ -157,35 +202,55 @@ def clean_pumps(duration=10):
             logger.debug('clean_pumps() complete no GPIO cleanup in debug mode.')
 
 
+def run_in_background(function, *args, **kwargs):
+    """Run e.g. prime_pumps on its own thread, returning an ExecutorWatcher that is done once it returns"""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    executor_watcher = ExecutorWatcher()
+    executor_watcher.executors.append(executor.submit(function, *args, **kwargs))
+    executor.shutdown(wait=False)
+    return executor_watcher
+
+
 class ExecutorWatcher:
 
     def __init__(self):
         self.executors = []
         self.pours = []
+        # Pours run this many at a time, each batch once the one before has finished
+        self.batch_size = 1
 
     def done(self):
         if any([not executor.done() for executor in self.executors]):
             return False
         return True
 
+    def wait(self, timeout=None):
+        """Block until the work is done or `timeout` seconds have passed, returning whether it's done"""
+        concurrent.futures.wait(self.executors, timeout)
+        return self.done()
+
+    def progress(self, now=None):
+        """Each pour with how far through it is and the seconds it has left, and the seconds left for
+        the whole drink"""
+        now = time.monotonic() if now is None else now
+        pours = [(pour, pour.progress(now), pour.remaining(now)) for pour in self.pours]
+        batches = [pours[start:start + self.batch_size] for start in range(0, len(pours), self.batch_size)]
+        remaining = sum(max(seconds for _, _, seconds in batch) for batch in batches)
+        return pours, remaining
+
 
 def pour_ingredients(ingredients, single_or_double, pump_config, parent_watcher):
     executor = concurrent.futures.ThreadPoolExecutor()
-    executor_watcher = ExecutorWatcher()
     factor = 2 if single_or_double.lower() == 'double' else 1
-    index = 1
-    for ingredient_name, measurement_str in sorted(ingredients.items(), key=lambda x: x[1], reverse=True):
-        parts = measurement_str.split()
-        if not parts:
-            logger.critical(f'Cannot parse measurement for {ingredient_name}. Skipping.')
-            continue
-        try:
-            oz_amount = float(parts[0])  # parse numeric
-        except ValueError:
-            logger.critical(f'Cannot parse numeric amount "{parts[0]}" for {ingredient_name}. Skipping.')
+    pours = []
+    measurements = {ingredient_name: parse_measurement(measurement_str) for ingredient_name, measurement_str in ingredients.items()}
+    # Largest volumes first, whatever unit they were written in
+    for ingredient_name, measurement in sorted(measurements.items(), key=lambda x: x[1].ml or 0, reverse=True):
+        if measurement.ml is None:
+            logger.critical(f'Cannot parse measurement "{measurement.text}" for {ingredient_name}. Skipping.')
             continue
 
-        oz_needed = oz_amount * factor
+        oz_needed = to_oz(measurement) * factor
 
         # find a matching pump label in pump_config
         chosen_pump = None
@@ -210,18 +275,15 @@ def pour_ingredients(ingredients, single_or_double, pump_config, parent_watcher)
             logger.critical(f'Pump index {pump_index} out of range for "{ingredient_name}". Skipping.')
             continue
 
-        pour = Pour(pump_index, oz_needed, ingredient_name)
-        parent_watcher.pours.append(pour)
-        executor_watcher.executors.append(executor.submit(pour.run))
+        pours.append(Pour(pump_index, oz_needed, ingredient_name))
 
-        if index % PUMP_CONCURRENCY == 0:
-            while not executor_watcher.done():
-                pass
-        index += 1
+    # All the pours are known up front so the time left for the whole drink can be shown
+    parent_watcher.batch_size = PUMP_CONCURRENCY
+    parent_watcher.pours.extend(pours)
+    for start in range(0, len(pours), PUMP_CONCURRENCY):
+        batch = [executor.submit(pour.run) for pour in pours[start:start + PUMP_CONCURRENCY]]
+        concurrent.futures.wait(batch)
 
-    while not executor_watcher.done():
-        pass
-    
     if not DEBUG:
         for dev in pin_devices.values():
             dev.close()
@@ -0,0 +1,59 @@
+# fonts.py
+import collections
+import functools
+import threading
+
+import pygame
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+WHITE = (255, 255, 255)
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size, name=None):
+    """The font `name` (the default font if None) at `size`, looked up among the system fonts once"""
+    return pygame.font.SysFont(name, size)
+
+
+class TextCache:
+    """Least recently used cache of rendered text, keyed by text, size, color and font.
+
+    Rendering the same label every frame, or every time a screen is shown, becomes a lookup. At most
+    `max_entries` surfaces are kept.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def render(self, text, size, color=WHITE, font_name=None, antialias=True):
+        key = (text, size, tuple(color), font_name, antialias)
+        with self.lock:
+            surface = self.entries.get(key)
+            if surface is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return surface
+            self.misses += 1
+        surface = get_font(size, font_name).render(text, antialias, color)
+        with self.lock:
+            self.entries[key] = surface
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return surface
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+text_cache = TextCache()
+def render_text(text, size, color=WHITE, font_name=None, antialias=True):
+    """Render text with the shared text cache"""
+    return text_cache.render(text, size, color, font_name, antialias)
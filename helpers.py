@@ -1,11 +1,13 @@
 import base64
+import copy
 import os
 import json
-import streamlit as st
 import settings
-import assist
-from rembg import remove
-from PIL import Image
+from atomic_file import CoalescingWriter, atomic_write, atomic_write_json, file_lock
+from catalog import CocktailCatalog, get_safe_name, path_signature
+
+# streamlit, assist (openai), rembg (onnxruntime) and PIL are imported where they are used.
+# The kiosk imports this module and should not pay for them at startup.
 
 import logging
 logger = logging.getLogger(__name__)
@@ -32,41 +34,123 @@ def get_centered_rect_for_surface(surface, screen_width, screen_height, offset_x
 
 def save_config(data):
     try:
-        with open(settings.CONFIG_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write_json(settings.CONFIG_FILE, data, indent=2)
     except Exception as e:
         logger.exception('Error saving pump configuration')
 
 
+catalog = None
+store = None
+
+
+def get_store():
+    """Get the shared CocktailStore if COCKTAILS_DB is set, otherwise None.
+    A new database is filled from the cocktails file."""
+    global store
+    if not settings.COCKTAILS_DB:
+        return None
+    if store is None or store.path != settings.COCKTAILS_DB:
+        from store import CocktailStore
+        store = CocktailStore(settings.COCKTAILS_DB)
+        if store.is_empty() and os.path.exists(settings.COCKTAILS_FILE):
+            store.migrate_from_json(settings.COCKTAILS_FILE)
+    return store
+
+
+def get_catalog():
+    """Get the shared cocktail catalog, refreshed if the cocktails (file or database) or logo folder changed"""
+    global catalog
+    cocktail_store = get_store()
+    if catalog is None or (catalog.cocktails_file, catalog.logo_folder, catalog.store) != (settings.COCKTAILS_FILE, settings.LOGO_FOLDER, cocktail_store):
+        catalog = CocktailCatalog(settings.COCKTAILS_FILE, settings.LOGO_FOLDER, store=cocktail_store)
+    catalog.refresh()
+    return catalog
+
+
 def load_cocktails():
-    if os.path.exists(settings.COCKTAILS_FILE):
-        try:
-            with open(settings.COCKTAILS_FILE, 'r') as f:
-                return json.load(f)
-        except Exception:
-            logger.exception('Error loading cocktails')
-    return {}
+    """Get a copy of the cocktails file contents that is safe to modify"""
+    return copy.deepcopy(get_catalog().data)
+
+
+def sort_favorites_first(cocktails):
+    """Favorites first while preserving input order otherwise"""
+    cocktails['cocktails'] = sorted(cocktails['cocktails'], key=lambda cocktail: not cocktail.get('favorite', False))
+
+
+def modify_cocktails(modify):
+    """Read the cocktails file, call `modify(cocktails)` and write the result, all under the cross-process
+    file lock so concurrent writers (the app and the kiosk) can't lose each other's changes"""
+    with file_lock(settings.COCKTAILS_FILE):
+        cocktail_catalog = get_catalog()
+        cocktails = copy.deepcopy(cocktail_catalog.data)
+        cocktails = modify(cocktails) or cocktails
+        sort_favorites_first(cocktails)
+        atomic_write_json(settings.COCKTAILS_FILE, cocktails, indent=2)
+        # Still under the lock, so the signature noted is that of this write and not a later one
+        cocktail_catalog.replace(cocktails)
+    return cocktails
 
 
 def save_cocktails(data, append=True):
-    """Save the given list of cocktails to the cocktails file."""
+    """Save the given list of cocktails to the cocktails file. Returns True if it was saved."""
     try:
-        cocktails = load_cocktails()
-        with open(settings.COCKTAILS_FILE, 'w') as f:
+        cocktail_store = get_store()
+        if cocktail_store is not None:
+            cocktail_store.save_cocktails(data, append=append)
+            get_catalog()
+            return True
+        # Land any favorites still waiting to be written first, so they aren't overwritten by stale data
+        favorite_writer.flush()
+
+        def modify(cocktails):
             if append:
                 cocktails['cocktails'] += data['cocktails']
-            else:
-                cocktails = data
-            # Favorites first while preserving input order otherwise
-            cocktails['cocktails'] = sorted(cocktails['cocktails'], key=lambda cocktail: not cocktail.get('favorite', False))
-            json.dump(cocktails, f, indent=2)
+                return cocktails
+            return copy.deepcopy(data)
+        modify_cocktails(modify)
+        return True
     except Exception as e:
+        import streamlit as st
         st.error(f'Error saving cocktails: {e}')
+        return False
+
+
+def write_favorites(favorites):
+    """Apply a batch of {normal_name: favorite} changes to the cocktails file"""
+    def modify(cocktails):
+        for cocktail in cocktails['cocktails']:
+            if cocktail.get('normal_name') in favorites:
+                cocktail['favorite'] = favorites[cocktail.get('normal_name')]
+    modify_cocktails(modify)
+
 
+# Tapping favorite repeatedly in the kiosk results in one write
+favorite_writer = CoalescingWriter(write_favorites)
 
-def get_safe_name(name):
-    """Convert a cocktail name to a safe filename-friendly string."""
-    return f'{name.lower().replace(" ", "_")}.png'
+
+def update_recipe(normal_name, ingredients):
+    """Replace the ingredients of one cocktail. Returns True if it was saved."""
+    cocktail_store = get_store()
+    if cocktail_store is not None:
+        try:
+            cocktail_store.update_ingredients(normal_name, ingredients)
+        except Exception:
+            logger.exception(f'Error saving recipe for {normal_name}')
+            return False
+        get_catalog()
+        return True
+    def modify(cocktails):
+        for cocktail in cocktails['cocktails']:
+            if cocktail.get('normal_name') == normal_name:
+                cocktail['ingredients'] = ingredients
+                break
+    try:
+        favorite_writer.flush()
+        modify_cocktails(modify)
+    except Exception:
+        logger.exception(f'Error saving recipe for {normal_name}')
+        return False
+    return True
 
 
 def get_cocktail_image_path(cocktail):
@@ -77,46 +161,76 @@ def get_cocktail_image_path(cocktail):
     return path
 
 
+pump_config_cache = (None, {})
+
+
+def get_pump_config():
+    """Get the pump configuration, only reading the file again when it changed"""
+    global pump_config_cache
+    signature = path_signature(settings.CONFIG_FILE)
+    if signature != pump_config_cache[0]:
+        pump_config_cache = (signature, load_saved_config())
+    return pump_config_cache[1]
+
+
+def get_menu():
+    """Get the cocktails the kiosk shows and normal_name -> position in that list.
+    With HIDE_UNMAKEABLE_COCKTAILS that's only those whose ingredients are all on a pump."""
+    cocktail_catalog = get_catalog()
+    if not settings.HIDE_UNMAKEABLE_COCKTAILS:
+        return cocktail_catalog.valid, cocktail_catalog.valid_index
+    cocktails, positions = cocktail_catalog.makeable(get_pump_config().values())
+    if not cocktails:
+        # The kiosk needs something to show, so an empty menu means the pumps haven't been set up yet
+        logger.warning('No cocktails can be made with the current pumps, showing all of them')
+        return cocktail_catalog.valid, cocktail_catalog.valid_index
+    return cocktails, positions
+
+
+def get_menu_coverage(available=None):
+    """Get the menu_index.Coverage of the cocktails with images for the given ingredient names,
+    by default the ones in the pump configuration"""
+    if available is None:
+        available = get_pump_config().values()
+    return get_catalog().menu_index().coverage(available)
+
+
 def get_valid_cocktails():
-    """Get the list of cocktails that have images associated with them."""
-    cocktail_data = load_cocktails().get('cocktails', [])
-    existing_files = {f.lower() for f in os.listdir(settings.LOGO_FOLDER)} if os.path.isdir(settings.LOGO_FOLDER) else set()
-    cocktails = []
-    for cocktail in cocktail_data:
-        safe_name = get_safe_name(cocktail.get("normal_name", ""))
-        # Accept case-insensitive matches
-        if safe_name in existing_files:
-            cocktails.append(cocktail)
-    return cocktails
+    """Get the list of cocktails that have images associated with them (and can be made, with HIDE_UNMAKEABLE_COCKTAILS).
+    The cocktails are shared with the catalog and must not be modified in place."""
+    return list(get_menu()[0])
+
+
+def set_favorite(cocktail_index, favorite):
+    """Set the favorite flag on a valid cocktail. Returns the new index of the cocktail"""
+    name = get_menu()[0][cocktail_index].get('normal_name')
+    cocktail_store = get_store()
+    cocktail_catalog = get_catalog()
+    if cocktail_store is not None:
+        with cocktail_catalog.lock:
+            before = cocktail_catalog.file_signature()
+            position = cocktail_store.set_favorite(name, favorite)
+            after = cocktail_catalog.file_signature()
+            # Commits from other connections move data_version, this one's only total_changes. If
+            # anything else changed, the catalog is reloaded on the next lookup instead.
+            (data_version, _), logos = before
+            if before == cocktail_catalog.signature and after[0][0] == data_version and after[1] == logos:
+                cocktail_catalog.set_favorite(name, favorite, position, signature=after)
+        return get_menu()[1][name]
+    # Show the change right away, the file is written once the taps stop
+    cocktail_catalog.set_favorite(name, favorite)
+    favorite_writer.submit(name, favorite)
+    return get_menu()[1][name]
 
 
 def favorite_cocktail(cocktail_index):
     """Mark a cocktail as a favorite. Returns the new index of the cocktail"""
-    cocktails = get_valid_cocktails()
-    cocktail = cocktails[cocktail_index]
-    cocktail['favorite'] = True
-    # Rebuild full list with updated favorite flag
-    full = load_cocktails()
-    for i, c in enumerate(full['cocktails']):
-        if c.get('normal_name') == cocktail.get('normal_name'):
-            full['cocktails'][i] = cocktail
-            break
-    save_cocktails(full, append=False)
-    return get_valid_cocktails().index(cocktail)
+    return set_favorite(cocktail_index, True)
 
 
 def unfavorite_cocktail(cocktail_index):
     """Unmark a cocktail as a favorite. Returns the new index of the cocktail"""
-    cocktails = get_valid_cocktails()
-    cocktail = cocktails[cocktail_index]
-    cocktail['favorite'] = False
-    full = load_cocktails()
-    for i, c in enumerate(full['cocktails']):
-        if c.get('normal_name') == cocktail.get('normal_name'):
-            full['cocktails'][i] = cocktail
-            break
-    save_cocktails(full, append=False)
-    return get_valid_cocktails().index(cocktail)
+    return set_favorite(cocktail_index, False)
 
 
 def save_base64_image(base64_string, output_path):
@@ -129,8 +243,8 @@ def save_base64_image(base64_string, output_path):
     """
     try:
         image_data = base64.b64decode(base64_string)
-        with open(output_path, 'wb') as file:
-            file.write(image_data)
+        # Replace rather than overwrite, the old file may be hardlinked into the menu history
+        atomic_write(output_path, lambda file: file.write(image_data), mode='wb')
         logger.debug(f'Image saved to {output_path}')
         return output_path
     except Exception:
@@ -149,26 +263,45 @@ def wrap_text(text, font, width):
     if width is None or width == 0:
         return text_lines
 
+    # Lines are built up a word at a time, each word measured once, rather than measuring every
+    # growing prefix of the line
+    space_width = font.size(' ')[0]
+    word_widths = {}
+    def measure(word):
+        if word not in word_widths:
+            word_widths[word] = font.size(word)[0]
+        return word_widths[word]
+
     wrapped_lines = []
     for line in text_lines:
-        line = line.rstrip() + ' '
-        if line == ' ':
-            wrapped_lines.append(line)
+        line = line.rstrip()
+        if not line:
+            wrapped_lines.append(' ')
             continue
 
-        # Get the leftmost space ignoring leading whitespace
-        start = len(line) - len(line.lstrip())
-        start = line.index(' ', start)
-        while start + 1 < len(line):
-            # Get the next potential splitting point
-            next = line.index(' ', start + 1)
-            if font.size(line[:next])[0] <= width:
-                start = next
+        # Leading whitespace stays with the first word
+        indent = len(line) - len(line.lstrip())
+        words = line[indent:].split(' ')
+        words[0] = line[:indent] + words[0]
+        current, current_width = [words[0]], measure(words[0])
+        # Glyph metrics make the sum of the parts differ from the whole by up to a pixel per word, so
+        # a line that lands that close to the edge is measured whole
+        drift = 1
+        for word in words[1:]:
+            word_width = measure(word)
+            candidate_width = current_width + space_width + word_width
+            drift += 1
+            if abs(candidate_width - width) <= drift:
+                candidate_width = font.size(' '.join(current + [word]))[0]
+                drift = 1
+            if candidate_width <= width:
+                current.append(word)
+                current_width = candidate_width
             else:
-                wrapped_lines.append(line[:start])
-                line = line[start+1:]
-                start = line.index(' ')
-        line = line[:-1]
+                wrapped_lines.append(' '.join(current))
+                current, current_width = [word], word_width
+                drift = 1
+        line = ' '.join(current)
         if line:
             wrapped_lines.append(line)
     return wrapped_lines
@@ -200,6 +333,7 @@ def generate_image(normal_name, regenerate=False, ingredients=None, api_key=None
     else:
         get_image_prompt(normal_name, ingredients)
         try:
+            import assist
             prompt = get_image_prompt(normal_name, ingredients, use_gpt_transparency)
             # Generate the image URL
             b64_image = assist.generate_image(prompt, api_key)
@@ -211,10 +345,12 @@ def generate_image(normal_name, regenerate=False, ingredients=None, api_key=None
                 # Download + remove background in memory
                 logger.debug(f'Removing background from image for {normal_name}')
                 from io import BytesIO
+                from PIL import Image
+                from rembg import remove
                 with Image.open(BytesIO(base64.b64decode(b64_image))) as original_img:
                     img = remove(original_img.convert('RGBA'))
                     logger.debug(f'Saving image with removed background for {normal_name}')
-                    img.save(filename, 'PNG')
+                    atomic_write(filename, lambda f: img.save(f, 'PNG'), mode='wb')
 
             return filename
 
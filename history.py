@@ -0,0 +1,298 @@
+# history.py
+import concurrent.futures
+import datetime
+import json
+import os
+import shutil
+import threading
+
+from atomic_file import atomic_write, atomic_write_json, file_hash
+from catalog import get_safe_name, path_signature
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_FILE = 'manifest.json'
+OBJECTS_FOLDER = 'objects'
+HASH_CACHE_FILE = '.hash_cache.json'
+INDEX_FILE = 'index.jsonl'
+
+
+def link_or_copy(source, destination):
+    """Hardlink source to destination, copying when links aren't supported (e.g. across filesystems)"""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+class MenuHistory:
+    """Snapshots of the menu (cocktails, pump config and logos) kept under `folder`.
+
+    Each snapshot is a folder with copies of the two small JSON files and a manifest mapping logo file
+    names to SHA-256 hashes. The logos themselves are stored once in `objects/`, named by hash and
+    hardlinked where possible, so a snapshot only costs the images that changed since the last one.
+    Files in the logo folder must be replaced, not rewritten in place, or the stored copy changes too.
+    """
+
+    def __init__(self, folder, cocktails_file, config_file, logo_folder, retention=50):
+        self.folder = folder
+        self.cocktails_file = cocktails_file
+        self.config_file = config_file
+        self.logo_folder = logo_folder
+        # Number of snapshots to keep, 0 to keep them all
+        self.retention = retention
+        self.objects_folder = os.path.join(folder, OBJECTS_FOLDER)
+        self.index_file = os.path.join(folder, INDEX_FILE)
+        # Parsed index entries, oldest first, the index file signature they were read at and how many
+        # bytes of the file they cover
+        self.index_entries = []
+        self.index_signature = None
+        self.index_offset = 0
+        self.lock = threading.RLock()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_folder, digest[:2], digest)
+
+    def snapshot_names(self):
+        """Snapshot folder names, newest first"""
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted([
+            name for name in os.listdir(self.folder)
+            if name != OBJECTS_FOLDER and not name.startswith('.') and os.path.isdir(os.path.join(self.folder, name))
+        ], reverse=True)
+
+    def load_hash_cache(self):
+        try:
+            with open(os.path.join(self.folder, HASH_CACHE_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def hash_logos(self):
+        """Get {file name: hash} for the logo folder, only hashing files that changed since the last snapshot"""
+        cache = self.load_hash_cache()
+        new_cache = {}
+        logos = {}
+        if os.path.isdir(self.logo_folder):
+            for entry in os.scandir(self.logo_folder):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                key = [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+                cached = cache.get(entry.name)
+                if cached and cached[0] == key:
+                    digest = cached[1]
+                else:
+                    digest = file_hash(entry.path)
+                new_cache[entry.name] = [key, digest]
+                logos[entry.name] = digest
+        atomic_write_json(os.path.join(self.folder, HASH_CACHE_FILE), new_cache, durable=False)
+        return logos
+
+    def snapshot(self, name=None, cocktails=None):
+        """Record the current menu. Returns the snapshot name.
+        `cocktails` is saved instead of the cocktails file when given (e.g. when they live in a database)."""
+        if name is None:
+            name = datetime.datetime.now().isoformat().replace(':', '-').split('.')[0]
+        with self.lock:
+            os.makedirs(self.folder, exist_ok=True)
+            logos = self.hash_logos()
+            for file_name, digest in logos.items():
+                object_path = self.object_path(digest)
+                if not os.path.exists(object_path):
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    link_or_copy(os.path.join(self.logo_folder, file_name), object_path)
+
+            # Build the snapshot next to its final place so it only appears once it's complete
+            tmp_folder = os.path.join(self.folder, f'.tmp-{name}')
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            os.makedirs(tmp_folder)
+            if cocktails is not None:
+                atomic_write_json(os.path.join(tmp_folder, 'cocktails.json'), cocktails, indent=2)
+            elif os.path.exists(self.cocktails_file):
+                shutil.copy(self.cocktails_file, os.path.join(tmp_folder, 'cocktails.json'))
+            if os.path.exists(self.config_file):
+                shutil.copy(self.config_file, os.path.join(tmp_folder, 'pump_config.json'))
+            atomic_write_json(os.path.join(tmp_folder, MANIFEST_FILE), {'drink_logos': logos}, indent=2)
+            snapshot_folder = os.path.join(self.folder, name)
+            if os.path.exists(snapshot_folder):
+                shutil.rmtree(snapshot_folder)
+            os.rename(tmp_folder, snapshot_folder)
+            self.append_index(self.index_entry(name))
+            self.prune()
+        logger.info(f'Saved menu snapshot {name} with {len(logos)} logos')
+        return name
+
+    def snapshot_async(self, name=None, cocktails=None):
+        """Take a snapshot on the background thread. Returns a Future for the snapshot name."""
+        future = self.executor.submit(self.snapshot, name, cocktails)
+        future.add_done_callback(lambda f: f.exception() and logger.error('Error saving menu snapshot', exc_info=f.exception()))
+        return future
+
+    def prune(self):
+        """Drop snapshots beyond the retention count, then logos no snapshot refers to any more"""
+        names = self.snapshot_names()
+        if self.retention and len(names) > self.retention:
+            for name in names[self.retention:]:
+                shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+            names = names[:self.retention]
+            kept = set(names)
+            self.write_index([entry for entry in self.entries() if entry['name'] in kept])
+        referenced = set()
+        for name in names:
+            referenced.update(self.manifest(name).values())
+        if not os.path.isdir(self.objects_folder):
+            return
+        for prefix in os.listdir(self.objects_folder):
+            prefix_folder = os.path.join(self.objects_folder, prefix)
+            for digest in os.listdir(prefix_folder):
+                if digest not in referenced:
+                    os.remove(os.path.join(prefix_folder, digest))
+            if not os.listdir(prefix_folder):
+                os.rmdir(prefix_folder)
+
+    def manifest(self, name):
+        """Get {file name: hash} for a snapshot's logos, or {} for snapshots from before the object store"""
+        try:
+            with open(os.path.join(self.folder, name, MANIFEST_FILE), 'r') as f:
+                return json.load(f).get('drink_logos', {})
+        except (OSError, ValueError):
+            return {}
+
+    def index_entry(self, name):
+        """Summary of a snapshot for the index: drink names, pump config and the hash of a logo to show"""
+        snapshot_folder = os.path.join(self.folder, name)
+        try:
+            with open(os.path.join(snapshot_folder, 'cocktails.json'), 'r') as f:
+                cocktails = json.load(f).get('cocktails', [])
+        except (OSError, ValueError):
+            cocktails = []
+        try:
+            with open(os.path.join(snapshot_folder, 'pump_config.json'), 'r') as f:
+                pump_config = json.load(f)
+        except (OSError, ValueError):
+            pump_config = {}
+        drinks = [cocktail.get('normal_name', '') for cocktail in cocktails]
+        logos = self.manifest(name)
+        thumbnail = next((logos[get_safe_name(drink)] for drink in drinks if get_safe_name(drink) in logos), None)
+        return {'name': name, 'drinks': drinks, 'pump_config': pump_config, 'thumbnail': thumbnail}
+
+    def append_index(self, entry):
+        with self.lock:
+            if not os.path.exists(self.index_file):
+                # Backfill snapshots taken before there was an index, this one included
+                self.rebuild_index()
+                return
+            with open(self.index_file, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def write_index(self, entries):
+        with self.lock:
+            atomic_write(self.index_file, lambda f: f.writelines(json.dumps(entry) + '\n' for entry in entries))
+
+    def rebuild_index(self):
+        """Write the index from the snapshot folders"""
+        self.write_index([self.index_entry(name) for name in reversed(self.snapshot_names())])
+
+    def parse_index(self, lines):
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash mid-append
+                logger.warning(f'Skipping bad line in {self.index_file}')
+        return entries
+
+    def entries(self):
+        """Index entries, oldest first. The index is only read again when it changed on disk, and then
+        only the lines appended since the last read are parsed, unless it was rewritten."""
+        with self.lock:
+            if not os.path.exists(self.index_file) and self.snapshot_names():
+                self.rebuild_index()
+            signature = path_signature(self.index_file)
+            if signature != self.index_signature:
+                if signature is None:
+                    entries, offset = [], 0
+                else:
+                    appended = (self.index_signature is not None and signature[0] == self.index_signature[0]
+                                and signature[2] >= self.index_offset)
+                    entries, offset = (self.index_entries, self.index_offset) if appended else ([], 0)
+                    with open(self.index_file, 'rb') as f:
+                        f.seek(offset)
+                        data = f.read()
+                    # A line still being appended is left for the next read
+                    end = data.rfind(b'\n') + 1
+                    entries = entries + self.parse_index(data[:end].splitlines())
+                    offset += end
+                self.index_entries = entries
+                self.index_signature = signature
+                self.index_offset = offset
+            return self.index_entries
+
+    def index_tail(self, count, chunk_size=64 * 1024):
+        """The last `count` index entries, oldest first, and the number of lines in the index (bad lines
+        included). Only the end of the file is parsed, the rest is just scanned for line breaks."""
+        with open(self.index_file, 'rb') as f:
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(chunk_size), b''))
+            start = f.tell()
+            tail = b''
+            while start > 0 and tail.count(b'\n') <= count:
+                end = start
+                start = max(0, end - chunk_size)
+                f.seek(start)
+                tail = f.read(end - start) + tail
+        # Drop a line still being appended, and the first line if it was only read in part
+        tail_lines = tail[:tail.rfind(b'\n') + 1].splitlines()
+        if start > 0:
+            tail_lines = tail_lines[1:]
+        return self.parse_index(tail_lines[-count:] if count else []), lines
+
+    def page(self, page, page_size=10):
+        """Get one page (counting from 0) of index entries, newest first, and the number of pages"""
+        with self.lock:
+            if page <= 0 and self.index_signature is None and os.path.exists(self.index_file):
+                # The newest snapshots are at the end of the index, so a process that hasn't read it yet
+                # doesn't need to parse all of it to show them
+                entries, count = self.index_tail(page_size)
+                return list(reversed(entries)), max(1, -(-count // page_size))
+        entries = self.entries()
+        pages = max(1, -(-len(entries) // page_size))
+        page = min(max(page, 0), pages - 1)
+        end = len(entries) - page * page_size
+        return list(reversed(entries[max(0, end - page_size):max(0, end)])), pages
+
+    def thumbnail_path(self, entry):
+        return self.object_path(entry['thumbnail']) if entry.get('thumbnail') else None
+
+    def export(self, name, folder):
+        """Write a snapshot out as a self-contained menu folder: cocktails.json, pump_config.json and
+        drink_logos/, with the logos linked from the object store"""
+        snapshot_folder = os.path.join(self.folder, name)
+        legacy_logos = os.path.join(snapshot_folder, 'drink_logos')
+        os.makedirs(folder)
+        for file_name in ('cocktails.json', 'pump_config.json'):
+            if os.path.exists(os.path.join(snapshot_folder, file_name)):
+                shutil.copy(os.path.join(snapshot_folder, file_name), os.path.join(folder, file_name))
+        if os.path.isdir(legacy_logos):
+            shutil.copytree(legacy_logos, os.path.join(folder, 'drink_logos'), copy_function=link_or_copy)
+        else:
+            os.makedirs(os.path.join(folder, 'drink_logos'))
+            for file_name, digest in self.manifest(name).items():
+                link_or_copy(self.object_path(digest), os.path.join(folder, 'drink_logos', file_name))
+
+history = None
+
+
+def get_history():
+    """Get the shared MenuHistory for the configured paths"""
+    global history
+    import settings
+    paths = (settings.HISTORY_FOLDER, settings.COCKTAILS_FILE, settings.CONFIG_FILE, settings.LOGO_FOLDER)
+    if history is None or (history.folder, history.cocktails_file, history.config_file, history.logo_folder) != paths:
+        history = MenuHistory(*paths, retention=settings.HISTORY_RETENTION)
+    return history
@@ -0,0 +1,158 @@
+# image_cache.py
+import collections
+import concurrent.futures
+import os
+import threading
+
+import pygame
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def load_scaled(path, size):
+    return pygame.transform.scale(pygame.image.load(path), size)
+
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+class SurfaceCache:
+    """Least recently used cache of decoded and scaled images.
+
+    Entries are keyed by path, mtime, file size and target size, so an image that is replaced on disk
+    is decoded again while swiping back and forth over the same cocktails costs no decoding at all.
+    The decoded surfaces are counted against `budget_bytes` and the least recently shown are dropped
+    first. `load(path, size)` decodes and scales an image on a miss. Safe to use from a background
+    loader thread.
+    """
+
+    def __init__(self, budget_bytes, load=load_scaled):
+        self.budget_bytes = budget_bytes
+        self.load = load
+        self.entries = collections.OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def key(self, path, size):
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size, tuple(size))
+
+    def get(self, path, size):
+        """Return `path` decoded and scaled to `size`, loading it on a miss"""
+        key = self.key(path, size)
+        with self.lock:
+            surface = self.entries.get(key)
+            if surface is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return surface
+            self.misses += 1
+        # Decode outside the lock so a slow load doesn't hold up lookups
+        surface = self.load(path, key[3])
+        self.put(key, surface)
+        return surface
+
+    def peek(self, path, size):
+        """Return `path` scaled to `size` if it is already cached, without loading it"""
+        try:
+            key = self.key(path, size)
+        except OSError:
+            return None
+        with self.lock:
+            surface = self.entries.get(key)
+            if surface is not None:
+                self.entries.move_to_end(key)
+            return surface
+
+    def put(self, key, surface):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= surface_bytes(previous)
+            self.entries[key] = surface
+            self.size_bytes += surface_bytes(surface)
+            self.evict()
+
+    def evict(self):
+        # The newest entry is kept even if it alone is over budget
+        while self.size_bytes > self.budget_bytes and len(self.entries) > 1:
+            _, surface = self.entries.popitem(last=False)
+            self.size_bytes -= surface_bytes(surface)
+            self.evictions += 1
+
+    def set_budget(self, budget_bytes):
+        with self.lock:
+            self.budget_bytes = budget_bytes
+            self.evict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'size_bytes': self.size_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def prefetch_order(index, length, count, direction=0):
+    """Indices within `count` of `index` on either side, nearest first. After a swipe (`direction`
+    1 or -1) the ones in that direction come first, otherwise the two sides alternate."""
+    ahead = [(index + step) % length for step in range(1, count + 1)]
+    behind = [(index - step) % length for step in range(1, count + 1)]
+    if direction < 0:
+        ahead, behind = behind, ahead
+    order = ahead + behind if direction else [i for pair in zip(ahead, behind) for i in pair]
+    return [i for i in dict.fromkeys(order) if i != index]
+
+
+class Prefetcher:
+    """Loads images into a SurfaceCache ahead of time on a background thread.
+
+    `prefetch(keys)` queues `load(key)` for each key in priority order and cancels queued loads that
+    are no longer wanted, so after a run of fast swipes only the cocktails around the latest one are
+    decoded. When `event_type` is given a pygame event with the finished `key` is posted, letting
+    the render loop pick the surface up from the cache without ever waiting for it.
+    """
+
+    def __init__(self, load, event_type=None):
+        self.load = load
+        self.event_type = event_type
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+        self.pending = {}
+
+    def prefetch(self, keys):
+        # Queued loads are cancelled and requeued so the new priority order holds
+        for key, future in list(self.pending.items()):
+            if future.done() or future.cancel():
+                del self.pending[key]
+        for key in keys:
+            if key not in self.pending:
+                self.pending[key] = self.executor.submit(self.run, key)
+
+    def run(self, key):
+        try:
+            surface = self.load(key)
+        except Exception:
+            logger.exception(f'Error prefetching {key}')
+            return None
+        if self.event_type is not None and surface is not None:
+            pygame.event.post(pygame.event.Event(self.event_type, key=key))
+        return surface
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
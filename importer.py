@@ -0,0 +1,192 @@
+# importer.py
+import argparse
+import csv
+import functools
+import json
+import re
+import time
+
+import helpers
+from measurements import format_measurement, parse_measurement
+from menu_index import normalize_ingredient
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def normalize_name(name):
+    """Key recipes are deduplicated on: case, punctuation and repeated spaces don't count"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', name.casefold()).split())
+
+
+def clean_text(value):
+    return ' '.join(str(value).split()) if value is not None else ''
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_measurement(text):
+    """Tidy measurement text ("1 1/2  oz" -> "1.5 oz"), or None if it can't be poured"""
+    measurement = parse_measurement(clean_text(text))
+    if measurement.ml is None:
+        return None
+    return format_measurement(measurement, measurement.amount)
+
+
+def parse_ingredients(value):
+    """Ingredients as a {name: measurement} dict, a list of {"name", "measurement"} objects,
+    or a CSV cell like "Rum: 2 oz; Lime Juice: 1 oz\""""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, list):
+        return {item.get('name', ''): item.get('measurement', '') for item in value if isinstance(item, dict)}
+    if isinstance(value, str):
+        ingredients = {}
+        for part in value.split(';'):
+            if part.strip():
+                name, _, measurement = part.partition(':')
+                ingredients[name] = measurement
+        return ingredients
+    raise InvalidRecord('ingredients must be an object, a list or a string')
+
+
+def normalize_record(record):
+    """Validate a raw recipe record and return it as a cocktail, with tidy names and measurements"""
+    normal_name = clean_text(record.get('normal_name') or record.get('name'))
+    if not normal_name:
+        raise InvalidRecord('missing name')
+    cocktail = {'normal_name': normal_name}
+    fun_name = clean_text(record.get('fun_name'))
+    if fun_name:
+        cocktail['fun_name'] = fun_name
+
+    ingredients = {}
+    for name, measurement_text in parse_ingredients(record.get('ingredients')).items():
+        name = clean_text(name)
+        if not name:
+            continue
+        measurement = normalize_measurement(str(measurement_text))
+        if measurement is None:
+            raise InvalidRecord(f'cannot pour "{measurement_text}" of {name}')
+        ingredients[name] = measurement
+    if not ingredients:
+        raise InvalidRecord('no ingredients')
+    cocktail['ingredients'] = ingredients
+    return cocktail
+
+
+def read_jsonl(f):
+    for line_number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield InvalidRecord(f'line {line_number}: {e}')
+
+
+def read_csv(f):
+    """Rows with name (or normal_name), fun_name and ingredients columns, or one row per ingredient
+    with ingredient and measurement columns. Rows for the same recipe must be next to each other."""
+    reader = csv.DictReader(f)
+    if 'ingredient' not in (reader.fieldnames or []):
+        yield from reader
+        return
+    record = None
+    for row in reader:
+        name = row.get('normal_name') or row.get('name')
+        if record is None or name != record['name']:
+            if record is not None:
+                yield record
+            record = {'name': name, 'fun_name': row.get('fun_name'), 'ingredients': {}}
+        record['ingredients'][row['ingredient']] = row.get('measurement', '')
+    if record is not None:
+        yield record
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.unmakeable = 0
+
+    def __str__(self):
+        return (f'{self.read} read, {self.imported} imported, {self.duplicates} duplicates, '
+                f'{self.invalid} invalid, {self.unmakeable} not makeable with the current pumps')
+
+
+def import_recipes(records, existing_names, write_batch, pump_ingredients=(), only_makeable=False, batch_size=1000):
+    """Normalize and dedupe a stream of raw records, handing them to `write_batch(cocktails)` in batches
+    so only one batch is held in memory. Returns ImportStats."""
+    stats = ImportStats()
+    seen = {normalize_name(name) for name in existing_names}
+    pump_ingredients = {normalize_ingredient(ingredient) for ingredient in pump_ingredients if ingredient}
+    batch = []
+    for record in records:
+        stats.read += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            cocktail = normalize_record(record)
+        except (InvalidRecord, AttributeError) as e:
+            stats.invalid += 1
+            logger.debug(f'Skipping record {stats.read}: {e}')
+            continue
+        key = normalize_name(cocktail['normal_name'])
+        if key in seen:
+            stats.duplicates += 1
+            continue
+        if pump_ingredients and not all(normalize_ingredient(name) in pump_ingredients for name in cocktail['ingredients']):
+            stats.unmakeable += 1
+            if only_makeable:
+                continue
+        seen.add(key)
+        batch.append(cocktail)
+        if len(batch) >= batch_size:
+            write_batch(batch)
+            stats.imported += len(batch)
+            batch = []
+    if batch:
+        write_batch(batch)
+        stats.imported += len(batch)
+    return stats
+
+
+def import_file(path, file_format=None, only_makeable=False, batch_size=1000):
+    """Import a JSON Lines or CSV file of recipes into the configured cocktails (database or file)"""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    cocktail_store = helpers.get_store()
+    pump_ingredients = helpers.get_pump_config().values()
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        records = READERS[file_format](f)
+        if cocktail_store is not None:
+            stats = import_recipes(records, cocktail_store.normal_names(), cocktail_store.add_batch,
+                                   pump_ingredients, only_makeable, batch_size)
+        else:
+            # The cocktails file is written in one go, so the whole import is held in memory
+            logger.warning('Set COCKTAILS_DB to import large recipe sets without holding them in memory')
+            imported = []
+            stats = import_recipes(records, helpers.get_catalog().by_name, imported.extend,
+                                   pump_ingredients, only_makeable, batch_size)
+            if imported:
+                helpers.save_cocktails({'cocktails': imported})
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import recipes from a JSON Lines or CSV file')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension')
+    parser.add_argument('--only-makeable', action='store_true', help='Skip recipes that need an ingredient not on a pump')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    stats = import_file(args.path, args.format, args.only_makeable, args.batch_size)
+    print(f'{stats} in {time.perf_counter() - start:.1f}s')
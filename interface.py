@@ -1,14 +1,24 @@
 # interface.py
 import pygame
 import json
-import qrcode
 import io
+import math
+import signal
 import socket
 import os
+import concurrent.futures
 
 from settings import *
-from helpers import get_cocktail_image_path, get_valid_cocktails, wrap_text, favorite_cocktail, unfavorite_cocktail, get_centered_rect_for_surface
-from controller import make_drink
+from helpers import get_catalog, get_cocktail_image_path, get_valid_cocktails, wrap_text, favorite_cocktail, unfavorite_cocktail, get_centered_rect_for_surface
+from controller import make_drink, run_in_background
+from atomic_file import atomic_write_json
+from assets import load_image, to_display_format
+from animation import Call, Sequence, Timeline, Tween, stepped
+from compositor import Compositor
+from fonts import get_font, render_text, text_cache
+from loop_stats import LoopStats
+from image_cache import Prefetcher, SurfaceCache, prefetch_order
+from sprites import SpriteCache
 
 import logging
 logger = logging.getLogger(__name__)
@@ -25,14 +35,15 @@ def get_local_ip():
     except:
         return "localhost"
 
-def create_qr_code_slide():
-    """Create a QR code slide for the Streamlit app access"""
+def create_qr_code_slide(local_ip=None):
+    """Create a QR code slide for the Streamlit app access, at local_ip or the IP looked up now"""
     # Get local IP and port
-    local_ip = get_local_ip()
+    local_ip = get_local_ip() if local_ip is None else local_ip
     streamlit_port = 8501
     url = f"http://{local_ip}:{streamlit_port}"
     
-    # Create QR code
+    # Create QR code (qrcode pulls in PIL, so it is only imported when the slide is built)
+    import qrcode
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -51,7 +62,7 @@ def create_qr_code_slide():
     img_buffer.seek(0)
     
     # Load into pygame
-    qr_surface = pygame.image.load(img_buffer)
+    qr_surface = to_display_format(pygame.image.load(img_buffer))
     
     # Scale to fit screen (make it large enough to scan easily)
     qr_size = min(screen_width, screen_height) // 2
@@ -63,18 +74,41 @@ def create_qr_code_slide():
         'fun_name': 'Scan QR Code',
         'qr_surface': qr_surface,
         'url': url,
+        'ip': local_ip,
         'is_qr_slide': True
     }
     
     return qr_cocktail
 
-def get_cocktails_with_qr():
-    """Get valid cocktails and add QR code slide at the end"""
+def get_cocktails_with_qr(qr_cocktail=None):
+    """Get valid cocktails and add QR code slide at the end. A QR slide that was already built can be passed in"""
     cocktails = get_valid_cocktails()
-    qr_cocktail = create_qr_code_slide()
+    if qr_cocktail is None:
+        qr_cocktail = create_qr_code_slide()
     cocktails.append(qr_cocktail)
     return cocktails
 
+def load_nav_icon(path, size):
+    """Load a nav-photos icon scaled to size, or None if it can't be loaded"""
+    try:
+        return load_image(path, size)
+    except Exception:
+        logger.exception(f'Error loading {path}')
+        return None
+
+def load_nav_icons():
+    """Load the secondary icons that are not needed for the first frame"""
+    icons = {
+        'single_logo': load_nav_icon('nav-photos/single.png', (150, 150)),
+        'double_logo': load_nav_icon('nav-photos/double.png', (150, 150)),
+    }
+    if ALLOW_FAVORITES:
+        icons['favorite_logo'] = load_nav_icon('nav-photos/favorite.png', (50, 50))
+        icons['unfavorite_logo'] = load_nav_icon('nav-photos/unfavorite.png', (50, 50))
+    if SHOW_RELOAD_COCKTAILS_BUTTON:
+        icons['reload_logo'] = load_nav_icon('nav-photos/reload.png', (50, 50))
+    return icons
+
 def check_for_refresh_signal():
     """Check if there's a signal from the app to refresh cocktails"""
     try:
@@ -107,188 +141,192 @@ normal_text_size = 72
 small_text_size = int(normal_text_size * 0.6)
 text_position = (screen_width // 2, int(screen_height * 0.85))
 
-def add_layer(*args, function=screen.blit, key=None):
+def add_layer(*args, function=screen.blit, key=None, z=None, static=None):
     if key == None:
         key = len(layers)
-    layers[str(key)] = {'function': function, 'args': args}
+    compositor.add(str(key), function, args, z=z, static=static)
 
 def remove_layer(key):
-    try:
-        del layers[key]
-    except KeyError:
-        pass
+    compositor.remove(key)
+
+def hide_layer(key):
+    compositor.hide(key)
+
+# Stacking order of the layers, bottom first
+Z_BACKGROUND = 0
+Z_NAV = 10
+Z_CAROUSEL = 20
+Z_BUTTONS = 30
+Z_TRAY = 40
+Z_TAB = 50
+Z_OVERLAY = 60
+TRAY_LAYERS = ('settings_overlay', 'settings_title', 'settings_controls', 'slider_label', 'prime_text', 'clean_text', 'switch_label', 'access_label', 'ip_label')
     
-layers = {}
-def draw_frame():
-    for layer in layers.values():
-        layer['function'](*layer['args'])
-    pygame.display.flip()
-
-def animate_logo_click(logo, rect, base_size, target_size, layer_key, duration=150):
-    """Animate a logo click (pop effect): grow from base_size to target_size then shrink back."""
-    clock = pygame.time.Clock()
+compositor = Compositor(screen)
+timeline = Timeline()
+layers = compositor.layers
+boot_metrics = {}
+image_cache = SurfaceCache(int(IMAGE_CACHE_MB * 1024 * 1024), load=load_image)
+sprites = SpriteCache()
+PREFETCH_EVENT = pygame.event.custom_type()
+last_heartbeat = 0
+HEARTBEAT_INTERVAL = 1000  # ms
+def draw_frame(full=False):
+    """Draw the layers, pushing only the regions that changed unless `full` (used while swiping)"""
+    compositor.draw(full)
+    if pygame.time.get_ticks() - last_heartbeat > HEARTBEAT_INTERVAL:
+        touch_heartbeat()
+
+def touch_heartbeat():
+    """Let the supervisor in main.py know the render loop is alive"""
+    global last_heartbeat
+    last_heartbeat = pygame.time.get_ticks()
+    try:
+        with open(HEARTBEAT_FILE, 'a'):
+            os.utime(HEARTBEAT_FILE)
+    except OSError:
+        logger.exception(f'Error touching heartbeat file {HEARTBEAT_FILE}')
+
+ZOOM_STEPS = 12
+def zoom_logo(logo, rect, layer_key, start_size, end_size, duration):
+    """A tween scaling a logo around the center of rect, through ZOOM_STEPS cached sizes"""
     center = rect.center
-    # Expand
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(base_size + (target_size - base_size) * progress)
-        scaled_img = pygame.transform.scale(logo, (current_size, current_size))
-        new_rect = scaled_img.get_rect(center=center)
-        add_layer(scaled_img, new_rect, key=layer_key)
-        draw_frame()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
-    # Shrink back
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(target_size - (target_size - base_size) * progress)
-        scaled_img = pygame.transform.scale(logo, (current_size, current_size))
-        new_rect = scaled_img.get_rect(center=center)
-        add_layer(scaled_img, new_rect, key=layer_key)
-        draw_frame()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
+    def update(size):
+        scaled_img = sprites.scaled(logo, (size, size))
+        add_layer(scaled_img, scaled_img.get_rect(center=center), key=layer_key)
+    return Tween(duration, update, start_size, end_size, easing=stepped(ZOOM_STEPS))
+
+def animate_logo_click(logo, rect, base_size, target_size, layer_key, duration=150, on_complete=None):
+    """Animate a logo click (pop effect): grow from base_size to target_size then shrink back.
+    on_complete is called once the logo is back to its size. Returns the animation."""
+    steps = [
+        zoom_logo(logo, rect, layer_key, base_size, target_size, duration),
+        zoom_logo(logo, rect, layer_key, target_size, base_size, duration),
+    ]
+    if on_complete:
+        steps.append(Call(on_complete))
+    return timeline.play(layer_key, Sequence(*steps))
 
-def animate_logo_rotate(logo, rect, layer_key, rotation=180):
+def animate_logo_rotate(logo, rect, layer_key, rotation=180, duration=300):
     """Animate a logo click (rotate effect): rotate the amount of rotation provided"""
-    angle = 0
-    while angle < rotation:
-        angle = (angle + 5) % 360
-        rotated_loading = pygame.transform.rotate(logo, angle * -1)
-        rotated_rect = rotated_loading.get_rect(center=rect.center)
-        # Draw loading image first (under)
-        add_layer(rotated_loading, rotated_rect, key=layer_key)
-        draw_frame()
+    def update(angle):
+        rotated_logo = sprites.rotated(logo, -angle)
+        add_layer(rotated_logo, rotated_logo.get_rect(center=rect.center), key=layer_key)
+    timeline.play(layer_key, Tween(duration, update, 0, rotation))
 
 def animate_both_logos_zoom(single_logo, double_logo, single_rect, double_rect, base_size, target_size, duration=300):
     """Animate both logos zooming in together and then shrinking back."""
-    clock = pygame.time.Clock()
-    center_single = single_rect.center
-    center_double = double_rect.center
-    # Expand
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(base_size + (target_size - base_size) * progress)
-        scaled_single = pygame.transform.scale(single_logo, (current_size, current_size))
-        scaled_double = pygame.transform.scale(double_logo, (current_size, current_size))
-        new_rect_single = scaled_single.get_rect(center=center_single)
-        new_rect_double = scaled_double.get_rect(center=center_double)
-        add_layer(scaled_single, new_rect_single, key='single_logo')
-        add_layer(scaled_double, new_rect_double, key='double_logo')
-        draw_frame()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
-    # Contract
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(target_size - (target_size - base_size) * progress)
-        scaled_single = pygame.transform.scale(single_logo, (current_size, current_size))
-        scaled_double = pygame.transform.scale(double_logo, (current_size, current_size))
-        new_rect_single = scaled_single.get_rect(center=center_single)
-        new_rect_double = scaled_double.get_rect(center=center_double)
-        add_layer(scaled_single, new_rect_single, key='single_logo')
-        add_layer(scaled_double, new_rect_double, key='double_logo')
-        draw_frame()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
+    for logo, rect, layer_key in ((single_logo, single_rect, 'single_logo'), (double_logo, double_rect, 'double_logo')):
+        timeline.play(layer_key, Sequence(
+            zoom_logo(logo, rect, layer_key, base_size, target_size, duration),
+            zoom_logo(logo, rect, layer_key, target_size, base_size, duration),
+        ))
 
+POURING_FPS = 15
 def show_pouring_and_loading(watcher):
-    """Overlay pouring_img full screen and a spinning loading_img (720x720) drawn underneath."""
+    """Overlay pouring_img full screen with each pour's progress and the time left for the drink.
+
+    The overlay follows the progress the controller reports and is only redrawn `POURING_FPS` times a
+    second, leaving the CPU to the pump threads."""
+    if watcher is None:
+        return
     try:
-        pouring_img = pygame.image.load('nav-photos/pouring.png')
-        pouring_img = pygame.transform.scale(pouring_img, screen_size)
+        pouring_img = load_image('nav-photos/pouring.png', screen_size)
     except Exception as e:
         logger.exception('Error loading nav-photos/pouring.png')
         pouring_img = None
     try:
-        loading_img = pygame.image.load('nav-photos/loading.png')
-        loading_img = pygame.transform.scale(loading_img, (70, 70))
+        # From the image cache, so the spinner's frames are kept from one pour to the next
+        loading_img = image_cache.get('nav-photos/loading.png', (70, 70))
+        sprites.warm(loading_img)
     except Exception as e:
         logger.exception('Error loading nav-photos/loading.png')
         loading_img = None
     try:
-        checkmark_img = pygame.image.load('nav-photos/checkmark.png')
-        checkmark_img = pygame.transform.scale(checkmark_img, (30, 30))
+        checkmark_img = image_cache.get('nav-photos/checkmark.png', (30, 30))
     except Exception as e:
         logger.exception('Error loading nav-photos/checkmark.png')
         checkmark_img = None
-        
-    angle = 0
 
     # Add a background layer
-    add_layer(*layers['background']['args'], function=layers['background']['function'], key='pouring_background')
+    add_layer(*layers['background']['args'], function=layers['background']['function'], key='pouring_background', z=Z_OVERLAY)
     # Then draw pouring image on top
     if pouring_img:
-        add_layer(pouring_img, (0, -150), key='pouring')
+        add_layer(pouring_img, (0, -150), key='pouring', z=Z_OVERLAY)
 
+    x_position = screen_width // 3
+    bar_width, bar_height = int(screen_width * 0.4), 8
+    label_size = small_text_size // 2
     pour_layers = []
+    status_positions = {}
+    bar_rects = {}
     pouring_line = 0
-    while not watcher.done():
-        angle = (angle - 5) % 360
-        if loading_img:
-            rotated_loading = pygame.transform.rotate(loading_img, angle)
-        
-        for index, pour in enumerate(watcher.pours):
+    while True:
+        # Spin at a steady speed whatever the frame rate
+        angle = -pygame.time.get_ticks() * 0.36 % 360
+        rotated_loading = sprites.rotated(loading_img, angle) if loading_img else None
+        pours, remaining = watcher.progress()
+
+        for index, (pour, progress, seconds) in enumerate(pours):
             layer_key = f'pour_{index}'
             logo_layer_key = f'{layer_key}_logo'
-            
-            x_position = screen_width // 3
-            y_position = (text_position[1] + small_text_size * pouring_line) - 325
 
-            if logo_layer_key not in pour_layers:
-                font = pygame.font.SysFont(None, small_text_size)
+            if index not in status_positions:
+                y_position = (text_position[1] + small_text_size * pouring_line) - 325 + bar_height * 2 * index
+                font = get_font(small_text_size)
                 for layer_index, line in enumerate(wrap_text(str(pour), font, screen_width * 0.5)):
                     line_key = f'{layer_key}_{layer_index}'
-                    text_surface = font.render(line, True, (255, 255, 255))
+                    text_surface = render_text(line, small_text_size)
                     line_y_position = y_position + small_text_size * layer_index
                     if layer_index > 0:
                         line_y_position = line_y_position - 10 * layer_index
                     text_rect = text_surface.get_rect(topleft=(x_position, line_y_position))
                     pour_layers.append(line_key)
-                    add_layer(text_surface, text_rect, key=line_key)
+                    add_layer(text_surface, text_rect, key=line_key, z=Z_OVERLAY)
                     pouring_line += 1
-                pour_layers.append(logo_layer_key)
+                status_positions[index] = (x_position - small_text_size // 2, y_position - 7 + small_text_size // 2)
+                bar_rects[index] = pygame.Rect(x_position, text_rect.bottom, bar_width, bar_height)
+                pour_layers.extend([logo_layer_key, f'{layer_key}_bar', f'{layer_key}_fill', f'{layer_key}_label'])
 
-            status_position = layers.get(logo_layer_key, {}).get('args', [None, None])[1]
-            if status_position:
-                status_position = status_position.center
+            if pour.running and rotated_loading:
+                add_layer(rotated_loading, rotated_loading.get_rect(center=status_positions[index]), key=logo_layer_key, z=Z_OVERLAY)
+            elif pour.finished is not None and checkmark_img:
+                add_layer(checkmark_img, checkmark_img.get_rect(center=status_positions[index]), key=logo_layer_key, z=Z_OVERLAY)
             else:
-                status_position = (x_position - small_text_size // 2, y_position - 7 + small_text_size // 2)
+                hide_layer(logo_layer_key)
 
-            if pour.running and loading_img:
-                rect = rotated_loading.get_rect(center=status_position)
-                add_layer(rotated_loading, rect, key=logo_layer_key)
-            else:
-                if checkmark_img:
-                    rect = checkmark_img.get_rect(center=status_position)
-                    add_layer(checkmark_img, rect, key=logo_layer_key)
-                else:
-                    remove_layer(logo_layer_key)
-                    
+            bar_rect = bar_rects[index]
+            fill_rect = pygame.Rect(bar_rect.topleft, (int(bar_rect.width * progress), bar_rect.height))
+            add_layer((80, 80, 80), bar_rect, function=screen.fill, key=f'{layer_key}_bar', z=Z_OVERLAY)
+            add_layer((255, 255, 255), fill_rect, function=screen.fill, key=f'{layer_key}_fill', z=Z_OVERLAY)
+            label = render_text(f'{int(progress * 100)}%  {math.ceil(seconds)}s', label_size)
+            add_layer(label, label.get_rect(midleft=(bar_rect.right + 10, bar_rect.centery)), key=f'{layer_key}_label', z=Z_OVERLAY)
+
+        if pours:
+            eta = render_text(f'Ready in {math.ceil(remaining)}s', small_text_size)
+            add_layer(eta, eta.get_rect(center=(screen_width // 2, screen_height - small_text_size * 2)), key='pouring_eta', z=Z_OVERLAY)
 
         draw_frame()
+        pygame.event.pump()  # Keep the window responsive without handling the events
+        if watcher.wait(1 / POURING_FPS):
+            break
 
     for layer in pour_layers:
         remove_layer(layer)
 
+    remove_layer('pouring_eta')
     remove_layer('pouring')
     remove_layer('pouring_background')
     draw_frame()
     pygame.event.clear()  # Drop all events that happened while pouring
 
-def create_settings_tray():
+def run_maintenance(action, duration=10):
+    """Run prime_pumps or clean_pumps behind the pouring overlay. They take `duration` seconds per pump,
+    two minutes for 12 pumps, so run on the render thread they would stop the heartbeat long enough for
+    the supervisor to restart the kiosk partway through."""
+    show_pouring_and_loading(run_in_background(action, duration=duration))
+
+def create_settings_tray(url=None):
     """Create the settings tray UI elements"""
     tray_height = int(screen_height * 0.4)  # 40% of screen height
     tray_rect = pygame.Rect(0, screen_height - tray_height, screen_width, tray_height)
@@ -299,7 +337,7 @@ def create_settings_tray():
     overlay.fill((0, 0, 0))
     
     # Settings title
-    title_font = pygame.font.SysFont(None, 48)
+    title_font = get_font(48)
     title_text = title_font.render("Settings", True, (255, 255, 255))
     title_rect = title_text.get_rect(center=(screen_width // 2, screen_height - tray_height + 40))
     
@@ -318,7 +356,7 @@ def create_settings_tray():
     slider_handle_rect = pygame.Rect(slider_handle_x - 10, slider_y - 5, 20, 30)
     
     # Slider label
-    slider_font = pygame.font.SysFont(None, 32)
+    slider_font = get_font(32)
     slider_label = slider_font.render(f"Time per oz: {OZ_COEFFICIENT:.1f}s", True, (255, 255, 255))
     slider_label_rect = slider_label.get_rect(center=(screen_width // 2, slider_y - 30))
     
@@ -330,14 +368,14 @@ def create_settings_tray():
     # Prime pumps button
     prime_rect = pygame.Rect(screen_width // 2 - button_width - button_spacing // 2, 
                            screen_height - tray_height + 180, button_width, button_height)
-    prime_font = pygame.font.SysFont(None, 28)
+    prime_font = get_font(28)
     prime_text = prime_font.render("Prime Pumps", True, (255, 255, 255))
     prime_text_rect = prime_text.get_rect(center=prime_rect.center)
     
     # Clean pumps button
     clean_rect = pygame.Rect(screen_width // 2 + button_spacing // 2, 
                            screen_height - tray_height + 180, button_width, button_height)
-    clean_font = pygame.font.SysFont(None, 28)
+    clean_font = get_font(28)
     clean_text = clean_font.render("Clean Pumps", True, (255, 255, 255))
     clean_text_rect = clean_text.get_rect(center=clean_rect.center)
     
@@ -350,31 +388,18 @@ def create_settings_tray():
     switch_rect = pygame.Rect(switch_x, switch_y, switch_width, switch_height)
     
     # Switch label
-    switch_font = pygame.font.SysFont(None, 24)
+    switch_font = get_font(24)
     switch_label = switch_font.render("Reverse Pump Direction", True, (255, 255, 255))
     switch_label_rect = switch_label.get_rect(center=(screen_width // 2, switch_y - 20))
     
-    # Streamlit app access info
-    import socket
-    try:
-        # Get local IP address
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
-    except:
-        local_ip = "localhost"
-    
-    streamlit_port = 8501  # Default Streamlit port
-    
     # Access info label
-    access_font = pygame.font.SysFont(None, 20)
+    access_font = get_font(20)
     access_label = access_font.render("Access your app at:", True, (200, 200, 200))
     access_label_rect = access_label.get_rect(center=(screen_width // 2, switch_y + 50))
     
-    # IP and port info
-    ip_font = pygame.font.SysFont(None, 24)
-    ip_text = f"http://{local_ip}:{streamlit_port}"
+    # IP and port info. Looking up the IP can block, so the URL is filled in by set_access_url once known
+    ip_font = get_font(24)
+    ip_text = url or "Looking up address..."
     ip_label = ip_font.render(ip_text, True, (0, 255, 255))  # Cyan color for URL
     ip_label_rect = ip_label.get_rect(center=(screen_width // 2, switch_y + 75))
     
@@ -406,61 +431,72 @@ def create_settings_tray():
         'max_val': max_val
     }
 
+def set_access_url(settings_ui, url):
+    """Show the Streamlit app URL in the settings tray once it is known"""
+    ip_font = get_font(24)
+    settings_ui['ip_label'] = ip_font.render(url, True, (0, 255, 255))
+    settings_ui['ip_label_rect'] = settings_ui['ip_label'].get_rect(center=settings_ui['ip_label_rect'].center)
+
 def draw_settings_tray(settings_ui, is_visible):
     """Draw the settings tray if visible"""
     if not is_visible:
         return
     
     # Draw overlay
-    add_layer(settings_ui['overlay'], settings_ui['tray_rect'], key='settings_overlay')
+    add_layer(settings_ui['overlay'], settings_ui['tray_rect'], key='settings_overlay', z=Z_TRAY)
     
     # Draw title
-    add_layer(settings_ui['title_text'], settings_ui['title_rect'], key='settings_title')
+    add_layer(settings_ui['title_text'], settings_ui['title_rect'], key='settings_title', z=Z_TRAY)
     
-    # Create temporary surfaces for slider and buttons
-    temp_surface = pygame.Surface(screen_size, pygame.SRCALPHA)
+    # The controls are only redrawn when they move or the switch changes, so an open tray costs nothing per frame
+    controls_key = tuple(tuple(settings_ui[name]) for name in ('slider_bg_rect', 'slider_handle_rect', 'prime_rect', 'clean_rect', 'switch_rect')) + (INVERT_PUMP_PINS,)
+    if settings_ui.get('controls_key') != controls_key:
+        # Create temporary surfaces for slider and buttons
+        temp_surface = pygame.Surface(screen_size, pygame.SRCALPHA)
     
-    # Draw slider background
-    pygame.draw.rect(temp_surface, (100, 100, 100), settings_ui['slider_bg_rect'])
+        # Draw slider background
+        pygame.draw.rect(temp_surface, (100, 100, 100), settings_ui['slider_bg_rect'])
     
-    # Draw slider handle
-    pygame.draw.rect(temp_surface, (255, 255, 255), settings_ui['slider_handle_rect'])
+        # Draw slider handle
+        pygame.draw.rect(temp_surface, (255, 255, 255), settings_ui['slider_handle_rect'])
     
-    # Draw buttons
-    pygame.draw.rect(temp_surface, (50, 150, 50), settings_ui['prime_rect'])
-    pygame.draw.rect(temp_surface, (150, 50, 50), settings_ui['clean_rect'])
+        # Draw buttons
+        pygame.draw.rect(temp_surface, (50, 150, 50), settings_ui['prime_rect'])
+        pygame.draw.rect(temp_surface, (150, 50, 50), settings_ui['clean_rect'])
     
-    # Draw switch background
-    switch_color = (0, 200, 0) if INVERT_PUMP_PINS else (100, 100, 100)
-    pygame.draw.rect(temp_surface, switch_color, settings_ui['switch_rect'])
-    pygame.draw.rect(temp_surface, (200, 200, 200), settings_ui['switch_rect'], 2)
+        # Draw switch background
+        switch_color = (0, 200, 0) if INVERT_PUMP_PINS else (100, 100, 100)
+        pygame.draw.rect(temp_surface, switch_color, settings_ui['switch_rect'])
+        pygame.draw.rect(temp_surface, (200, 200, 200), settings_ui['switch_rect'], 2)
     
-    # Draw switch indicator (circle)
-    indicator_radius = 12
-    if INVERT_PUMP_PINS:
-        # ON position - indicator on the right
-        indicator_x = settings_ui['switch_rect'].x + settings_ui['switch_rect'].width - indicator_radius - 3
-    else:
-        # OFF position - indicator on the left
-        indicator_x = settings_ui['switch_rect'].x + indicator_radius + 3
-    indicator_y = settings_ui['switch_rect'].y + settings_ui['switch_rect'].height // 2
-    pygame.draw.circle(temp_surface, (255, 255, 255), (indicator_x, indicator_y), indicator_radius)
+        # Draw switch indicator (circle)
+        indicator_radius = 12
+        if INVERT_PUMP_PINS:
+            # ON position - indicator on the right
+            indicator_x = settings_ui['switch_rect'].x + settings_ui['switch_rect'].width - indicator_radius - 3
+        else:
+            # OFF position - indicator on the left
+            indicator_x = settings_ui['switch_rect'].x + indicator_radius + 3
+        indicator_y = settings_ui['switch_rect'].y + settings_ui['switch_rect'].height // 2
+        pygame.draw.circle(temp_surface, (255, 255, 255), (indicator_x, indicator_y), indicator_radius)
+        settings_ui['controls_surface'] = temp_surface
+        settings_ui['controls_key'] = controls_key
     
-    add_layer(temp_surface, (0, 0), key='settings_controls')
+    add_layer(settings_ui['controls_surface'], (0, 0), key='settings_controls', z=Z_TRAY)
     
     # Draw slider label
-    add_layer(settings_ui['slider_label'], settings_ui['slider_label_rect'], key='slider_label')
+    add_layer(settings_ui['slider_label'], settings_ui['slider_label_rect'], key='slider_label', z=Z_TRAY)
     
     # Draw button text
-    add_layer(settings_ui['prime_text'], settings_ui['prime_text_rect'], key='prime_text')
-    add_layer(settings_ui['clean_text'], settings_ui['clean_text_rect'], key='clean_text')
+    add_layer(settings_ui['prime_text'], settings_ui['prime_text_rect'], key='prime_text', z=Z_TRAY)
+    add_layer(settings_ui['clean_text'], settings_ui['clean_text_rect'], key='clean_text', z=Z_TRAY)
     
     # Draw switch label
-    add_layer(settings_ui['switch_label'], settings_ui['switch_label_rect'], key='switch_label')
+    add_layer(settings_ui['switch_label'], settings_ui['switch_label_rect'], key='switch_label', z=Z_TRAY)
     
     # Draw access info
-    add_layer(settings_ui['access_label'], settings_ui['access_label_rect'], key='access_label')
-    add_layer(settings_ui['ip_label'], settings_ui['ip_label_rect'], key='ip_label')
+    add_layer(settings_ui['access_label'], settings_ui['access_label_rect'], key='access_label', z=Z_TRAY)
+    add_layer(settings_ui['ip_label'], settings_ui['ip_label_rect'], key='ip_label', z=Z_TRAY)
 
 def create_settings_tab():
     """Create the small tab at the bottom for accessing settings"""
@@ -487,34 +523,21 @@ def create_settings_tab():
     }
 
 def animate_settings_tray(settings_ui, settings_tab, show_tray, duration=300):
-    """Animate the settings tray sliding up or down"""
-    clock = pygame.time.Clock()
-    start_time = pygame.time.get_ticks()
+    """Animate the settings tray sliding up or down. A tray turned around part way continues from
+    where it is."""
     tray_height = settings_ui['tray_rect'].height
-    
-    if show_tray:
-        # Slide up from bottom
-        start_y = screen_height
-        end_y = screen_height - tray_height
-        tab_start_y = settings_tab['base_y']
-        tab_end_y = screen_height - tray_height - settings_tab['height']
+    open_y = screen_height - tray_height
+    if timeline.running('settings_tray'):
+        start_y = settings_ui['tray_rect'].y
     else:
-        # Slide down to bottom
-        start_y = screen_height - tray_height
-        end_y = screen_height
-        tab_start_y = screen_height - tray_height - settings_tab['height']
-        tab_end_y = settings_tab['base_y']
-    
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        
-        current_y = start_y + (end_y - start_y) * progress
+        start_y = screen_height if show_tray else open_y
+    end_y = open_y if show_tray else screen_height
+
+    def update(current_y):
         settings_ui['tray_rect'].y = current_y
         
-        # Update tab position to slide with tray
-        tab_current_y = tab_start_y + (tab_end_y - tab_start_y) * progress
-        settings_tab['rect'].y = tab_current_y
+        # The tab slides with the tray, sitting on top of it
+        settings_tab['rect'].y = current_y - settings_tab['height']
         
         # Update all related positions
         settings_ui['title_rect'].y = current_y + 40
@@ -531,15 +554,16 @@ def animate_settings_tray(settings_ui, settings_tab, show_tray, duration=300):
         settings_ui['ip_label_rect'].y = current_y + 325
         
         # Update tab layer
-        remove_layer('settings_tab')
         add_layer(settings_tab['surface'], settings_tab['rect'], key='settings_tab')
         
         draw_settings_tray(settings_ui, True)
-        draw_frame()
-        
-        if progress >= 1.0:
-            break
-        clock.tick(60)
+
+    slide = Tween(duration * abs(end_y - start_y) / tray_height, update, start_y, end_y)
+    if show_tray:
+        timeline.play('settings_tray', slide)
+    else:
+        # A closed tray stays in the scene, hidden, until it is opened again
+        timeline.play('settings_tray', Sequence(slide, Call(lambda: [hide_layer(key) for key in TRAY_LAYERS])))
 
 def handle_settings_interaction(settings_ui, event_pos):
     """Handle interactions with settings tray elements"""
@@ -561,25 +585,33 @@ def handle_settings_interaction(settings_ui, event_pos):
     
     return None
 
-def update_oz_coefficient(settings_ui, new_value):
-    """Update the OZ_COEFFICIENT setting and slider position"""
-    global OZ_COEFFICIENT
-    OZ_COEFFICIENT = max(settings_ui['min_val'], min(settings_ui['max_val'], new_value))
-    
-    # Update slider handle position
-    slider_handle_x = settings_ui['slider_x'] + (OZ_COEFFICIENT - settings_ui['min_val']) / (settings_ui['max_val'] - settings_ui['min_val']) * settings_ui['slider_width']
+def update_oz_coefficient(settings_ui, new_value, persist=False):
+    """Update the OZ_COEFFICIENT setting. The slider follows through the settings subscription"""
+    value = max(settings_ui['min_val'], min(settings_ui['max_val'], new_value))
+    registry.set('OZ_COEFFICIENT', round(value, 1), persist=persist)
+
+def update_oz_slider(settings_ui):
+    """Move the slider handle and label to the current OZ_COEFFICIENT value"""
+    value = max(settings_ui['min_val'], min(settings_ui['max_val'], OZ_COEFFICIENT))
+    slider_handle_x = settings_ui['slider_x'] + (value - settings_ui['min_val']) / (settings_ui['max_val'] - settings_ui['min_val']) * settings_ui['slider_width']
     settings_ui['slider_handle_rect'].x = slider_handle_x - 10
     
     # Update slider label
-    slider_font = pygame.font.SysFont(None, 32)
-    settings_ui['slider_label'] = slider_font.render(f"Time per oz: {OZ_COEFFICIENT:.1f}s", True, (255, 255, 255))
+    settings_ui['slider_label'] = render_text(f"Time per oz: {OZ_COEFFICIENT:.1f}s", 32)
 
 def toggle_pump_direction():
-    """Toggle the INVERT_PUMP_PINS setting"""
-    global INVERT_PUMP_PINS
-    INVERT_PUMP_PINS = not INVERT_PUMP_PINS
+    """Toggle the INVERT_PUMP_PINS setting for this process, the controller and the app"""
+    registry.set('INVERT_PUMP_PINS', not INVERT_PUMP_PINS)
     logger.info(f'Pump direction inverted: {INVERT_PUMP_PINS}')
 
+# Settings that only take effect on restart are left alone when the settings file changes
+RESTART_SETTINGS = ('DEBUG', 'FULL_SCREEN', 'WINDOW_WIDTH', 'WINDOW_HEIGHT')
+
+@registry.subscribe
+def apply_settings(changed):
+    """Rebind settings pushed by the settings registry"""
+    globals().update({name: value for name, value in changed.items() if name not in RESTART_SETTINGS})
+
 def generate_new_drink_menu():
     """Generate a new drink menu using OpenAI"""
     import openai
@@ -610,8 +642,7 @@ def generate_new_drink_menu():
         new_drinks = [""] + [line.strip() for line in response.choices[0].message.content.split('\n') if line.strip()]
         
         # Update drink_options.json
-        with open('drink_options.json', 'w') as f:
-            json.dump({"drinks": new_drinks}, f, indent=2)
+        atomic_write_json('drink_options.json', {"drinks": new_drinks}, indent=2)
         
         logger.info(f"Generated {len(new_drinks)-1} new drink options")
         return new_drinks
@@ -622,7 +653,7 @@ def generate_new_drink_menu():
 
 def run_interface():
 
-    def load_cocktail_image(cocktail):
+    def load_cocktail_image(cocktail, wait=True):
         """Given a Cocktail object, load the image for that cocktail and scale it to the screen size"""
         if cocktail.get('is_qr_slide'):
             # For QR code slides, use the QR surface directly
@@ -635,110 +666,183 @@ def run_interface():
             else:
                 return None
         
-        # Regular cocktail image loading (case-insensitive on filesystems)
-        path = get_cocktail_image_path(cocktail)
+        return load_logo(cocktail.get('normal_name', ''), wait)
+
+    def load_logo(name, wait=True):
+        """Load the logo of a cocktail scaled for the carousel. With wait=False it is only returned if it
+        has already been decoded, so the render loop never stalls on it."""
+        # The catalog resolves the file name case-insensitively for Linux/Pi
+        path = get_cocktail_image_path({'normal_name': name})
         try:
-            # Resolve path case-insensitively for Linux/Pi
-            logo_dir = os.path.dirname(path)
-            expected = os.path.basename(path).lower()
-            resolved_path = None
-            if os.path.isdir(logo_dir):
-                for fname in os.listdir(logo_dir):
-                    if fname.lower() == expected:
-                        resolved_path = os.path.join(logo_dir, fname)
-                        break
+            resolved_path = get_catalog().image_path(name)
             if not resolved_path:
                 logger.error(f"Logo not found (case-insensitive): {path}")
                 return None
-            img = pygame.image.load(resolved_path)
             common_scale = 0.5  # Scale all cocktails by 50% to match QR sizing
-            img = pygame.transform.scale(
-                img,
-                (int(screen_width * COCKTAIL_IMAGE_SCALE * common_scale), int(screen_height * COCKTAIL_IMAGE_SCALE * common_scale))
-            )
-            return img
+            size = (int(screen_width * COCKTAIL_IMAGE_SCALE * common_scale), int(screen_height * COCKTAIL_IMAGE_SCALE * common_scale))
+            if not wait:
+                return image_cache.peek(resolved_path, size)
+            return image_cache.get(resolved_path, size)
         except Exception as e:
             logger.exception(f'Error loading {path}')
             return None
 
-    def load_cocktail(index):
-        """Load a cocktail based on a provided index. Also pre-load the images for the previous and next cocktails"""
+    def load_cocktail(index, direction=0):
+        """Load a cocktail based on a provided index. The previous and next images are used if they have
+        been prefetched, and the cocktails around the new one are queued for prefetching."""
         current_cocktail = cocktails[index]
         current_image = load_cocktail_image(current_cocktail)
         current_cocktail_name = current_cocktail.get('normal_name', '')
-        previous_cocktail = cocktails[(index - 1) % len(cocktails)]
-        previous_image = load_cocktail_image(previous_cocktail)
-        next_cocktail = cocktails[(index + 1) % len(cocktails)]
-        next_image = load_cocktail_image(next_cocktail)
+        previous_image, next_image = neighbor_images(index)
+        prefetch_neighbors(index, direction)
         return current_cocktail, current_image, current_cocktail_name, previous_image, next_image
 
+    def neighbor_images(index):
+        """The images either side of index that are ready, None for those still being prefetched"""
+        previous_image = load_cocktail_image(cocktails[(index - 1) % len(cocktails)], wait=False)
+        next_image = load_cocktail_image(cocktails[(index + 1) % len(cocktails)], wait=False)
+        return previous_image, next_image
+
+    def prefetch_neighbors(index, direction=0):
+        """Decode the PREFETCH_COUNT cocktails either side of index in the background, those in the
+        direction of the last swipe first"""
+        order = prefetch_order(index, len(cocktails), PREFETCH_COUNT, direction)
+        prefetcher.prefetch([cocktails[i].get('normal_name', '') for i in order if not cocktails[i].get('is_qr_slide')])
+
+    def position_carousel(offset, direction, label=False):
+        """Lay out the current cocktail moved by offset, with the cocktail on the side it is moving
+        away from (direction 1 for the next one, -1 for the previous one) coming in behind it"""
+        add_layer(
+            current_image,
+            get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=offset).topleft,
+            key='current_cocktail', z=Z_CAROUSEL
+        )
+        if direction > 0 and next_image is not None:
+            add_layer(
+                next_image,
+                get_centered_rect_for_surface(next_image, screen_width, screen_height, offset_x=screen_width + offset).topleft,
+                key='next_cocktail', z=Z_CAROUSEL
+            )
+        elif direction < 0 and previous_image is not None:
+            add_layer(
+                previous_image,
+                get_centered_rect_for_surface(previous_image, screen_width, screen_height, offset_x=-screen_width + offset).topleft,
+                key='previous_cocktail', z=Z_CAROUSEL
+            )
+        if label:
+            # Text just below the current image with padding
+            text_surface = render_label(current_cocktail)
+            image_rect = get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=offset)
+            text_rect = text_surface.get_rect(midtop=(screen_width // 2, image_rect.bottom + 24))
+            add_layer(text_surface, text_rect, key='cocktail_name', z=Z_CAROUSEL)
+
+    def finish_swipe(direction):
+        """Make the cocktail swiped to the current one"""
+        nonlocal current_index, current_cocktail, current_image, current_cocktail_name, previous_image, next_image
+        current_index = (current_index + direction) % len(cocktails)
+        current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index, direction=direction)
+
+        # Animate both extra logos zooming together.
+        if single_logo and double_logo:
+            animate_both_logos_zoom(single_logo, double_logo, single_rect, double_rect, base_size=150, target_size=175, duration=300)
+
+    def tap_pour(size, logo, rect, layer_key):
+        """Pour the current cocktail once the logo's pop is over. Only one pour can be waiting on a pop:
+        taps on either logo in the meantime are ignored, so a quick Single then Double pours one drink."""
+        nonlocal pending_pour
+        if pending_pour is not None and timeline.get(pending_pour[0]) is pending_pour[1]:
+            return
+        pending_pour = None
+
+        def pour(cocktail=current_cocktail):
+            nonlocal pending_pour
+            pending_pour = None
+            # Settle the other logo, its pop must not run on after the drink is done
+            for other_key in ('single_logo', 'double_logo'):
+                if other_key != layer_key:
+                    timeline.stop(other_key, finish=True)
+            show_pouring_and_loading(make_drink(cocktail, size))
+
+        if logo:
+            pending_pour = (layer_key, animate_logo_click(logo, rect, base_size=150, target_size=220, layer_key=layer_key, duration=150, on_complete=pour))
+        else:
+            pour()
+
+    def render_label(cocktail):
+        """The name shown under a cocktail"""
+        is_qr = cocktail.get('is_qr_slide')
+        label_font_size = 32 if is_qr else 60
+        drink_name = cocktail.get('url', 'Scan QR Code') if is_qr else cocktail.get('normal_name', '')
+        return render_text(drink_name, label_font_size)
+
+    def refresh_cocktails():
+        """Reload the cocktail list, reusing the QR slide once it has been built"""
+        nonlocal qr_slide
+        if qr_slide is None:
+            cocktails = get_valid_cocktails()
+            if cocktails:
+                return cocktails
+            qr_slide = create_qr_code_slide()
+        update_qr_slide()
+        return get_cocktails_with_qr(qr_slide)
+
+    def update_qr_slide():
+        """Rebuild the QR slide in the background if the local IP changed since it was built, e.g. the
+        kiosk booted before the network was up"""
+        if qr_slide is None or 'qr_slide' in background_jobs:
+            return
+        local_ip = get_local_ip()
+        if local_ip != qr_slide['ip']:
+            logger.info(f'Local IP changed from {qr_slide["ip"]} to {local_ip}, rebuilding the QR slide')
+            background_jobs['qr_slide'] = background_executor.submit(create_qr_code_slide, local_ip)
+
+    # Progressive boot: the background and the first cocktail are drawn straight away. The QR slide
+    # (which has to look up the local IP) and the nav icons are loaded in the background and picked up
+    # by the main loop as they finish. The neighbouring cocktails arrive through the prefetcher.
+    prefetcher = Prefetcher(load_logo, event_type=PREFETCH_EVENT)
+    background_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    background_jobs = {}
+
     # Load the static background image (tipsy.jpg)
     try:
-        background = pygame.image.load('./tipsy.jpg')
-        background = pygame.transform.scale(background, screen_size)
-        add_layer(background, (0, 0), key='background')
+        background = load_image('./tipsy.jpg', screen_size, alpha=False)
+        add_layer(background, (0, 0), key='background', z=Z_BACKGROUND, static=True)
     except Exception as e:
         logger.exception('Error loading background image (tipsy.jpg)')
-        add_layer((0, 0), function=screen.fill, key='background')
-    
-    cocktails = get_cocktails_with_qr()
-    
-    if not cocktails:
-        logger.critical('No valid cocktails found in cocktails.json')
-        pygame.quit()
-        return
+        add_layer((0, 0), function=screen.fill, key='background', z=Z_BACKGROUND, static=True)
+
+    qr_slide = None
+    cocktails = refresh_cocktails()
+    if qr_slide is None:
+        background_jobs['qr_slide'] = background_executor.submit(create_qr_code_slide)
     current_index = 0
-    current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
+    current_cocktail = cocktails[current_index]
+    current_cocktail_name = current_cocktail.get('normal_name', '')
+    current_image = load_cocktail_image(current_cocktail)
+    previous_image = next_image = None
+    if current_image:
+        add_layer(
+            current_image,
+            get_centered_rect_for_surface(current_image, screen_width, screen_height).topleft,
+            key='current_cocktail', z=Z_CAROUSEL
+        )
+    draw_frame()
+    boot_metrics['time_to_first_frame_ms'] = pygame.time.get_ticks()
+    logger.info(f'Time to first frame: {boot_metrics["time_to_first_frame_ms"]} ms')
+
+    prefetch_neighbors(current_index)
+    background_jobs['nav_icons'] = background_executor.submit(load_nav_icons)
     reload_time = pygame.time.get_ticks()
 
     margin = 50  # adjust as needed for spacing
-    # Load single & double buttons and scale them to 75% of original (base size: 150x150)
-    try:
-        single_logo = pygame.image.load('nav-photos/single.png')
-        single_logo = pygame.transform.scale(single_logo, (150, 150))
-        single_rect = pygame.Rect(margin, (screen_height - 150) // 2, 150, 150)
-        add_layer(single_logo, single_rect, key='single_logo')
-    except Exception as e:
-        logger.exception('Error loading nav-photos/single.png:')
-        single_logo = None
-    try:
-        double_logo = pygame.image.load('nav-photos/double.png')
-        double_logo = pygame.transform.scale(double_logo, (150, 150))
-        double_rect = pygame.Rect(screen_width - margin - 150, (screen_height - 150) // 2, 150, 150)
-        add_layer(double_logo, double_rect, key='double_logo')
-    except Exception as e:
-        logger.exception('Error loading nav-photos/double.png')
-        double_logo = None
-    if ALLOW_FAVORITES:
-        favorite_rect = pygame.Rect(screen_width - (margin * 3), 150, 150, 150)
-        try:
-            favorite_logo = pygame.image.load('nav-photos/favorite.png')
-            favorite_logo = pygame.transform.scale(favorite_logo, (50, 50))
-        except Exception:
-            logger.exception('Error loading nav-photos/favorite.png')
-            favorite_logo = None
-        try:
-            unfavorite_logo = pygame.image.load('nav-photos/unfavorite.png')
-            unfavorite_logo = pygame.transform.scale(unfavorite_logo, (50, 50))
-        except Exception:
-            logger.exception('Error loading nav-photos/unfavorite.png')
-            unfavorite_logo = None
-    else:
-        favorite_rect = None
-        favorite_logo = None
-        unfavorite_logo = None
-    if SHOW_RELOAD_COCKTAILS_BUTTON:
-        reload_cocktails_rect = pygame.Rect(margin * 2, 150, 50, 50)
-        try:
-            reload_logo = pygame.image.load('nav-photos/reload.png')
-            reload_logo = pygame.transform.scale(reload_logo, (50, 50))
-            add_layer(reload_logo, reload_cocktails_rect, key='reload_logo')
-        except Exception as e:
-            logger.exception('Error loading nav-photos/reload.png')
-            reload_logo = None
-    else:
-        reload_cocktails_rect = None
-        reload_logo = None
+    # Single & double buttons are 150x150, the icons arrive with the nav_icons job
+    single_rect = pygame.Rect(margin, (screen_height - 150) // 2, 150, 150)
+    double_rect = pygame.Rect(screen_width - margin - 150, (screen_height - 150) // 2, 150, 150)
+    favorite_rect = pygame.Rect(screen_width - (margin * 3), 150, 150, 150) if ALLOW_FAVORITES else None
+    reload_cocktails_rect = pygame.Rect(margin * 2, 150, 50, 50) if SHOW_RELOAD_COCKTAILS_BUTTON else None
+    single_logo = double_logo = favorite_logo = unfavorite_logo = reload_logo = None
+    # The logo key and pop animation a tapped pour is waiting on
+    pending_pour = None
 
     # Initialize settings tray and tab
     settings_ui = create_settings_tray()
@@ -749,7 +853,14 @@ def run_interface():
     tab_drag_start_y = 0
     
     # Add tabs to layers
-    add_layer(settings_tab['surface'], settings_tab['rect'], key='settings_tab')
+    add_layer(settings_tab['surface'], settings_tab['rect'], key='settings_tab', z=Z_TAB)
+
+    @registry.subscribe
+    def on_settings_changed(changed):
+        if 'OZ_COEFFICIENT' in changed:
+            update_oz_slider(settings_ui)
+        if 'IMAGE_CACHE_MB' in changed:
+            image_cache.set_budget(int(changed['IMAGE_CACHE_MB'] * 1024 * 1024))
 
     dragging = False
     drag_start_x = 0
@@ -759,22 +870,91 @@ def run_interface():
     running = True
     last_refresh_check = pygame.time.get_ticks()
     refresh_check_interval = 1000  # Check every 1 second
+    last_ip_check = last_refresh_check
+    ip_check_interval = 30000  # The QR slide follows the local IP, checked every 30 seconds
+    loop_stats = LoopStats()
     
     while running:
+        # Pick up whatever the background boot work has finished
+        for job, future in list(background_jobs.items()):
+            if not future.done():
+                continue
+            del background_jobs[job]
+            try:
+                result = future.result()
+            except Exception:
+                logger.exception(f'Error in background boot job {job}')
+                continue
+            if job == 'qr_slide':
+                if qr_slide is None:
+                    cocktails = cocktails + [result]
+                else:
+                    # Rebuilt for a new IP
+                    cocktails = [result if cocktail is qr_slide else cocktail for cocktail in cocktails]
+                qr_slide = result
+                set_access_url(settings_ui, qr_slide['url'])
+                if current_cocktail.get('is_qr_slide'):
+                    current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
+                # The slide list wrapped around, so the neighbours may have changed
+                previous_image, next_image = neighbor_images(current_index)
+                prefetch_neighbors(current_index)
+            elif job == 'nav_icons':
+                single_logo = result['single_logo']
+                double_logo = result['double_logo']
+                favorite_logo = result.get('favorite_logo')
+                unfavorite_logo = result.get('unfavorite_logo')
+                reload_logo = result.get('reload_logo')
+                if single_logo:
+                    add_layer(single_logo, single_rect, key='single_logo', z=Z_NAV, static=True)
+                if double_logo:
+                    add_layer(double_logo, double_rect, key='double_logo', z=Z_NAV, static=True)
+                if reload_logo:
+                    add_layer(reload_logo, reload_cocktails_rect, key='reload_logo', z=Z_NAV, static=True)
+            if not background_jobs and 'time_to_ready_ms' not in boot_metrics:
+                boot_metrics['time_to_ready_ms'] = pygame.time.get_ticks()
+                logger.info(f'Boot complete after {boot_metrics["time_to_ready_ms"]} ms')
+
         # Check for refresh signals periodically
         current_time = pygame.time.get_ticks()
         if current_time - last_refresh_check > refresh_check_interval:
+            registry.poll()
+            if current_time - last_ip_check > ip_check_interval:
+                update_qr_slide()
+                last_ip_check = current_time
             if check_for_refresh_signal():
                 logger.info("Refreshing cocktails due to app signal")
-                cocktails = get_cocktails_with_qr()
+                cocktails = refresh_cocktails()
                 current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
             last_refresh_check = current_time
         
-        events = pygame.event.get()
+        # At rest the loop sleeps until there is input or a timer (refresh check, auto reload) is due,
+        # instead of drawing 60 frames a second. The refresh check also keeps the heartbeat fresh.
+        # Gestures, animations and the boot jobs run at full frame rate.
+        animating = dragging or tab_dragging or slider_dragging or bool(background_jobs) or timeline.running()
+        if animating:
+            events = pygame.event.get()
+        else:
+            timers = [last_refresh_check + refresh_check_interval]
+            if RELOAD_COCKTAILS_TIMEOUT:
+                timers.append(reload_time + RELOAD_COCKTAILS_TIMEOUT)
+            event = pygame.event.wait(max(1, min(timers) - pygame.time.get_ticks() + 1))
+            events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+        loop_stats.wake(idle=not animating)
+        report = loop_stats.report()
+        if report:
+            logger.info(f'Render loop: {report}')
+
         for event in events:
             # Handle dropdown events globally if drink tray is visible
             # The drink management tray is removed, so this block is no longer relevant.
             
+            if event.type == PREFETCH_EVENT:
+                # A prefetched neighbour is ready, it is in the cache now
+                if next_image is None and cocktails[(current_index + 1) % len(cocktails)].get('normal_name') == event.key:
+                    next_image = load_logo(event.key, wait=False)
+                if previous_image is None and cocktails[(current_index - 1) % len(cocktails)].get('normal_name') == event.key:
+                    previous_image = load_logo(event.key, wait=False)
+                continue
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.KEYDOWN:
@@ -793,13 +973,11 @@ def run_interface():
                     if interaction == 'slider_drag':
                         slider_dragging = True
                     elif interaction == 'prime_pumps':
-                        # Import and call prime_pumps function
                         from controller import prime_pumps
-                        prime_pumps(duration=10)
+                        run_maintenance(prime_pumps, duration=10)
                     elif interaction == 'clean_pumps':
-                        # Import and call clean_pumps function
                         from controller import clean_pumps
-                        clean_pumps(duration=10)
+                        run_maintenance(clean_pumps, duration=10)
                     elif interaction == 'toggle_switch':
                         # Toggle pump direction
                         toggle_pump_direction()
@@ -811,6 +989,7 @@ def run_interface():
                     animate_settings_tray(settings_ui, settings_tab, settings_visible)
                     continue
                 
+                timeline.stop('carousel', finish=True)
                 dragging = True
                 drag_start_x = event.pos[0]
             if event.type == pygame.MOUSEMOTION:
@@ -854,33 +1033,26 @@ def run_interface():
                     continue
                 elif slider_dragging:
                     slider_dragging = False
+                    # Persist the final value once the drag is over
+                    registry.set('OZ_COEFFICIENT', OZ_COEFFICIENT)
                     continue
                 elif dragging:
                     # If it's a click (minimal drag), check extra logos.
                     if abs(drag_offset) < 10:
                         pos = event.pos
                         if single_rect.collidepoint(pos):
-                            # Animate single logo click
-                            if single_logo:
-                                animate_logo_click(single_logo, single_rect, base_size=150, target_size=220, layer_key='single_logo', duration=150)
-
-                            executor_watcher = make_drink(current_cocktail, 'single')
-
-                            show_pouring_and_loading(watcher=executor_watcher)
+                            # Animate single logo click, the pour starts once it is done
+                            tap_pour('single', single_logo, single_rect, 'single_logo')
 
                         elif double_rect.collidepoint(pos):
-                            # Animate double logo click
-                            if double_logo:
-                                animate_logo_click(double_logo, double_rect, base_size=150, target_size=220, layer_key='double_logo', duration=150)
-
-                            executor_watcher = make_drink(current_cocktail, 'double')
-
-                            show_pouring_and_loading(executor_watcher)
+                            # Animate double logo click, the pour starts once it is done
+                            tap_pour('double', double_logo, double_rect, 'double_logo')
                     
                         elif reload_cocktails_rect and reload_cocktails_rect.collidepoint(pos):
                             logger.debug('Reloading cocktails due to reload button press')
-                            animate_logo_rotate(reload_logo, reload_cocktails_rect, layer_key='reload_logo')
-                            cocktails = get_cocktails_with_qr()
+                            if reload_logo:
+                                animate_logo_rotate(reload_logo, reload_cocktails_rect, layer_key='reload_logo')
+                            cocktails = refresh_cocktails()
                             current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
 
                         elif favorite_rect and favorite_rect.collidepoint(pos):
@@ -891,140 +1063,55 @@ def run_interface():
                                 logger.debug(f'Favoriting current cocktail: {current_index}')
                                 current_index = favorite_cocktail(current_index)
                                 
-                            cocktails = get_cocktails_with_qr()
+                            cocktails = refresh_cocktails()
                             current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
                             
                         dragging = False
                         drag_offset = 0
                         continue  # Skip further swipe handling.
-                    # Otherwise, it's a swipe.
+                    # Otherwise, it's a swipe. The carousel animates from where it was let go while
+                    # the loop keeps handling input; touching it again finishes the swipe straight away.
                     if abs(drag_offset) > screen_width / 4:
-                        if drag_offset < 0:
-                            target_offset = -screen_width
-                            new_index = (current_index + 1) % len(cocktails)
-                        else:
-                            target_offset = screen_width
-                            new_index = (current_index - 1) % len(cocktails)
-                        start_offset = drag_offset
-                        duration = 300
-                        start_time = pygame.time.get_ticks()
-                        while True:
-                            elapsed = pygame.time.get_ticks() - start_time
-                            progress = min(elapsed / duration, 1.0)
-                            current_offset = start_offset + (target_offset - start_offset) * progress
-                            add_layer(
-                                current_image,
-                                get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=current_offset).topleft,
-                                key='current_cocktail'
-                            )
-                            if drag_offset < 0:
-                                if next_image is not None:
-                                    add_layer(
-                                        next_image,
-                                        get_centered_rect_for_surface(next_image, screen_width, screen_height, offset_x=screen_width + current_offset).topleft,
-                                        key='next_cocktail'
-                                    )
-                            else:
-                                if previous_image is not None:
-                                    add_layer(
-                                        previous_image,
-                                        get_centered_rect_for_surface(previous_image, screen_width, screen_height, offset_x=-screen_width + current_offset).topleft,
-                                        key='previous_cocktail'
-                                    )
-                            draw_frame()
-                            if progress >= 1.0:
-                                break
-                            clock.tick(60)
-                        current_index = new_index
-                        current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
-
-                        # Animate both extra logos zooming together.
-                        if single_logo and double_logo:
-                            animate_both_logos_zoom(single_logo, double_logo, single_rect, double_rect, base_size=150, target_size=175, duration=300)
+                        direction = 1 if drag_offset < 0 else -1
+                        timeline.play('carousel', Sequence(
+                            Tween(300, lambda offset, direction=direction: position_carousel(offset, direction), drag_offset, -direction * screen_width),
+                            Call(lambda direction=direction: finish_swipe(direction)),
+                        ))
                     else:
                         # Animate snapping back if swipe is insufficient.
-                        start_offset = drag_offset
-                        duration = 300
-                        start_time = pygame.time.get_ticks()
-                        while True:
-                            elapsed = pygame.time.get_ticks() - start_time
-                            progress = min(elapsed / duration, 1.0)
-                            current_offset = start_offset * (1 - progress)
-                            add_layer(
-                                current_image,
-                                get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=current_offset).topleft,
-                                key='current_cocktail'
-                            )
-                            # Text just below the current image with padding
-                            is_qr = current_cocktail.get('is_qr_slide')
-                            label_font_size = 32 if is_qr else 60
-                            font = pygame.font.SysFont(None, label_font_size)
-                            drink_name = current_cocktail.get('url', 'Scan QR Code') if is_qr else current_cocktail_name
-                            text_surface = font.render(drink_name, True, (255, 255, 255))
-                            image_rect = get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=current_offset)
-                            text_rect = text_surface.get_rect(midtop=(screen_width // 2, image_rect.bottom + 24))
-                            add_layer(text_surface, text_rect, key='cocktail_name')
-                            draw_frame()
-                            if progress >= 1.0:
-                                break
-                            clock.tick(60)
+                        direction = (drag_offset < 0) - (drag_offset > 0)
+                        timeline.play('carousel', Tween(300, lambda offset, direction=direction: position_carousel(offset, direction, label=True), drag_offset, 0))
                     dragging = False
                     drag_offset = 0
 
+        timeline.update()
+
         # Main drawing (when not in special animation)
         if RELOAD_COCKTAILS_TIMEOUT and pygame.time.get_ticks() - reload_time > RELOAD_COCKTAILS_TIMEOUT:
             logger.debug('Reloading cocktails due to auto reload timeout')
-            cocktails = get_cocktails_with_qr()
+            cocktails = refresh_cocktails()
             current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
             reload_time = pygame.time.get_ticks()
 
-        if dragging:
-            remove_layer('cocktail_name')
-            remove_layer('favorite_logo')
-            add_layer(
-                current_image,
-                get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=drag_offset).topleft,
-                key='current_cocktail'
-            )
-            if drag_offset < 0:
-                if next_image is not None:
-                    add_layer(
-                        next_image,
-                        get_centered_rect_for_surface(next_image, screen_width, screen_height, offset_x=screen_width + drag_offset).topleft,
-                        key='next_cocktail'
-                    )
-            elif drag_offset > 0:
-                if previous_image is not None:
-                    add_layer(
-                        previous_image,
-                        get_centered_rect_for_surface(previous_image, screen_width, screen_height, offset_x=-screen_width + drag_offset).topleft,
-                        key='previous_cocktail'
-                    )
+        carousel_moving = timeline.running('carousel')
+        if carousel_moving:
+            pass  # The swipe animation lays out the cocktails
+        elif dragging:
+            hide_layer('cocktail_name')
+            hide_layer('favorite_logo')
+            position_carousel(drag_offset, (drag_offset < 0) - (drag_offset > 0))
         else:
-            remove_layer('next_cocktail')
-            remove_layer('previous_cocktail')
-            add_layer(
-                current_image,
-                get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=0).topleft,
-                key='current_cocktail'
-            )
-            # Text just below the current image with padding
-            is_qr = current_cocktail.get('is_qr_slide')
-            label_font_size = 32 if is_qr else 60
-            font = pygame.font.SysFont(None, label_font_size)
-            drink_name = current_cocktail.get('url', 'Scan QR Code') if is_qr else current_cocktail_name
-            text_surface = font.render(drink_name, True, (255, 255, 255))
-            image_rect = get_centered_rect_for_surface(current_image, screen_width, screen_height, offset_x=0)
-            text_rect = text_surface.get_rect(midtop=(screen_width // 2, image_rect.bottom + 24))
-            add_layer(text_surface, text_rect, key='cocktail_name')
+            hide_layer('next_cocktail')
+            hide_layer('previous_cocktail')
+            position_carousel(0, 0, label=True)
             if ALLOW_FAVORITES:
                 if current_cocktail.get('favorite', False) and favorite_logo:
-                    add_layer(favorite_logo, favorite_rect, key='favorite_logo')
+                    add_layer(favorite_logo, favorite_rect, key='favorite_logo', z=Z_BUTTONS)
                 elif unfavorite_logo:
-                    add_layer(unfavorite_logo, favorite_rect, key='favorite_logo')
+                    add_layer(unfavorite_logo, favorite_rect, key='favorite_logo', z=Z_BUTTONS)
         
         # Update tab positions when not animating
-        if not tab_dragging:
+        if not tab_dragging and not timeline.running('settings_tray'):
             if settings_visible:
                 # Tab should be at the top of the tray
                 settings_tab['rect'].y = settings_ui['tray_rect'].y - settings_tab['height']
@@ -1033,20 +1120,34 @@ def run_interface():
                 settings_tab['rect'].y = settings_tab['base_y']
             
             # Update settings tab layer
-            remove_layer('settings_tab')
             add_layer(settings_tab['surface'], settings_tab['rect'], key='settings_tab')
         
         # Draw settings tray if visible
         if settings_visible:
             draw_settings_tray(settings_ui, True)
         
-        draw_frame()
+        draw_frame(full=dragging or carousel_moving)
         
         # Draw custom dropdowns AFTER draw_frame() so they appear on top
         # The drink management tray is removed, so this block is no longer relevant.
         
-        clock.tick(60)
+        if animating:
+            clock.tick(60)
+    registry.unsubscribe(on_settings_changed)
+    prefetcher.shutdown()
+    background_executor.shutdown(wait=False)
+    logger.info(f'Image cache: {image_cache.stats()}')
+    logger.info(f'Frames drawn: {compositor.stats}')
+    logger.info(f'Text cache: {text_cache.stats()}')
+    logger.info(f'Sprite cache: {sprites.stats()}')
+    logger.info(f'Render loop: {loop_stats.snapshot()}')
     pygame.quit()
 
+def handle_sigterm(signum, frame):
+    """The supervisor stops the kiosk with SIGTERM, which by default skips atexit and with it the
+    favorites still waiting to be written. Exit normally instead."""
+    raise SystemExit(0)
+
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, handle_sigterm)
     run_interface()
\ No newline at end of file
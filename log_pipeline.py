@@ -0,0 +1,113 @@
+# log_pipeline.py
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+
+FILE_FORMAT = '%(asctime)s %(levelname)s %(threadName)s %(name)s: %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """Let each call site log at most `rate` records per `per` seconds (a token bucket per file and line).
+
+    Hot paths such as the motor_* debug logs can't flood the queue or the SD card. Warnings and above
+    always pass, and the next record that gets through says how many were suppressed.
+    """
+
+    def __init__(self, rate=20, per=1.0):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            tokens, last, suppressed = self.buckets.get(key, (self.rate, now, 0))
+            tokens = min(self.rate, tokens + (now - last) * self.rate / self.per)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self.buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record.msg = f'{record.msg} ({suppressed} similar messages suppressed)'
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a bounded queue that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Loggers hand records to a bounded in-memory queue. A single background thread (a QueueListener)
+    formats them and writes them to the console and a size-bounded rotating file, so slow writes never
+    stall a pump thread or the render loop."""
+
+    def __init__(self, level=logging.INFO, log_file=None, max_bytes=1024 * 1024, backup_count=3,
+                 queue_size=10000, rate=20, console=True):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.handler.addFilter(RateLimitFilter(rate=rate))
+        self.level = level
+
+        sinks = []
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+            sinks.append(console_handler)
+        if log_file:
+            log_dir = os.path.dirname(log_file)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+            file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+            sinks.append(file_handler)
+        self.sinks = sinks
+        self.listener = logging.handlers.QueueListener(self.queue, *sinks, respect_handler_level=True)
+
+    def start(self):
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+
+    def stop(self):
+        """Detach from the root logger and flush everything still queued"""
+        logging.getLogger().removeHandler(self.handler)
+        if self.listener._thread is not None:
+            self.listener.stop()
+        for sink in self.sinks:
+            sink.close()
+
+
+pipeline = None
+
+
+def setup_logging(level=logging.INFO, log_file=None, **kwargs):
+    """Route all logging through a LogPipeline, replacing one set up earlier in this process"""
+    global pipeline
+    if pipeline is not None:
+        pipeline.stop()
+    else:
+        atexit.register(lambda: pipeline and pipeline.stop())
+    pipeline = LogPipeline(level, log_file, **kwargs)
+    pipeline.start()
+    return pipeline
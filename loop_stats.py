@@ -0,0 +1,60 @@
+# loop_stats.py
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class LoopStats:
+    """Wakeups and CPU time of a render loop, reported once per `window` seconds.
+
+    Call `wake(idle)` once per loop iteration, saying whether the loop was waiting for events rather
+    than running at full frame rate. `report()` returns the figures for the window that just ended,
+    or None until a window has passed.
+    """
+
+    def __init__(self, window=60.0, clock=time.monotonic, cpu_clock=time.process_time):
+        self.window = window
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.last = None
+        self.reset()
+
+    def reset(self):
+        self.started = self.clock()
+        self.cpu_started = self.cpu_clock()
+        self.last_wake = (self.started, self.cpu_started)
+        self.wakeups = 0
+        self.idle_wakeups = 0
+        self.idle_seconds = 0.0
+        self.idle_cpu_seconds = 0.0
+
+    def wake(self, idle):
+        """Count a loop iteration. `idle` if the loop blocked waiting for events before it, in which case
+        the time since the previous iteration (the wait and the work that led to it) counts as idle."""
+        now, cpu = self.clock(), self.cpu_clock()
+        if idle:
+            self.idle_seconds += now - self.last_wake[0]
+            self.idle_cpu_seconds += cpu - self.last_wake[1]
+            self.idle_wakeups += 1
+        self.wakeups += 1
+        self.last_wake = (now, cpu)
+
+    def snapshot(self):
+        now, cpu = self.clock(), self.cpu_clock()
+        elapsed = max(now - self.started, 1e-9)
+        return {
+            'seconds': round(elapsed, 1),
+            'wakeups_per_second': round(self.wakeups / elapsed, 2),
+            'idle_seconds': round(self.idle_seconds, 1),
+            'idle_wakeups_per_second': round(self.idle_wakeups / self.idle_seconds, 2) if self.idle_seconds else 0.0,
+            'idle_cpu_percent': round(100 * self.idle_cpu_seconds / self.idle_seconds, 2) if self.idle_seconds else 0.0,
+            'cpu_percent': round(100 * (cpu - self.cpu_started) / elapsed, 2),
+        }
+
+    def report(self):
+        if self.clock() - self.started < self.window:
+            return None
+        self.last = self.snapshot()
+        self.reset()
+        return self.last
@@ -1,13 +1,14 @@
 # main.py
-import subprocess
 import sys
 
-# Launch the Pygame interface in a separate process.
-interface_process = subprocess.Popen([sys.executable, "interface.py"])
+from settings import HEARTBEAT_FILE
+from supervisor import Component, Supervisor, heartbeat_check, port_check
 
-# Launch the Streamlit app in a separate process.
-streamlit_process = subprocess.Popen(["streamlit", "run", "app.py"])
-
-# Wait for both processes to finish.
-interface_process.wait()
-streamlit_process.wait()
+if __name__ == '__main__':
+    # The interface starts first and the Streamlit app once the kiosk is drawing (or after a timeout),
+    # so the two don't fight over the Pi's cores at boot. Either is restarted if it crashes or hangs.
+    supervisor = Supervisor([
+        Component('interface', [sys.executable, 'interface.py'], health_check=heartbeat_check(HEARTBEAT_FILE, max_age=30)),
+        Component('streamlit', ['streamlit', 'run', 'app.py'], health_check=port_check('localhost', 8501), startup_grace=60),
+    ])
+    supervisor.run()
@@ -0,0 +1,86 @@
+# measurements.py
+import collections
+import functools
+import re
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+OZ_ML = 29.5735
+
+# Canonical unit -> millilitres per unit
+UNIT_ML = {
+    'ml': 1.0,
+    'cl': 10.0,
+    'oz': OZ_ML,
+    'tbsp': OZ_ML / 2,
+    'tsp': OZ_ML / 6,
+    'dash': OZ_ML / 32,
+    # A standard US shot, about 44 ml
+    'shot': OZ_ML * 1.5,
+}
+
+UNIT_ALIASES = {
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml', 'millilitre': 'ml', 'millilitres': 'ml',
+    'cl': 'cl', 'centiliter': 'cl', 'centiliters': 'cl', 'centilitre': 'cl', 'centilitres': 'cl',
+    'oz': 'oz', 'fl oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'dash': 'dash', 'dashes': 'dash',
+    'shot': 'shot', 'shots': 'shot',
+}
+
+UNICODE_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+# "2", "1.5", ".5", "1/2" or "1 1/2", then the rest of the text as the unit
+MEASUREMENT_PATTERN = re.compile(r'^\s*(?:(\d+)\s+(\d+)\s*/\s*(\d+)|(\d+)\s*/\s*(\d+)|(\d*\.?\d+))\s*(.*?)\s*$')
+
+Measurement = collections.namedtuple('Measurement', ['ml', 'amount', 'unit', 'unit_text', 'text'])
+Measurement.__doc__ = """A parsed ingredient quantity.
+ml is None when the quantity can't be poured (e.g. "4 leaves" or "to taste"). unit is the canonical unit,
+unit_text the unit as written, text the original string for display."""
+
+
+def lookup_unit(unit_text):
+    """Canonical unit for the text after the amount, allowing trailing words like "oz fresh lime juice"""
+    words = unit_text.lower().replace('.', '').split()
+    for length in (len(words), 2, 1):
+        unit = UNIT_ALIASES.get(' '.join(words[:length]))
+        if unit:
+            return unit
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_measurement(text):
+    """Parse a measurement like "2 oz", "1 1/2 oz", "30 ml" or "2 dashes". A number alone is in oz.
+    Results are cached, so each distinct string is only parsed once."""
+    normalized = str(text).strip()
+    for fraction, replacement in UNICODE_FRACTIONS.items():
+        normalized = normalized.replace(fraction, f' {replacement}')
+    match = MEASUREMENT_PATTERN.match(normalized)
+    if not match:
+        return Measurement(None, None, None, '', text)
+    whole, numerator, denominator, simple_numerator, simple_denominator, decimal, unit_text = match.groups()
+    try:
+        if whole is not None:
+            amount = int(whole) + int(numerator) / int(denominator)
+        elif simple_numerator is not None:
+            amount = int(simple_numerator) / int(simple_denominator)
+        else:
+            amount = float(decimal)
+    except ZeroDivisionError:
+        return Measurement(None, None, None, '', text)
+    unit = lookup_unit(unit_text) if unit_text else 'oz'
+    ml = amount * UNIT_ML[unit] if unit else None
+    return Measurement(ml, amount, unit, unit_text, text)
+
+
+def to_oz(measurement):
+    return measurement.ml / OZ_ML
+
+
+def format_measurement(measurement, amount):
+    """The measurement's text with a new amount, keeping the unit as it was written"""
+    return f'{round(amount, 2):g} {measurement.unit_text}'.strip()
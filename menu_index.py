@@ -0,0 +1,98 @@
+# menu_index.py
+import logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_ingredient(name):
+    """Ingredients match pumps the way the controller matches them: case and surrounding spaces don't count"""
+    return name.strip().lower()
+
+
+def bit_count(bits):
+    return bin(bits).count('1')
+
+
+def iter_bits(bits):
+    """Positions of the set bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class Coverage:
+    """What a pump configuration can pour from a MenuIndex. Cocktail sets are bitsets over the index positions."""
+
+    def __init__(self, makeable, near_misses, missing_by_cocktail, unlocks):
+        self.makeable = makeable
+        self.near_misses = near_misses
+        # position -> the one ingredient a near miss is missing
+        self.missing_by_cocktail = missing_by_cocktail
+        # (ingredient, number of near misses it would make pourable), most first
+        self.unlocks = unlocks
+
+
+class MenuIndex:
+    """Inverted index from ingredient to the cocktails that use it, as a bitset over cocktail positions.
+
+    `coverage()` folds the bitsets of the ingredients that aren't on a pump into "missing at least one"
+    and "missing at least two" sets, so working out the makeable menu is a few big-int operations per
+    missing ingredient rather than a set comparison per cocktail. The last result is cached until the
+    available ingredients change.
+    """
+
+    def __init__(self, cocktails):
+        self.cocktails = cocktails
+        self.all = (1 << len(cocktails)) - 1
+        # normalized ingredient -> bitset of the cocktails that use it
+        self.users = {}
+        for position, cocktail in enumerate(cocktails):
+            for ingredient in cocktail.get('ingredients', {}):
+                key = normalize_ingredient(ingredient)
+                self.users[key] = self.users.get(key, 0) | (1 << position)
+        self.cached_available = None
+        self.cached_coverage = None
+
+    def coverage(self, available):
+        """Get the Coverage for an iterable of ingredient names that are on a pump"""
+        available = frozenset(normalize_ingredient(ingredient) for ingredient in available if ingredient)
+        if available == self.cached_available:
+            return self.cached_coverage
+
+        once = 0
+        twice = 0
+        missing = [(ingredient, users) for ingredient, users in self.users.items() if ingredient not in available]
+        for ingredient, users in missing:
+            twice |= once & users
+            once |= users
+        near_misses = once & ~twice
+
+        missing_by_cocktail = {}
+        unlocks = []
+        for ingredient, users in missing:
+            unlocked = users & near_misses
+            if unlocked:
+                unlocks.append((ingredient, bit_count(unlocked)))
+                for position in iter_bits(unlocked):
+                    missing_by_cocktail[position] = ingredient
+        unlocks.sort(key=lambda unlock: unlock[1], reverse=True)
+
+        self.cached_available = available
+        self.cached_coverage = Coverage(self.all & ~once, near_misses, missing_by_cocktail, unlocks)
+        return self.cached_coverage
+
+    def move(self, old_position, new_position, cocktails):
+        """Follow one cocktail moving from `old_position` to `new_position` in `cocktails`, shifting
+        the bits of those in between instead of rebuilding the index"""
+        def move_bit(bits):
+            bit = (bits >> old_position) & 1
+            bits = (bits & ((1 << old_position) - 1)) | ((bits >> (old_position + 1)) << old_position)
+            return (bits & ((1 << new_position) - 1)) | (bit << new_position) | ((bits >> new_position) << (new_position + 1))
+        self.cocktails = cocktails
+        self.users = {ingredient: move_bit(users) for ingredient, users in self.users.items()}
+        self.cached_available = None
+        self.cached_coverage = None
+
+    def select(self, bits):
+        """The cocktails in a bitset, in index order"""
+        return [self.cocktails[position] for position in iter_bits(bits)]
@@ -0,0 +1,149 @@
+# menus.py
+import datetime
+import os
+import shutil
+
+from atomic_file import file_lock
+from history import link_or_copy
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def replace_symlink(link, target):
+    """Point `link` at `target` (relative to the link's folder) in a single atomic rename"""
+    tmp_link = f'{link}.tmp'
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link)
+
+
+def relative_target(target, link):
+    return os.path.relpath(target, os.path.dirname(os.path.abspath(link)))
+
+
+class Menus:
+    """Complete menus (cocktails.json, pump_config.json and drink_logos/) kept side by side in `folder`.
+
+    The active menu is chosen by the `active_link` symlink, and the usual cocktails, pump config and logo
+    paths are symlinks through it. Switching menus is one rename of that symlink, so the interface sees
+    either the old menu or the new one, never a mix of the two or a half-copied logo folder.
+    """
+
+    def __init__(self, folder, active_link, cocktails_file, config_file, logo_folder, keep=2):
+        self.folder = folder
+        self.active_link = active_link
+        self.paths = {
+            'cocktails.json': cocktails_file,
+            'pump_config.json': config_file,
+            'drink_logos': os.path.normpath(logo_folder),
+        }
+        # Inactive menus to keep around, the interface may still be reading the last one
+        self.keep = keep
+
+    def active(self):
+        """Name of the active menu, or None before the first activation"""
+        if not os.path.islink(self.active_link):
+            return None
+        return os.path.basename(os.path.normpath(os.readlink(self.active_link)))
+
+    def new_name(self):
+        name = datetime.datetime.now().isoformat().replace(':', '-').split('.')[0]
+        suffix = 1
+        unique_name = name
+        while os.path.exists(os.path.join(self.folder, unique_name)):
+            suffix += 1
+            unique_name = f'{name}.{suffix}'
+        return unique_name
+
+    def create(self, populate):
+        """Create a new menu by calling `populate(folder)` on a folder that doesn't exist yet.
+        The menu only appears under its name once populate returns. Returns the name."""
+        os.makedirs(self.folder, exist_ok=True)
+        name = self.new_name()
+        tmp_folder = os.path.join(self.folder, f'.tmp-{name}')
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        try:
+            populate(tmp_folder)
+            for file_name in self.paths:
+                if file_name == 'drink_logos':
+                    os.makedirs(os.path.join(tmp_folder, file_name), exist_ok=True)
+                elif not os.path.exists(os.path.join(tmp_folder, file_name)):
+                    with open(os.path.join(tmp_folder, file_name), 'w') as f:
+                        f.write('{}')
+            os.rename(tmp_folder, os.path.join(self.folder, name))
+        except BaseException:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            raise
+        return name
+
+    def ensure_layout(self):
+        """Move a plain cocktails file, pump config and logo folder into the first menu and replace them
+        with symlinks through the active menu link. Does nothing once that's been done."""
+        if self.active() is not None:
+            return
+
+        def populate(folder):
+            os.makedirs(folder)
+            for file_name, path in self.paths.items():
+                if not os.path.exists(path):
+                    continue
+                if os.path.isdir(path):
+                    shutil.copytree(path, os.path.join(folder, file_name), copy_function=link_or_copy)
+                else:
+                    shutil.copy2(path, os.path.join(folder, file_name))
+
+        # Hold the cocktails lock so a save can't land in the old file after it was copied
+        with file_lock(self.paths['cocktails.json']):
+            name = self.create(populate)
+            replace_symlink(self.active_link, relative_target(os.path.join(self.folder, name), self.active_link))
+            self.link_paths()
+        logger.info(f'Moved the current menu into {os.path.join(self.folder, name)}')
+
+    def link_paths(self):
+        """Replace the cocktails file, pump config and logo folder with symlinks through the active menu link"""
+        for file_name, path in self.paths.items():
+            link_target = relative_target(os.path.join(self.active_link, file_name), path)
+            if os.path.isdir(path) and not os.path.islink(path):
+                # A folder can't be renamed over, so this is the one moment the path is missing
+                old_path = f'{path}.old'
+                shutil.rmtree(old_path, ignore_errors=True)
+                os.rename(path, old_path)
+                replace_symlink(path, link_target)
+                shutil.rmtree(old_path, ignore_errors=True)
+            else:
+                replace_symlink(path, link_target)
+
+    def activate(self, name):
+        """Make a menu the active one"""
+        self.ensure_layout()
+        # A save that read the old menu under this lock would otherwise write it through the new link
+        with file_lock(self.paths['cocktails.json']):
+            replace_symlink(self.active_link, relative_target(os.path.join(self.folder, name), self.active_link))
+        logger.info(f'Activated menu {name}')
+        self.prune()
+
+    def prune(self):
+        """Delete all but the newest `keep` inactive menus"""
+        active = self.active()
+        names = sorted([
+            name for name in os.listdir(self.folder)
+            if name != active and not name.startswith('.') and os.path.isdir(os.path.join(self.folder, name))
+        ], reverse=True)
+        for name in names[self.keep:]:
+            shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+
+
+menus = None
+menus_paths = None
+
+
+def get_menus():
+    """Get the shared Menus for the configured paths"""
+    global menus, menus_paths
+    import settings
+    paths = (settings.MENUS_FOLDER, settings.ACTIVE_MENU_LINK, settings.COCKTAILS_FILE, settings.CONFIG_FILE, settings.LOGO_FOLDER)
+    if menus is None or paths != menus_paths:
+        menus, menus_paths = Menus(*paths), paths
+    return menus
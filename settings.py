@@ -1,6 +1,8 @@
 import os
+import sys
 import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,16 @@ if 'PYTEST_CURRENT_TEST' not in os.environ:
 CONFIG_FILE = os.getenv('PUMP_CONFIG_FILE', 'pump_config.json')
 COCKTAILS_FILE = os.getenv('COCKTAILS_FILE', 'cocktails.json')
 LOGO_FOLDER = os.getenv('LOGO_FOLDER', 'drink_logos')
+HEARTBEAT_FILE = os.getenv('HEARTBEAT_FILE', 'interface_heartbeat')
+# SQLite database to keep the cocktails in instead of COCKTAILS_FILE. Empty to use the file.
+COCKTAILS_DB = os.getenv('COCKTAILS_DB', '')
+HISTORY_FOLDER = os.getenv('HISTORY_FOLDER', 'history')
+# Number of menu snapshots to keep, 0 to keep them all
+HISTORY_RETENTION = int(os.getenv('HISTORY_RETENTION', '50'))
+MENUS_FOLDER = os.getenv('MENUS_FOLDER', 'menus')
+ACTIVE_MENU_LINK = os.getenv('ACTIVE_MENU_LINK', 'active_menu')
+# Screen-sized copies of the images, in raw pixels, so they aren't decoded and scaled on every boot. Empty to disable.
+ASSET_CACHE_FOLDER = os.getenv('ASSET_CACHE_FOLDER', '.asset_cache')
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
@@ -60,6 +72,18 @@ settings = {
         'parse_method': json.loads,
         'default': 'false'
     },
+    'HIDE_UNMAKEABLE_COCKTAILS': {
+        'parse_method': json.loads,
+        'default': 'false'
+    },
+    'IMAGE_CACHE_MB': {
+        'parse_method': float,
+        'default': '64'
+    },
+    'PREFETCH_COUNT': {
+        'parse_method': int,
+        'default': '2'
+    },
     'WINDOW_WIDTH': {
         'parse_method': int,
         'default': '720'
@@ -77,5 +101,126 @@ for name in settings:
         value = settings[name]['parse_method'](settings[name]['default'])
     exec(f'{name} = value')
 
-if DEBUG:
-    logging.basicConfig(level=logging.DEBUG)
\ No newline at end of file
+# Each process (interface, Streamlit, main) logs to its own rotating file through a background thread
+LOG_FOLDER = os.getenv('LOG_FOLDER', 'logs')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(1024 * 1024)))
+if 'pytest' not in sys.modules:
+    from log_pipeline import setup_logging
+    process_name = os.path.splitext(os.path.basename(sys.argv[0]))[0].lstrip('-') or 'tipsy'
+    setup_logging(
+        logging.DEBUG if DEBUG else logging.INFO,
+        os.path.join(LOG_FOLDER, f'{process_name}.log') if LOG_FOLDER else None,
+        max_bytes=LOG_MAX_BYTES
+    )
+
+SETTINGS_FILE = os.getenv('SETTINGS_FILE', '.env')
+
+
+def format_setting(value):
+    """Format a parsed setting value the way it is written in the settings file"""
+    if isinstance(value, bool):
+        return json.dumps(value)
+    return str(value)
+
+
+class SettingsRegistry:
+    """Typed view of the settings above, backed by the settings file.
+
+    Values are re-read only when the file's mtime or size changes, so `poll()` is cheap enough to
+    call from a render loop. Components register a callback with `subscribe()` and are handed a
+    dict of the settings that changed whenever a poll or `set()` changes a value. When a namespace
+    is given (the module globals for the shared registry) it is kept in sync as well.
+    """
+
+    def __init__(self, path, definitions, values, namespace=None):
+        self.path = path
+        self.definitions = definitions
+        self.values = dict(values)
+        self.namespace = namespace
+        self.subscribers = []
+        self.lock = threading.RLock()
+        self.signature = self.file_signature()
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['values'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def parse(self, name, raw):
+        """Parse a raw string for a setting, falling back to the default when it is invalid"""
+        definition = self.definitions[name]
+        try:
+            return definition['parse_method'](raw)
+        except (ValueError, json.decoder.JSONDecodeError, TypeError):
+            return definition['parse_method'](definition['default'])
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def subscribe(self, callback):
+        """Call `callback(changed)` with a dict of changed settings after every change"""
+        with self.lock:
+            self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def poll(self):
+        """Reload the settings file if it changed on disk. Returns the settings that changed."""
+        signature = self.file_signature()
+        if signature is None or signature == self.signature:
+            return {}
+        from dotenv import dotenv_values
+        with self.lock:
+            self.signature = signature
+            file_values = dotenv_values(self.path)
+            changed = {}
+            for name in self.definitions:
+                if name not in file_values:
+                    continue
+                value = self.parse(name, file_values[name])
+                if self.values.get(name) != value:
+                    changed[name] = value
+        if changed:
+            logger.info(f'Settings changed on disk: {changed}')
+            self.apply(changed)
+        return changed
+
+    def set(self, name, value, persist=True):
+        """Change a setting in every subscribed component, optionally writing it to the settings file"""
+        if name not in self.definitions:
+            raise KeyError(f'Unknown setting {name}')
+        value = self.parse(name, format_setting(value))
+        if persist:
+            from dotenv import set_key
+            with self.lock:
+                set_key(self.path, name, format_setting(value), quote_mode='never')
+                self.signature = self.file_signature()
+        if self.values.get(name) != value:
+            self.apply({name: value})
+
+    def apply(self, changed):
+        with self.lock:
+            self.values.update(changed)
+            if self.namespace is not None:
+                self.namespace.update(changed)
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(dict(changed))
+            except Exception:
+                logger.exception(f'Error applying settings change in {callback}')
+
+
+registry = SettingsRegistry(SETTINGS_FILE, settings, {name: globals()[name] for name in settings}, namespace=globals())
@@ -0,0 +1,59 @@
+# sprites.py
+import collections
+import weakref
+
+import pygame
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class SpriteCache:
+    """Rotated and scaled copies of surfaces, each made once and then only blitted.
+
+    Angles are rounded to `angle_step` degrees, so a spinning sprite has a fixed set of frames (72 at
+    5°). Scaled copies are kept per size; tween with `animation.stepped` easing so a zoom goes through
+    the same few sizes every time it plays. Frames are kept for as long as the surface they were made
+    from is alive, at most `max_frames` of them per surface.
+    """
+
+    def __init__(self, angle_step=5, max_frames=128):
+        self.angle_step = angle_step
+        self.max_frames = max_frames
+        self.frames = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def frame(self, surface, key, make):
+        frames = self.frames.get(surface)
+        if frames is None:
+            frames = self.frames[surface] = collections.OrderedDict()
+        sprite = frames.get(key)
+        if sprite is not None:
+            frames.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = frames[key] = make()
+        while len(frames) > self.max_frames:
+            frames.popitem(last=False)
+        return sprite
+
+    def rotated(self, surface, angle):
+        """`surface` rotated counterclockwise by `angle` degrees, rounded to the angle step"""
+        angle = round(angle / self.angle_step) * self.angle_step % 360
+        return self.frame(surface, ('rotate', angle), lambda: pygame.transform.rotate(surface, angle))
+
+    def scaled(self, surface, size):
+        """`surface` scaled to `size`, rounded down to whole pixels"""
+        size = (int(size[0]), int(size[1]))
+        return self.frame(surface, ('scale', size), lambda: pygame.transform.scale(surface, size))
+
+    def warm(self, surface):
+        """Make every rotation of `surface` up front, e.g. before a spinner starts"""
+        for angle in range(0, 360, self.angle_step):
+            self.rotated(surface, angle)
+
+    def stats(self):
+        return {'surfaces': len(self.frames), 'frames': sum(len(frames) for frames in self.frames.values()),
+                'hits': self.hits, 'misses': self.misses}
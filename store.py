@@ -0,0 +1,221 @@
+# store.py
+import json
+import sqlite3
+import sys
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cocktails (
+    id INTEGER PRIMARY KEY,
+    normal_name TEXT NOT NULL UNIQUE,
+    fun_name TEXT,
+    position INTEGER NOT NULL,
+    -- Any other keys of the cocktail object, as JSON
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS ingredients (
+    cocktail_id INTEGER NOT NULL REFERENCES cocktails(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    measurement TEXT NOT NULL,
+    PRIMARY KEY (cocktail_id, position)
+);
+-- A row exists for every cocktail that has a favorite flag, set or cleared
+CREATE TABLE IF NOT EXISTS favorites (
+    cocktail_id INTEGER PRIMARY KEY REFERENCES cocktails(id) ON DELETE CASCADE,
+    favorite INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cocktails_name ON cocktails(normal_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ingredients_name ON ingredients(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS favorites_favorite ON favorites(favorite);
+'''
+
+COCKTAIL_COLUMNS = ('normal_name', 'fun_name', 'ingredients', 'favorite')
+
+
+class CocktailStore:
+    """SQLite-backed alternative to the cocktails file.
+
+    `load_cocktails()` returns the same structure as the file (favorites first, otherwise in insertion
+    order), while favoriting or editing a single recipe is a single-row transaction instead of a rewrite
+    of the whole menu.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        # With WAL this only risks the last commits on power loss, never corruption
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def signature(self):
+        """Changes whenever this or any other connection commits a change"""
+        with self.lock:
+            data_version = self.connection.execute('PRAGMA data_version').fetchone()[0]
+            return (data_version, self.connection.total_changes)
+
+    def is_empty(self):
+        with self.lock:
+            return self.connection.execute('SELECT 1 FROM cocktails LIMIT 1').fetchone() is None
+
+    def load_cocktails(self):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT c.id, c.normal_name, c.fun_name, c.extra, f.favorite FROM cocktails c '
+                'LEFT JOIN favorites f ON f.cocktail_id = c.id '
+                'ORDER BY COALESCE(f.favorite, 0) DESC, c.position'
+            ).fetchall()
+            ingredient_rows = self.connection.execute(
+                'SELECT cocktail_id, name, measurement FROM ingredients ORDER BY cocktail_id, position'
+            ).fetchall()
+        ingredients = {}
+        for cocktail_id, name, measurement in ingredient_rows:
+            ingredients.setdefault(cocktail_id, {})[name] = measurement
+        cocktails = []
+        for cocktail_id, normal_name, fun_name, extra, favorite in rows:
+            cocktail = {'normal_name': normal_name}
+            if fun_name is not None:
+                cocktail['fun_name'] = fun_name
+            if cocktail_id in ingredients:
+                cocktail['ingredients'] = ingredients[cocktail_id]
+            cocktail.update(json.loads(extra))
+            if favorite is not None:
+                cocktail['favorite'] = bool(favorite)
+            cocktails.append(cocktail)
+        return {'cocktails': cocktails}
+
+    def insert_cocktails(self, cocktails):
+        """Insert cocktails after the existing ones, skipping names that are already stored.
+        Must be called inside a transaction. Returns the number inserted."""
+        position = self.connection.execute('SELECT COALESCE(MAX(position), -1) FROM cocktails').fetchone()[0]
+        inserted = 0
+        for cocktail in cocktails:
+            extra = {key: value for key, value in cocktail.items() if key not in COCKTAIL_COLUMNS}
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO cocktails (normal_name, fun_name, position, extra) VALUES (?, ?, ?, ?)',
+                (cocktail.get('normal_name', ''), cocktail.get('fun_name'), position + 1, json.dumps(extra))
+            )
+            if not cursor.rowcount:
+                logger.warning(f'Skipping duplicate cocktail {cocktail.get("normal_name")}')
+                continue
+            position += 1
+            inserted += 1
+            cocktail_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO ingredients (cocktail_id, position, name, measurement) VALUES (?, ?, ?, ?)',
+                [(cocktail_id, index, name, measurement) for index, (name, measurement) in enumerate(cocktail.get('ingredients', {}).items())]
+            )
+            if 'favorite' in cocktail:
+                self.connection.execute('INSERT INTO favorites (cocktail_id, favorite) VALUES (?, ?)', (cocktail_id, int(bool(cocktail['favorite']))))
+        return inserted
+
+    def add_batch(self, cocktails):
+        """Append cocktails that aren't stored yet (the caller dedupes) in one transaction, using
+        executemany rather than a statement per row. Returns the number inserted."""
+        with self.lock, self.connection:
+            start = self.connection.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM cocktails').fetchone()[0]
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO cocktails (normal_name, fun_name, position, extra) VALUES (?, ?, ?, ?)',
+                [
+                    (cocktail['normal_name'], cocktail.get('fun_name'), start + offset,
+                     json.dumps({key: value for key, value in cocktail.items() if key not in COCKTAIL_COLUMNS}))
+                    for offset, cocktail in enumerate(cocktails)
+                ]
+            )
+            ids = dict(self.connection.execute(
+                'SELECT normal_name, id FROM cocktails WHERE position >= ?', (start,)
+            ).fetchall())
+            self.connection.executemany(
+                'INSERT INTO ingredients (cocktail_id, position, name, measurement) VALUES (?, ?, ?, ?)',
+                [
+                    (ids[cocktail['normal_name']], index, name, measurement)
+                    for cocktail in cocktails if cocktail['normal_name'] in ids
+                    for index, (name, measurement) in enumerate(cocktail.get('ingredients', {}).items())
+                ]
+            )
+            self.connection.executemany(
+                'INSERT INTO favorites (cocktail_id, favorite) VALUES (?, ?)',
+                [
+                    (ids[cocktail['normal_name']], int(bool(cocktail['favorite'])))
+                    for cocktail in cocktails if 'favorite' in cocktail and cocktail['normal_name'] in ids
+                ]
+            )
+        return len(ids)
+
+    def normal_names(self):
+        with self.lock:
+            return [row[0] for row in self.connection.execute('SELECT normal_name FROM cocktails')]
+
+    def save_cocktails(self, data, append=True):
+        """Same contract as helpers.save_cocktails: append to, or replace, the stored cocktails"""
+        with self.lock, self.connection:
+            if not append:
+                self.connection.execute('DELETE FROM cocktails')
+            return self.insert_cocktails(data.get('cocktails', []))
+
+    def cocktail_id(self, normal_name):
+        row = self.connection.execute('SELECT id FROM cocktails WHERE normal_name = ?', (normal_name,)).fetchone()
+        if row is None:
+            raise KeyError(normal_name)
+        return row[0]
+
+    def set_favorite(self, normal_name, favorite):
+        """Returns the cocktail's position in `load_cocktails()` afterwards"""
+        with self.lock, self.connection:
+            cocktail_id = self.cocktail_id(normal_name)
+            self.connection.execute(
+                'INSERT OR REPLACE INTO favorites (cocktail_id, favorite) VALUES (?, ?)',
+                (cocktail_id, int(bool(favorite)))
+            )
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM cocktails c LEFT JOIN favorites f ON f.cocktail_id = c.id '
+                'WHERE COALESCE(f.favorite, 0) > ? OR (COALESCE(f.favorite, 0) = ? AND c.position < '
+                '(SELECT position FROM cocktails WHERE id = ?))',
+                (int(bool(favorite)), int(bool(favorite)), cocktail_id)
+            ).fetchone()[0]
+
+    def update_ingredients(self, normal_name, ingredients):
+        with self.lock, self.connection:
+            cocktail_id = self.cocktail_id(normal_name)
+            self.connection.execute('DELETE FROM ingredients WHERE cocktail_id = ?', (cocktail_id,))
+            self.connection.executemany(
+                'INSERT INTO ingredients (cocktail_id, position, name, measurement) VALUES (?, ?, ?, ?)',
+                [(cocktail_id, index, name, measurement) for index, (name, measurement) in enumerate(ingredients.items())]
+            )
+
+    def cocktails_with_ingredient(self, ingredient):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT DISTINCT c.normal_name FROM ingredients i JOIN cocktails c ON c.id = i.cocktail_id '
+                'WHERE i.name = ? COLLATE NOCASE ORDER BY c.position', (ingredient,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def migrate_from_json(self, path):
+        """Append the cocktails from a cocktails JSON file. Returns the number inserted."""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        inserted = self.save_cocktails(data, append=True)
+        logger.info(f'Migrated {inserted} cocktails from {path} to {self.path}')
+        return inserted
+
+
+if __name__ == '__main__':
+    # python store.py cocktails.json [history/*/cocktails.json ...] tipsy.db
+    if len(sys.argv) < 3:
+        print('Usage: python store.py COCKTAILS_JSON [COCKTAILS_JSON ...] DATABASE')
+        sys.exit(1)
+    store = CocktailStore(sys.argv[-1])
+    for json_path in sys.argv[1:-1]:
+        print(f'{json_path}: {store.migrate_from_json(json_path)} cocktails added')
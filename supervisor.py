@@ -0,0 +1,208 @@
+# supervisor.py
+import os
+import signal
+import socket
+import subprocess
+import time
+
+from atomic_file import atomic_write_json
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def heartbeat_check(path, max_age=30):
+    """Health check that passes while `path` has been touched within the last `max_age` seconds"""
+    def check(component):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        # A heartbeat left behind by a previous run doesn't count
+        return mtime >= component.started_wall_time and time.time() - mtime <= max_age
+    return check
+
+
+def port_check(host, port, timeout=1.0):
+    """Health check that passes while something accepts TCP connections on host:port"""
+    def check(component):
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+    return check
+
+
+class Component:
+    """A child process kept running by the Supervisor"""
+
+    def __init__(self, name, command, health_check=None, startup_grace=30, unhealthy_after=3, restart_on_success=False):
+        self.name = name
+        self.command = command
+        self.health_check = health_check
+        # Seconds to wait after a start before health checks count against the component
+        self.startup_grace = startup_grace
+        # Consecutive failed health checks before the component is restarted
+        self.unhealthy_after = unhealthy_after
+        # A clean exit (e.g. pressing q in the kiosk) is deliberate unless this is set
+        self.restart_on_success = restart_on_success
+
+        self.process = None
+        self.started_at = None
+        self.started_wall_time = 0
+        self.healthy = False
+        self.failed_checks = 0
+        self.restarts = 0
+        self.last_exit_code = None
+        self.down_since = None
+        self.downtime = 0.0
+        self.next_start = None
+        self.stopped = False
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, now):
+        logger.info(f'Starting {self.name}: {" ".join(self.command)}')
+        self.process = subprocess.Popen(self.command)
+        self.started_at = now
+        self.started_wall_time = time.time()
+        self.healthy = False
+        self.failed_checks = 0
+        self.next_start = None
+        if self.down_since is not None:
+            self.downtime += now - self.down_since
+            self.down_since = None
+
+    def stop(self, timeout=5):
+        if not self.running:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning(f'{self.name} did not stop after {timeout}s, killing it')
+            self.process.kill()
+            self.process.wait()
+
+    def status(self, now):
+        downtime = self.downtime + (now - self.down_since if self.down_since is not None else 0)
+        return {
+            'running': self.running,
+            'healthy': self.healthy,
+            'pid': self.process.pid if self.running else None,
+            'uptime': round(now - self.started_at, 1) if self.running else 0,
+            'restarts': self.restarts,
+            'downtime': round(downtime, 1),
+            'last_exit_code': self.last_exit_code,
+        }
+
+
+class Supervisor:
+    """Start components one after another, then restart them with exponential backoff when they
+    exit or stop passing their health check. Restart counts and downtime are written to a status file."""
+
+    def __init__(self, components, status_file='supervisor_status.json', poll_interval=1.0,
+                 min_backoff=1.0, max_backoff=60.0, stable_after=60.0, stagger_timeout=20.0):
+        self.components = components
+        self.status_file = status_file
+        self.poll_interval = poll_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        # A component that stays healthy this long gets its backoff reset
+        self.stable_after = stable_after
+        # Longest to wait for a component to become healthy before starting the next one
+        self.stagger_timeout = stagger_timeout
+        self.backoff = {component.name: min_backoff for component in components}
+        self.running = False
+
+    def start_all(self):
+        """Start components in order, waiting for each to come up so boot doesn't saturate the CPU"""
+        for component in self.components:
+            component.start(time.monotonic())
+            deadline = time.monotonic() + self.stagger_timeout
+            while self.running and component.running and time.monotonic() < deadline:
+                if component.health_check is None or component.health_check(component):
+                    component.healthy = True
+                    break
+                time.sleep(self.poll_interval)
+
+    def schedule_restart(self, component, now, reason):
+        backoff = self.backoff[component.name]
+        logger.warning(f'{component.name} {reason}. Restarting in {backoff:.0f}s')
+        component.down_since = now
+        component.healthy = False
+        component.next_start = now + backoff
+        self.backoff[component.name] = min(backoff * 2, self.max_backoff)
+
+    def check(self, now=None):
+        """Check every component once, restarting any that are due"""
+        if now is None:
+            now = time.monotonic()
+        for component in self.components:
+            if component.stopped:
+                continue
+            if component.next_start is not None:
+                if now >= component.next_start:
+                    component.restarts += 1
+                    component.start(now)
+                continue
+
+            exit_code = component.process.poll()
+            if exit_code is not None:
+                component.last_exit_code = exit_code
+                if exit_code == 0 and not component.restart_on_success:
+                    logger.info(f'{component.name} exited cleanly, not restarting it')
+                    component.stopped = True
+                    component.down_since = now
+                    continue
+                self.schedule_restart(component, now, f'exited with code {exit_code}')
+                continue
+
+            if component.health_check is None or now - component.started_at < component.startup_grace:
+                continue
+            if component.health_check(component):
+                component.healthy = True
+                component.failed_checks = 0
+                if now - component.started_at >= self.stable_after:
+                    self.backoff[component.name] = self.min_backoff
+            else:
+                component.failed_checks += 1
+                if component.failed_checks >= component.unhealthy_after:
+                    component.stop()
+                    component.last_exit_code = component.process.returncode
+                    self.schedule_restart(component, now, f'failed {component.failed_checks} health checks')
+
+    def write_status(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        status = {component.name: component.status(now) for component in self.components}
+        try:
+            # Rewritten every poll, so skip the fsync to spare the SD card
+            atomic_write_json(self.status_file, status, durable=False, indent=2)
+        except OSError:
+            logger.exception('Error writing supervisor status')
+
+    def stop_all(self, *args):
+        self.running = False
+        for component in reversed(self.components):
+            component.stopped = True
+            component.healthy = False
+            component.stop()
+
+    def run(self):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop_all)
+        try:
+            self.start_all()
+            while self.running and not all(component.stopped for component in self.components):
+                self.check()
+                self.write_status()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_all()
+            self.write_status()
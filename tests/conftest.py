@@ -1,5 +1,21 @@
 def pytest_addoption(parser):
     parser.addoption("--include-ai", action="store_true", help="run OpenAI tests")
+    parser.addoption("--run-benchmarks", action="store_true", help="run the catalog scaling benchmarks")
+    parser.addoption("--benchmark-sizes", default="10,1000,10000,100000", help="comma separated catalog sizes to benchmark, e.g. 10,1000")
+    parser.addoption("--update-benchmark-baselines", action="store_true", help="save benchmark results as the new baselines")
+
+
+def pytest_configure(config):
+    config.benchmark_results = {}
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not config.benchmark_results:
+        return
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(f'{"size":>8} {"operation":<20} {"ms":>10} {"peak KB":>10}')
+    for (size, operation), result in sorted(config.benchmark_results.items()):
+        terminalreporter.write_line(f'{size:>8} {operation:<20} {result["seconds"] * 1000:>10.2f} {result["peak_kb"]:>10.0f}')
 
 import os
 import pytest
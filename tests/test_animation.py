@@ -0,0 +1,112 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from animation import Call, Sequence, Timeline, Tween, stepped
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAnimation:
+    def test_tween_progress_and_leftover(self):
+        """Test a tween reports values along the way and returns the time left over at its end"""
+        values = []
+        tween = Tween(100, values.append, 0, 10)
+        assert tween.advance(50) is None
+        assert tween.advance(70) == 20
+        assert values == [5, 10] and tween.done
+
+    def test_sequence_carries_time_over(self):
+        """Test time left over by one step of a sequence carries into the next, and calls chain on the end"""
+        values, calls = [], []
+        sequence = Sequence(Tween(100, values.append, 0, 1), Tween(100, values.append, 1, 2), Call(lambda: calls.append('done')))
+        assert sequence.advance(150) is None
+        assert values == [1, 1.5] and calls == []
+        assert sequence.advance(50) == 0
+        assert calls == ['done'] and sequence.done
+
+    def test_stepped_easing(self):
+        """Test a stepped tween only takes its fixed set of values, ending exactly on its end"""
+        values = []
+        tween = Tween(100, values.append, 150, 220, easing=stepped(7))
+        for _ in range(10):
+            tween.advance(13)
+        assert set(values) <= {150 + 10 * step for step in range(8)}
+        assert values[-1] == 220
+
+    def test_finish_jumps_to_end(self):
+        """Test finishing a sequence runs every remaining step to its end"""
+        values, calls = [], []
+        sequence = Sequence(Tween(100, values.append, 0, 1), Call(lambda: calls.append('done')))
+        sequence.advance(10)
+        sequence.finish()
+        assert values[-1] == 1 and calls == ['done']
+
+
+class TestTimeline:
+    def test_overlapping_animations(self):
+        """Test animations under different keys advance together and are removed once they finish"""
+        clock = FakeClock()
+        timeline = Timeline(clock=clock)
+        a, b = [], []
+        timeline.play('a', Tween(100, a.append, 0, 1))
+        timeline.play('b', Tween(200, b.append, 0, 1))
+        clock.now = 100
+        timeline.update()
+        assert a == [1] and b == [0.5]
+        assert timeline.running() and not timeline.running('a')
+        clock.now = 200
+        timeline.update()
+        assert not timeline.running()
+
+    def test_interrupt_and_stop(self):
+        """Test playing under a busy key replaces the old animation, and stopping can finish it first"""
+        clock = FakeClock()
+        timeline = Timeline(clock=clock)
+        calls = []
+        timeline.play('logo', Sequence(Tween(100, lambda value: None), Call(lambda: calls.append('old'))))
+        timeline.play('logo', Sequence(Tween(100, lambda value: None), Call(lambda: calls.append('new'))))
+        clock.now = 50
+        timeline.update()
+        timeline.stop('logo', finish=True)
+        assert calls == ['new'] and not timeline.running()
+
+    def test_started_late_does_not_jump(self):
+        """Test an animation is advanced from when it was played, not from the last update"""
+        clock = FakeClock()
+        timeline = Timeline(clock=clock)
+        timeline.update()
+        clock.now = 5000
+        values = []
+        timeline.play('tray', Tween(100, values.append))
+        clock.now = 5050
+        timeline.update()
+        assert values == [0.5]
+
+    def test_error_removes_animation(self):
+        """Test an animation that raises is dropped instead of stopping the loop"""
+        clock = FakeClock()
+        timeline = Timeline(clock=clock)
+        timeline.play('broken', Call(lambda: 1 / 0))
+        timeline.update()
+        assert not timeline.running()
+
+    def test_get_tells_replaced_animation_apart(self):
+        """Test get returns the animation under a key, so a caller can tell whether its own is still playing"""
+        clock = FakeClock()
+        timeline = Timeline(clock=clock)
+        calls = []
+        pop = timeline.play('single_logo', Sequence(Tween(100, lambda value: None), Call(lambda: calls.append('pour'))))
+        assert timeline.get('single_logo') is pop
+        timeline.play('single_logo', Tween(100, lambda value: None))
+        assert timeline.get('single_logo') is not pop and timeline.get('double_logo') is None
+        clock.now = 200
+        timeline.update()
+        assert calls == []
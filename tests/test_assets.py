@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pygame
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import assets
+from assets import AssetCache
+
+
+def baked_files(folder):
+    return [name for name in os.listdir(folder) if not name.startswith('.')]
+
+
+def save_image(path, color=(255, 0, 0, 255)):
+    surface = pygame.Surface((40, 40), pygame.SRCALPHA)
+    surface.fill(color)
+    pygame.image.save(surface, str(path))
+
+
+class TestAssetCache:
+    def test_baked_image_is_reused(self, tmp_path, monkeypatch):
+        """Test the scaled pixels are baked on first load and read back without decoding the image"""
+        save_image(tmp_path / 'logo.png', (10, 20, 30, 128))
+        cache = AssetCache(str(tmp_path / 'cache'))
+        first = cache.load(str(tmp_path / 'logo.png'), (20, 10))
+        assert len(baked_files(tmp_path / 'cache')) == 1
+
+        def fail(*args):
+            raise AssertionError('decoded again')
+        monkeypatch.setattr(pygame.image, 'load', fail)
+        second = AssetCache(str(tmp_path / 'cache')).load(str(tmp_path / 'logo.png'), (20, 10))
+        assert second.get_size() == (20, 10)
+        assert second.get_at((5, 5)) == first.get_at((5, 5)) == (10, 20, 30, 128)
+
+    def test_keyed_by_content_and_size(self, tmp_path):
+        """Test a changed image or a new screen size is baked separately"""
+        path = str(tmp_path / 'logo.png')
+        save_image(path)
+        cache = AssetCache(str(tmp_path / 'cache'))
+        cache.load(path, (20, 20))
+        cache.load(path, (30, 30))
+        save_image(path, (0, 255, 0, 255))
+        assert cache.load(path, (20, 20)).get_at((0, 0)) == (0, 255, 0, 255)
+        assert len(baked_files(tmp_path / 'cache')) == 3
+
+    def test_truncated_bake_is_replaced(self, tmp_path):
+        """Test a baked file of the wrong length is ignored and baked again"""
+        path = str(tmp_path / 'logo.png')
+        save_image(path)
+        cache = AssetCache(str(tmp_path / 'cache'))
+        baked_path = cache.baked_path(cache.source_hash(path), (20, 20), True)
+        os.makedirs(tmp_path / 'cache', exist_ok=True)
+        with open(baked_path, 'wb') as f:
+            f.write(b'\0' * 10)
+        assert cache.load(path, (20, 20)).get_at((0, 0)) == (255, 0, 0, 255)
+        assert os.path.getsize(baked_path) == 20 * 20 * 4
+
+    def test_prune_oldest(self, tmp_path):
+        """Test the oldest baked images are deleted once the folder is over budget"""
+        path = str(tmp_path / 'logo.png')
+        save_image(path)
+        cache = AssetCache(str(tmp_path / 'cache'), max_bytes=10 * 10 * 4 * 2)
+        for step, size in enumerate((8, 9, 10)):
+            cache.load(path, (size, size))
+            baked_path = cache.baked_path(cache.source_hash(path), (size, size), True)
+            os.utime(baked_path, ns=(step * 10 ** 9, step * 10 ** 9))
+        cache.prune()
+        assert sorted(baked_files(tmp_path / 'cache')) == sorted(
+            os.path.basename(cache.baked_path(cache.source_hash(path), (size, size), True)) for size in (9, 10)
+        )
+
+    def test_source_hashed_once(self, tmp_path, monkeypatch):
+        """Test a later boot finds the source hash by the file's signature, and only hashes it again once it changed"""
+        path = str(tmp_path / 'logo.png')
+        save_image(path)
+        AssetCache(str(tmp_path / 'cache')).load(path, (20, 20))
+        hashed = []
+        file_hash = assets.file_hash
+        monkeypatch.setattr(assets, 'file_hash', lambda path: hashed.append(path) or file_hash(path))
+        cache = AssetCache(str(tmp_path / 'cache'))
+        assert cache.load(path, (20, 20)).get_at((0, 0)) == (255, 0, 0, 255)
+        assert hashed == []
+        save_image(path, (0, 255, 0, 255))
+        assert AssetCache(str(tmp_path / 'cache')).load(path, (20, 20)).get_at((0, 0)) == (0, 255, 0, 255)
+        assert hashed == [path]
+
+    @pytest.mark.parametrize('size', [None, (20, 20)])
+    def test_no_cache_folder(self, tmp_path, size):
+        """Test images are still loaded when baking is turned off"""
+        save_image(tmp_path / 'logo.png')
+        surface = AssetCache('').load(str(tmp_path / 'logo.png'), size)
+        assert surface.get_size() == (size or (40, 40))
+        assert os.listdir(tmp_path) == ['logo.png']
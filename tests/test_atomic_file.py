@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import atomic_file
+from atomic_file import CoalescingWriter, atomic_write_json, file_lock
+
+
+class TestAtomicWrite:
+    def test_replaces_file(self, tmp_path):
+        """Test the file is replaced with a new inode, keeps its permissions and leaves no temp files"""
+        path = tmp_path / 'cocktails.json'
+        path.write_text('{}')
+        os.chmod(path, 0o640)
+        inode = os.stat(path).st_ino
+        atomic_write_json(str(path), {'cocktails': []})
+        assert json.loads(path.read_text()) == {'cocktails': []}
+        assert os.stat(path).st_ino != inode
+        assert os.stat(path).st_mode & 0o777 == 0o640
+        assert os.listdir(tmp_path) == ['cocktails.json']
+
+    def test_failed_write_keeps_old_file(self, tmp_path):
+        """Test a write that fails part way leaves the old contents in place"""
+        path = tmp_path / 'cocktails.json'
+        path.write_text('{"cocktails": []}')
+        with pytest.raises(TypeError):
+            atomic_write_json(str(path), {'cocktails': [object()]})
+        assert path.read_text() == '{"cocktails": []}'
+        assert os.listdir(tmp_path) == ['cocktails.json']
+
+    @pytest.mark.skipif(atomic_file.fcntl is None, reason='needs fcntl')
+    def test_lock_is_exclusive(self, tmp_path):
+        """Test that a second holder waits for the first to release the lock"""
+        path = str(tmp_path / 'cocktails.json')
+        events = []
+
+        def hold():
+            with file_lock(path):
+                events.append('second')
+
+        with file_lock(path):
+            thread = threading.Thread(target=hold)
+            thread.start()
+            time.sleep(0.1)
+            events.append('first')
+        thread.join()
+        assert events == ['first', 'second']
+
+
+class TestCoalescingWriter:
+    def test_batches_changes(self):
+        """Test rapid changes are written once, with the latest value for each key"""
+        writes = []
+        writer = CoalescingWriter(writes.append, delay=0.05, max_delay=1.0)
+        writer.submit('Gin Fizz', True)
+        writer.submit('Daiquiri', True)
+        writer.submit('Gin Fizz', False)
+        time.sleep(0.2)
+        assert writes == [{'Gin Fizz': False, 'Daiquiri': True}]
+        assert not writer.flush()
+
+    def test_max_delay(self):
+        """Test a steady stream of changes still gets written after max_delay"""
+        writes = []
+        writer = CoalescingWriter(writes.append, delay=0.1, max_delay=0.15)
+        for i in range(10):
+            writer.submit('Gin Fizz', i)
+            time.sleep(0.03)
+        assert writes
+        writer.flush()
+        assert writes[-1] == {'Gin Fizz': 9}
+
+    def test_flush(self):
+        """Test flushing writes pending changes straight away"""
+        writes = []
+        writer = CoalescingWriter(writes.append, delay=60)
+        writer.submit('Gin Fizz', True)
+        assert writer.flush()
+        assert writes == [{'Gin Fizz': True}]
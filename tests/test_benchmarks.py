@@ -0,0 +1,196 @@
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pygame
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import helpers
+import settings
+from assets import AssetCache
+from catalog import get_safe_name
+from helpers import get_centered_rect_for_surface
+from history import MenuHistory
+from image_cache import SurfaceCache
+
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), 'benchmark_baselines.json')
+
+# A result fails when it is this many times slower, or uses this many times more memory, than its baseline.
+# Override on machines much slower than the one the baselines were recorded on.
+TIME_TOLERANCE = float(os.getenv('BENCHMARK_TIME_TOLERANCE', '3.0'))
+MEMORY_TOLERANCE = float(os.getenv('BENCHMARK_MEMORY_TOLERANCE', '2.0'))
+# Differences below these are noise
+MIN_SECONDS = 0.005
+MIN_PEAK_KB = 1024
+
+INGREDIENTS = [f'Ingredient {i}' for i in range(200)]
+MEASUREMENTS = ['0.5 oz', '1 oz', '1.5 oz', '2 oz', '30 ml', '2 dashes']
+# The kiosk's window, and the size the carousel shows logos at in it
+SCREEN_SIZE = (settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT)
+LOGO_SIZE = tuple(int(side * settings.COCKTAIL_IMAGE_SCALE * 0.5) for side in SCREEN_SIZE)
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('--benchmark-sizes').split(',')]
+        metafunc.parametrize('size', sizes, scope='module')
+
+
+def generate_catalog(folder, size, seed=1):
+    """Write a synthetic cocktails file, pump config, logo folder and history index of `size` cocktails"""
+    rng = random.Random(seed)
+    cocktails = [
+        {
+            'normal_name': f'Synthetic Cocktail {i}',
+            'fun_name': f'Fun Name {i}',
+            'ingredients': {name: rng.choice(MEASUREMENTS) for name in rng.sample(INGREDIENTS, rng.randint(2, 5))},
+        }
+        for i in range(size)
+    ]
+    with open(os.path.join(folder, 'cocktails.json'), 'w') as f:
+        json.dump({'cocktails': cocktails}, f, indent=2)
+    with open(os.path.join(folder, 'pump_config.json'), 'w') as f:
+        json.dump({f'Pump {i + 1}': name for i, name in enumerate(INGREDIENTS[:12])}, f)
+
+    logo_folder = os.path.join(folder, 'drink_logos')
+    os.makedirs(logo_folder)
+    logo = pygame.Surface((64, 64), pygame.SRCALPHA)
+    logo.fill((200, 50, 50, 255))
+    logo_path = os.path.join(folder, 'logo.png')
+    pygame.image.save(logo, logo_path)
+    with open(logo_path, 'rb') as f:
+        logo_data = f.read()
+    for cocktail in cocktails:
+        with open(os.path.join(logo_folder, get_safe_name(cocktail['normal_name'])), 'wb') as f:
+            f.write(logo_data)
+
+    # One snapshot per cocktail stands in for a long-running kiosk's history
+    history_folder = os.path.join(folder, 'history')
+    os.makedirs(history_folder)
+    with open(os.path.join(history_folder, 'index.jsonl'), 'w') as f:
+        for i in range(size):
+            f.write(json.dumps({
+                'name': f'snapshot-{i:06d}',
+                'drinks': [c['normal_name'] for c in rng.sample(cocktails, min(5, size))],
+                'pump_config': {'Pump 1': INGREDIENTS[0]},
+                'thumbnail': None,
+            }) + '\n')
+
+
+@pytest.fixture(scope='module')
+def catalog_folder(size, tmp_path_factory, request):
+    if not request.config.getoption('--run-benchmarks'):
+        pytest.skip('Use the flag --run-benchmarks to run the benchmarks')
+    folder = str(tmp_path_factory.mktemp(f'catalog_{size}'))
+    generate_catalog(folder, size)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, 'COCKTAILS_FILE', os.path.join(folder, 'cocktails.json'))
+        monkeypatch.setattr(settings, 'CONFIG_FILE', os.path.join(folder, 'pump_config.json'))
+        monkeypatch.setattr(settings, 'LOGO_FOLDER', os.path.join(folder, 'drink_logos'))
+        monkeypatch.setattr(settings, 'COCKTAILS_DB', '')
+        # Loaded up front as the kiosk does at boot, so no operation's timing depends on running first
+        helpers.get_catalog().refresh(force=True)
+        yield folder
+        # Write the last favorites to this catalog before COCKTAILS_FILE points at the real one again
+        helpers.favorite_writer.flush()
+
+
+def measure(operation, repeat):
+    """Median time of `repeat` runs, and the peak memory allocated by one more run"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': statistics.median(times), 'peak_kb': peak / 1024}
+
+
+def favorite_and_write(rng):
+    """Favorite a cocktail in the kiosk, including the write that follows"""
+    helpers.favorite_cocktail(rng.randrange(len(helpers.get_valid_cocktails())))
+    helpers.favorite_writer.flush()
+
+
+class Carousel:
+    """The kiosk's image path for the carousel: an LRU SurfaceCache in front of an AssetCache that bakes
+    the scaled logos into the catalog folder, and a screen sized surface to draw on"""
+
+    def __init__(self, folder):
+        self.assets = AssetCache(os.path.join(folder, 'asset_cache'))
+        self.images = SurfaceCache(int(settings.IMAGE_CACHE_MB * 1024 * 1024), load=self.assets.load)
+        self.screen = pygame.Surface(SCREEN_SIZE)
+
+
+carousels = {}
+def carousel_steps(folder, rng, steps=20):
+    """What the kiosk does per swipe: look the cocktail up, get its logo scaled for the carousel from the
+    image cache (decoded, scaled and baked on a miss) and draw it"""
+    carousel = carousels.get(folder)
+    if carousel is None:
+        carousel = carousels[folder] = Carousel(folder)
+    cocktails = helpers.get_valid_cocktails()
+    catalog = helpers.get_catalog()
+    for _ in range(steps):
+        cocktail = cocktails[rng.randrange(len(cocktails))]
+        logo = carousel.images.get(catalog.image_path(cocktail['normal_name']), LOGO_SIZE)
+        carousel.screen.fill((0, 0, 0))
+        carousel.screen.blit(logo, get_centered_rect_for_surface(logo, *SCREEN_SIZE).topleft)
+
+
+def history_first_page(folder):
+    """The History tab in a fresh app process: read the index and take the first page"""
+    MenuHistory(os.path.join(folder, 'history'), '', '', '').page(0)
+
+
+OPERATIONS = {
+    'load_cocktails': lambda folder, rng: helpers.load_cocktails(),
+    'get_valid_cocktails': lambda folder, rng: helpers.get_valid_cocktails(),
+    'cold_catalog_load': lambda folder, rng: helpers.get_catalog().refresh(force=True),
+    'favorite_cocktail': lambda folder, rng: favorite_and_write(rng),
+    'save_cocktails': lambda folder, rng: helpers.save_cocktails({'cocktails': [{'normal_name': f'Appended {rng.random()}'}]}),
+    'history_page': lambda folder, rng: history_first_page(folder),
+    'carousel': lambda folder, rng: carousel_steps(folder, rng),
+}
+
+
+def load_baselines():
+    try:
+        with open(BASELINES_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@pytest.mark.parametrize('operation', list(OPERATIONS))
+def test_benchmark(operation, size, catalog_folder, request):
+    """Time an operation at a catalog size and compare it to the stored baseline"""
+    rng = random.Random(size)
+    repeat = 5 if size <= 10000 else 2
+    result = measure(lambda: OPERATIONS[operation](catalog_folder, rng), repeat)
+    request.config.benchmark_results[(size, operation)] = result
+
+    baselines = load_baselines()
+    if request.config.getoption('--update-benchmark-baselines'):
+        baselines.setdefault(str(size), {})[operation] = {key: round(value, 6) for key, value in result.items()}
+        with open(BASELINES_FILE, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        return
+
+    baseline = baselines.get(str(size), {}).get(operation)
+    if baseline is None:
+        pytest.skip(f'No baseline for {operation} at {size} cocktails, run with --update-benchmark-baselines')
+    assert result['seconds'] <= max(baseline['seconds'] * TIME_TOLERANCE, MIN_SECONDS), \
+        f'{operation} at {size} cocktails took {result["seconds"]:.4f}s, baseline {baseline["seconds"]:.4f}s'
+    assert result['peak_kb'] <= max(baseline['peak_kb'] * MEMORY_TOLERANCE, MIN_PEAK_KB), \
+        f'{operation} at {size} cocktails peaked at {result["peak_kb"]:.0f}KB, baseline {baseline["peak_kb"]:.0f}KB'
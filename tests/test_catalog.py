@@ -0,0 +1,126 @@
+import json
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import catalog
+import helpers
+import settings
+
+
+class TestCatalog:
+    def get_catalog(self, tmp_path, cocktails):
+        """Write a cocktails file and logo folder to tmp_path and get a catalog over them"""
+        self.cocktails_file = tmp_path / 'cocktails.json'
+        self.logo_folder = tmp_path / 'drink_logos'
+        self.logo_folder.mkdir()
+        self.write_cocktails(cocktails)
+        return catalog.CocktailCatalog(str(self.cocktails_file), str(self.logo_folder))
+
+    def write_cocktails(self, cocktails):
+        self.cocktails_file.write_text(json.dumps({'cocktails': cocktails}))
+
+    def test_indexes(self, tmp_path):
+        """Test name and image indexes, including case-insensitive image matches"""
+        cocktails = [{'normal_name': 'Gin Fizz'}, {'normal_name': 'No Image'}, {'normal_name': 'Rum and Coke'}]
+        cocktail_catalog = self.get_catalog(tmp_path, cocktails)
+        (self.logo_folder / 'gin_fizz.png').touch()
+        (self.logo_folder / 'Rum_and_Coke.png').touch()
+        cocktail_catalog.refresh()
+
+        assert cocktail_catalog.get('No Image') == {'normal_name': 'No Image'}
+        assert cocktail_catalog.valid == [cocktails[0], cocktails[2]]
+        assert cocktail_catalog.valid_index == {'Gin Fizz': 0, 'Rum and Coke': 1}
+        assert cocktail_catalog.image_path('Rum and Coke') == str(self.logo_folder / 'Rum_and_Coke.png')
+        assert cocktail_catalog.image_path('No Image') is None
+
+    def test_refresh_only_on_change(self, tmp_path, monkeypatch):
+        """Test that the file is only parsed again once it changes"""
+        cocktail_catalog = self.get_catalog(tmp_path, [{'normal_name': 'Gin Fizz'}])
+        loads = []
+        real_load = json.load
+        monkeypatch.setattr(catalog.json, 'load', lambda f: loads.append(f) or real_load(f))
+
+        assert cocktail_catalog.refresh()
+        assert not cocktail_catalog.refresh()
+        assert len(loads) == 1
+
+        self.write_cocktails([{'normal_name': 'Gin Fizz'}, {'normal_name': 'Daiquiri'}])
+        assert cocktail_catalog.refresh()
+        assert len(loads) == 2
+        assert list(cocktail_catalog.by_name) == ['Gin Fizz', 'Daiquiri']
+
+        # New images are picked up through the folder's mtime
+        (self.logo_folder / 'daiquiri.png').touch()
+        assert cocktail_catalog.refresh()
+        assert cocktail_catalog.valid == [{'normal_name': 'Daiquiri'}]
+
+    def test_replace(self, tmp_path):
+        """Test that replacing the data after a write doesn't need another read"""
+        cocktail_catalog = self.get_catalog(tmp_path, [{'normal_name': 'Gin Fizz'}])
+        cocktail_catalog.refresh()
+        data = {'cocktails': [{'normal_name': 'Daiquiri', 'favorite': True}]}
+        self.cocktails_file.write_text(json.dumps(data))
+        cocktail_catalog.replace(data)
+        data['cocktails'][0]['favorite'] = False
+        assert not cocktail_catalog.refresh()
+        assert cocktail_catalog.get('Daiquiri') == {'normal_name': 'Daiquiri', 'favorite': True}
+
+    def test_set_favorite_matches_rebuild(self, tmp_path):
+        """Test favoriting in place leaves the catalog as rebuilding it from the sorted cocktails would"""
+        rng = random.Random(4)
+        cocktails = [{'normal_name': f'Cocktail {i}', 'ingredients': {f'Ingredient {i % 5}': '1 oz', f'Ingredient {i % 7}': '1 oz'}}
+                     for i in range(30)]
+        cocktail_catalog = self.get_catalog(tmp_path, cocktails)
+        for cocktail in cocktails[::3] + cocktails[1::3]:
+            (self.logo_folder / helpers.get_safe_name(cocktail['normal_name'])).touch()
+        cocktail_catalog.refresh()
+        cocktail_catalog.menu_index()
+        listdir = os.listdir
+        for _ in range(50):
+            name = rng.choice(cocktails)['normal_name']
+            favorite = rng.random() < 0.5
+            expected = {'cocktails': [{**cocktail, 'favorite': favorite} if cocktail['normal_name'] == name else cocktail
+                                      for cocktail in cocktail_catalog.cocktails]}
+            helpers.sort_favorites_first(expected)
+            catalog.os.listdir = None  # Nothing is listed or read
+            try:
+                assert cocktail_catalog.set_favorite(name, favorite)
+            finally:
+                catalog.os.listdir = listdir
+            rebuilt = catalog.CocktailCatalog(str(self.cocktails_file), str(self.logo_folder))
+            rebuilt.build(expected, None)
+            assert cocktail_catalog.cocktails == rebuilt.cocktails
+            assert cocktail_catalog.valid == rebuilt.valid
+            assert cocktail_catalog.valid_index == rebuilt.valid_index
+            assert cocktail_catalog.by_name == rebuilt.by_name
+            assert cocktail_catalog.menu_index().users == rebuilt.menu_index().users
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing cocktails file gives an empty catalog"""
+        cocktail_catalog = catalog.CocktailCatalog(str(tmp_path / 'missing.json'), str(tmp_path / 'missing'))
+        cocktail_catalog.refresh()
+        assert cocktail_catalog.data == {}
+        assert cocktail_catalog.valid == []
+
+
+class TestModifyCocktails:
+    def test_write_not_read_back(self, tmp_path, monkeypatch):
+        """Test the catalog takes a write's data and signature without parsing the file again"""
+        cocktails_file = tmp_path / 'cocktails.json'
+        cocktails_file.write_text(json.dumps({'cocktails': [{'normal_name': 'Gin Fizz'}]}))
+        monkeypatch.setattr(settings, 'COCKTAILS_FILE', str(cocktails_file))
+        monkeypatch.setattr(settings, 'LOGO_FOLDER', str(tmp_path / 'drink_logos'))
+        monkeypatch.setattr(settings, 'COCKTAILS_DB', '')
+        helpers.get_catalog()
+        loads = []
+        real_load = json.load
+        monkeypatch.setattr(catalog.json, 'load', lambda f: loads.append(f) or real_load(f))
+
+        helpers.modify_cocktails(lambda cocktails: cocktails['cocktails'].append({'normal_name': 'Daiquiri'}))
+        cocktail_catalog = helpers.get_catalog()
+        assert list(cocktail_catalog.by_name) == ['Gin Fizz', 'Daiquiri']
+        assert cocktail_catalog.signature == cocktail_catalog.file_signature()
+        assert loads == []
@@ -0,0 +1,139 @@
+import os
+import sys
+
+import pygame
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from compositor import Compositor, merge_rects
+
+
+@pytest.fixture
+def screen(monkeypatch):
+    monkeypatch.setenv('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    yield pygame.display.set_mode((100, 100))
+    pygame.display.quit()
+
+
+def square(color, size=10):
+    surface = pygame.Surface((size, size))
+    surface.fill(color)
+    return surface
+
+
+class TestCompositor:
+    def test_unchanged_frame_is_skipped(self, screen):
+        """Test the first frame is drawn in full and an identical one draws nothing"""
+        compositor = Compositor(screen)
+        compositor.add('background', screen.fill, ((255, 0, 0),))
+        compositor.add('logo', screen.blit, (square((0, 0, 255)), (0, 0)))
+        assert compositor.draw() == [screen.get_rect()]
+        assert compositor.draw() == []
+        assert (compositor.stats['full'], compositor.stats['skipped']) == (1, 1)
+
+    def test_moved_layer_redraws_old_and_new_position(self, screen):
+        """Test only the area a layer left and the area it moved to are redrawn"""
+        compositor = Compositor(screen)
+        logo = square((0, 0, 255))
+        compositor.add('background', screen.fill, ((255, 0, 0),))
+        compositor.add('logo', screen.blit, (logo, (0, 0)))
+        compositor.draw()
+        screen.set_at((90, 90), (0, 255, 0))  # Outside the change, so it must survive
+        compositor.add('logo', screen.blit, (logo, (50, 50)))
+        assert sorted(map(tuple, compositor.draw())) == [(0, 0, 10, 10), (50, 50, 10, 10)]
+        assert screen.get_at((5, 5))[:3] == (255, 0, 0)
+        assert screen.get_at((55, 55))[:3] == (0, 0, 255)
+        assert screen.get_at((90, 90))[:3] == (0, 255, 0)
+
+    def test_rect_moved_in_place(self, screen):
+        """Test a layer whose rect is changed in place is still redrawn"""
+        compositor = Compositor(screen)
+        rect = pygame.Rect(0, 0, 10, 10)
+        compositor.add('logo', screen.blit, (square((0, 0, 255)), rect))
+        compositor.draw()
+        rect.x = 20
+        assert sorted(map(tuple, compositor.draw())) == [(0, 0, 10, 10), (20, 0, 10, 10)]
+
+    def test_large_change_redraws_everything(self, screen):
+        """Test a change covering most of the screen is flipped in full"""
+        compositor = Compositor(screen)
+        compositor.add('logo', screen.blit, (square((0, 0, 255), 80), (0, 0)))
+        compositor.draw()
+        compositor.add('logo', screen.blit, (square((0, 255, 0), 80), (0, 0)))
+        assert compositor.draw() == [screen.get_rect()]
+
+    def test_reordered_and_marked_dirty(self, screen):
+        """Test changing the stacking order or marking an area dirty redraws it"""
+        compositor = Compositor(screen)
+        compositor.add('a', screen.blit, (square((0, 0, 255)), (0, 0)))
+        compositor.add('b', screen.blit, (square((0, 255, 0)), (5, 5)))
+        compositor.draw()
+        compositor.mark_dirty((1, 1, 2, 2))
+        assert compositor.draw() == [pygame.Rect(1, 1, 2, 2)]
+        layer = compositor.layers.pop('a')
+        compositor.layers['a'] = layer
+        compositor.draw()
+        assert screen.get_at((7, 7))[:3] == (0, 0, 255)
+
+    def test_merge_rects(self):
+        """Test overlapping rects are joined, including ones joined through a third"""
+        rects = merge_rects([pygame.Rect(0, 0, 10, 10), pygame.Rect(50, 50, 5, 5), pygame.Rect(8, 8, 10, 10)])
+        assert sorted(map(tuple, rects)) == [(0, 0, 18, 18), (50, 50, 5, 5)]
+
+    def test_z_order_and_visibility(self, screen):
+        """Test layers are stacked by z whatever order they were added in, and hidden ones aren't drawn"""
+        compositor = Compositor(screen)
+        compositor.add('tab', screen.blit, (square((0, 0, 255)), (0, 0)), z=2)
+        compositor.add('cocktail', screen.blit, (square((0, 255, 0)), (0, 0)), z=1)
+        compositor.draw()
+        assert screen.get_at((5, 5))[:3] == (0, 0, 255)
+        compositor.hide('tab')
+        assert compositor.draw() == [pygame.Rect(0, 0, 10, 10)]
+        assert screen.get_at((5, 5))[:3] == (0, 255, 0)
+        compositor.add('tab', screen.blit, (square((0, 0, 255)), (0, 0)))
+        compositor.draw()
+        assert screen.get_at((5, 5))[:3] == (0, 0, 255)
+
+    def test_invalidate(self, screen):
+        """Test a layer whose surface was drawn into is redrawn once invalidated"""
+        compositor = Compositor(screen)
+        logo = square((0, 0, 255))
+        compositor.add('logo', screen.blit, (logo, (0, 0)))
+        compositor.draw()
+        logo.fill((0, 255, 0))
+        assert compositor.draw() == []
+        compositor.invalidate('logo')
+        assert compositor.draw() == [pygame.Rect(0, 0, 10, 10)]
+        assert screen.get_at((5, 5))[:3] == (0, 255, 0)
+
+
+class TestStaticComposite:
+    def test_static_layers_cached(self, screen):
+        """Test the static layers are composited once and moving layers above them only blit the cache"""
+        compositor = Compositor(screen)
+        compositor.add('background', screen.fill, ((255, 0, 0),), z=0, static=True)
+        compositor.add('button', screen.blit, (square((0, 0, 255)), (80, 80)), z=1, static=True)
+        compositor.add('cocktail', screen.blit, (square((0, 255, 0)), (0, 0)), z=2)
+        compositor.draw()
+        assert compositor.stats['static_pixels'] == 100 * 100
+        compositor.add('cocktail', screen.blit, (square((0, 255, 0)), (40, 40)))
+        compositor.draw()
+        assert compositor.stats['static_pixels'] == 100 * 100
+        assert screen.get_at((5, 5))[:3] == (255, 0, 0)
+        assert screen.get_at((85, 85))[:3] == (0, 0, 255)
+        assert screen.get_at((45, 45))[:3] == (0, 255, 0)
+
+    def test_static_change_redraws_its_area(self, screen):
+        """Test a change to a static layer redraws only its area of the cache"""
+        compositor = Compositor(screen)
+        compositor.add('background', screen.fill, ((255, 0, 0),), z=0, static=True)
+        compositor.add('button', screen.blit, (square((0, 0, 255)), (80, 80)), z=1, static=True)
+        compositor.add('cocktail', screen.blit, (square((0, 255, 0)), (75, 75)), z=2)
+        compositor.draw()
+        compositor.add('button', screen.blit, (square((255, 255, 255)), (80, 80)))
+        assert compositor.draw() == [pygame.Rect(80, 80, 10, 10)]
+        assert compositor.stats['static_pixels'] == 100 * 100 + 10 * 10
+        assert screen.get_at((85, 85))[:3] == (255, 255, 255)
+        assert screen.get_at((82, 82))[:3] == (0, 255, 0)
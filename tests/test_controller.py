@@ -0,0 +1,42 @@
+import concurrent.futures
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from controller import ExecutorWatcher, Pour
+
+
+def make_pour(duration, started=None, finished=None):
+    pour = Pour(0, 1.0, 'Vodka')
+    pour.duration, pour.started, pour.finished = duration, started, finished
+    return pour
+
+
+class TestPourProgress:
+    def test_pour_progress(self):
+        """Test a pour reports how far through it is and the time it has left"""
+        assert make_pour(4).remaining(now=10) == 4
+        assert make_pour(4, started=10).progress(now=11) == 0.25
+        assert make_pour(4, started=10).remaining(now=20) == 0
+        assert make_pour(4, started=10, finished=14).progress(now=12) == 1
+
+    def test_time_left_for_drink(self):
+        """Test the time left adds up the batches, each as long as its slowest pour"""
+        watcher = ExecutorWatcher()
+        watcher.batch_size = 2
+        watcher.pours = [make_pour(4, started=0), make_pour(2, started=0, finished=2), make_pour(3), make_pour(1)]
+        pours, remaining = watcher.progress(now=1)
+        assert [progress for _, progress, _ in pours] == [0.25, 1, 0, 0]
+        assert remaining == 3 + 3
+
+    def test_wait(self):
+        """Test waiting returns as soon as the work is done, or False after the timeout"""
+        release = threading.Event()
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            watcher = ExecutorWatcher()
+            watcher.executors.append(executor.submit(release.wait))
+            assert watcher.wait(0.01) is False
+            release.set()
+            assert watcher.wait(1) is True
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pygame
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fonts import TextCache, get_font
+
+
+class TestFonts:
+    def test_font_looked_up_once(self):
+        """Test a font of the same name and size is only created once"""
+        pygame.init()
+        assert get_font(30) is get_font(30)
+        assert get_font(30) is not get_font(31)
+
+    def test_text_cache(self):
+        """Test rendered text is reused per text, size and color, and the oldest is evicted"""
+        pygame.init()
+        cache = TextCache(max_entries=2)
+        label = cache.render('Margarita', 30)
+        assert cache.render('Margarita', 30) is label
+        assert cache.render('Margarita', 30, (255, 0, 0)) is not label
+        cache.render('Mojito', 30)
+        assert list(cache.entries) == [('Margarita', 30, (255, 0, 0), None, True), ('Mojito', 30, (255, 255, 255), None, True)]
+        assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 3}
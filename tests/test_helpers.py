@@ -129,6 +129,24 @@ class TestHelpers:
         lines = self.helpers.wrap_text(text, font, 50)
         assert lines == ['This is a 30', 'character', 'string']
 
+    def test_wrap_text_measures_words_once(self):
+        """Test long text is wrapped to the width without measuring every prefix of each line"""
+        self.get_helpers()
+        pygame.init()
+        font = pygame.font.SysFont(None, 24)
+        measured = []
+
+        class CountingFont:
+            def size(self, text):
+                measured.append(text)
+                return font.size(text)
+
+        text = ' '.join(['Pour 1.5 oz of grenadine'] * 50)
+        lines = self.helpers.wrap_text(text, CountingFont(), 200)
+        assert ' '.join(lines) == text
+        assert all(font.size(line)[0] <= 200 for line in lines)
+        assert len(measured) < len(text.split(' ')) + len(lines) * 2
+
     def test_get_image_prompt(self):
         """Test creation of the image generation prompt with and without ingredients"""
         self.get_helpers()
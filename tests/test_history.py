@@ -0,0 +1,147 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from history import MenuHistory
+
+
+class TestHistory:
+    def get_history(self, tmp_path, retention=50):
+        self.cocktails_file = tmp_path / 'cocktails.json'
+        self.config_file = tmp_path / 'pump_config.json'
+        self.logo_folder = tmp_path / 'drink_logos'
+        self.logo_folder.mkdir()
+        self.cocktails_file.write_text(json.dumps({'cocktails': [{'normal_name': 'Gin Fizz'}]}))
+        self.config_file.write_text(json.dumps({'Pump 1': 'Gin'}))
+        (self.logo_folder / 'gin_fizz.png').write_bytes(b'gin fizz')
+        (self.logo_folder / 'daiquiri.png').write_bytes(b'daiquiri')
+        return MenuHistory(str(tmp_path / 'history'), str(self.cocktails_file), str(self.config_file),
+                           str(self.logo_folder), retention=retention)
+
+    def objects(self, menu_history):
+        return sorted(name for _, _, files in os.walk(menu_history.objects_folder) for name in files)
+
+    def test_snapshots_share_unchanged_logos(self, tmp_path):
+        """Test that a second snapshot only stores the logo that changed"""
+        menu_history = self.get_history(tmp_path)
+        menu_history.snapshot('2024-01-01T00-00-00')
+        assert len(self.objects(menu_history)) == 2
+
+        # Replaced like the app does, not rewritten in place
+        (self.logo_folder / 'new.png').write_bytes(b'new daiquiri')
+        os.replace(self.logo_folder / 'new.png', self.logo_folder / 'daiquiri.png')
+        menu_history.snapshot('2024-01-02T00-00-00')
+        assert len(self.objects(menu_history)) == 3
+        assert menu_history.snapshot_names() == ['2024-01-02T00-00-00', '2024-01-01T00-00-00']
+        first, second = menu_history.manifest('2024-01-01T00-00-00'), menu_history.manifest('2024-01-02T00-00-00')
+        assert first['gin_fizz.png'] == second['gin_fizz.png']
+        assert first['daiquiri.png'] != second['daiquiri.png']
+        assert json.loads((tmp_path / 'history' / '2024-01-01T00-00-00' / 'pump_config.json').read_text()) == {'Pump 1': 'Gin'}
+
+    def test_export(self, tmp_path):
+        """Test exporting a snapshot writes a complete menu folder with its logos"""
+        menu_history = self.get_history(tmp_path)
+        menu_history.snapshot('2024-01-01T00-00-00')
+        os.remove(self.logo_folder / 'daiquiri.png')
+        (self.logo_folder / 'mojito.png').write_bytes(b'mojito')
+
+        menu = tmp_path / 'menu'
+        menu_history.export('2024-01-01T00-00-00', str(menu))
+        assert sorted(os.listdir(menu)) == ['cocktails.json', 'drink_logos', 'pump_config.json']
+        assert sorted(os.listdir(menu / 'drink_logos')) == ['daiquiri.png', 'gin_fizz.png']
+        assert (menu / 'drink_logos' / 'daiquiri.png').read_bytes() == b'daiquiri'
+
+    def test_export_legacy_snapshot(self, tmp_path):
+        """Test snapshots with a full copy of the logo folder can still be exported"""
+        menu_history = self.get_history(tmp_path)
+        legacy_logos = tmp_path / 'history' / '2023-01-01T00-00-00' / 'drink_logos'
+        legacy_logos.mkdir(parents=True)
+        (legacy_logos / 'old.png').write_bytes(b'old')
+        menu_history.export('2023-01-01T00-00-00', str(tmp_path / 'menu'))
+        assert os.listdir(tmp_path / 'menu' / 'drink_logos') == ['old.png']
+
+    def test_retention(self, tmp_path):
+        """Test old snapshots and the logos only they used are pruned"""
+        menu_history = self.get_history(tmp_path, retention=1)
+        menu_history.snapshot('2024-01-01T00-00-00')
+        os.remove(self.logo_folder / 'daiquiri.png')
+        menu_history.snapshot('2024-01-02T00-00-00')
+        assert menu_history.snapshot_names() == ['2024-01-02T00-00-00']
+        assert self.objects(menu_history) == list(menu_history.manifest('2024-01-02T00-00-00').values())
+
+    def test_snapshot_async(self, tmp_path):
+        """Test snapshots can be taken in the background with the cocktails passed in"""
+        menu_history = self.get_history(tmp_path)
+        cocktails = {'cocktails': [{'normal_name': 'Daiquiri'}]}
+        name = menu_history.snapshot_async('2024-01-01T00-00-00', cocktails=cocktails).result(timeout=10)
+        assert json.loads((tmp_path / 'history' / name / 'cocktails.json').read_text()) == cocktails
+
+    def test_index(self, tmp_path):
+        """Test snapshots are added to the index and it's paginated newest first"""
+        menu_history = self.get_history(tmp_path, retention=3)
+        for day in range(1, 5):
+            menu_history.snapshot(f'2024-01-0{day}T00-00-00')
+        entries = menu_history.entries()
+        assert [entry['name'] for entry in entries] == ['2024-01-02T00-00-00', '2024-01-03T00-00-00', '2024-01-04T00-00-00']
+        assert entries[0]['drinks'] == ['Gin Fizz']
+        assert entries[0]['pump_config'] == {'Pump 1': 'Gin'}
+        assert os.path.exists(menu_history.thumbnail_path(entries[0]))
+
+        page, pages = menu_history.page(0, page_size=2)
+        assert pages == 2
+        assert [entry['name'] for entry in page] == ['2024-01-04T00-00-00', '2024-01-03T00-00-00']
+        assert [entry['name'] for entry in menu_history.page(1, page_size=2)[0]] == ['2024-01-02T00-00-00']
+
+    def test_index_backfill(self, tmp_path):
+        """Test the index is built from existing snapshots when it's missing"""
+        menu_history = self.get_history(tmp_path)
+        menu_history.snapshot('2024-01-01T00-00-00')
+        menu_history.snapshot('2024-01-02T00-00-00')
+        os.remove(menu_history.index_file)
+        assert [entry['name'] for entry in menu_history.entries()] == ['2024-01-01T00-00-00', '2024-01-02T00-00-00']
+
+    def test_index_read_once(self, tmp_path, monkeypatch):
+        """Test the index is only parsed again after it changes"""
+        menu_history = self.get_history(tmp_path)
+        menu_history.snapshot('2024-01-01T00-00-00')
+        menu_history.entries()
+        monkeypatch.setattr(menu_history, 'index_entries', ['cached'])
+        assert menu_history.entries() == ['cached']
+        menu_history.snapshot('2024-01-02T00-00-00')
+        assert len(menu_history.entries()) == 2
+
+    def test_index_parses_appended_lines_only(self, tmp_path, monkeypatch):
+        """Test that after an append only the new line of the index is parsed, and after a rewrite all of it"""
+        menu_history = self.get_history(tmp_path, retention=2)
+        menu_history.snapshot('2024-01-01T00-00-00')
+        menu_history.entries()
+        parsed = []
+        parse_index = menu_history.parse_index
+        monkeypatch.setattr(menu_history, 'parse_index', lambda lines: parsed.extend(lines) or parse_index(lines))
+        menu_history.snapshot('2024-01-02T00-00-00')
+        assert [entry['name'] for entry in menu_history.entries()] == ['2024-01-01T00-00-00', '2024-01-02T00-00-00']
+        assert len(parsed) == 1
+        # Pruning past the retention rewrites the index
+        menu_history.snapshot('2024-01-03T00-00-00')
+        assert [entry['name'] for entry in menu_history.entries()] == ['2024-01-02T00-00-00', '2024-01-03T00-00-00']
+
+    def test_first_page_reads_tail(self, tmp_path, monkeypatch):
+        """Test a fresh process gets the first page from the end of the index without parsing the rest"""
+        folder = tmp_path / 'history'
+        folder.mkdir()
+        lines = [json.dumps({'name': f'snapshot-{i:04d}', 'drinks': ['Gin Fizz'] * 20}) for i in range(500)]
+        lines.insert(250, '{"name": "cut sh')
+        (folder / 'index.jsonl').write_text('\n'.join(lines) + '\n{"name": "still being wri')
+        menu_history = MenuHistory(str(folder), '', '', '')
+        parsed = []
+        parse_index = menu_history.parse_index
+        monkeypatch.setattr(menu_history, 'parse_index', lambda lines: parsed.extend(lines) or parse_index(lines))
+        page, pages = menu_history.page(0)
+        assert [entry['name'] for entry in page] == [f'snapshot-{i:04d}' for i in range(499, 489, -1)]
+        # The line cut short is counted until the whole index has been read
+        assert pages == 51
+        assert len(parsed) == 10
+        assert menu_history.index_tail(3, chunk_size=50)[0] == menu_history.entries()[-3:]
+        assert menu_history.page(0) == (page, 50)
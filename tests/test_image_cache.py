@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+
+import pygame
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_cache import Prefetcher, SurfaceCache, prefetch_order
+
+
+def save_image(path, color=(255, 0, 0)):
+    surface = pygame.Surface((40, 40))
+    surface.fill(color)
+    pygame.image.save(surface, str(path))
+
+
+class TestSurfaceCache:
+    def test_hit_after_miss(self, tmp_path):
+        """Test an image is decoded and scaled once per size"""
+        save_image(tmp_path / 'a.png')
+        cache = SurfaceCache(1024 * 1024)
+        assert cache.peek(str(tmp_path / 'a.png'), (20, 10)) is None
+        surface = cache.get(str(tmp_path / 'a.png'), (20, 10))
+        assert surface.get_size() == (20, 10)
+        assert cache.peek(str(tmp_path / 'a.png'), (20, 10)) is surface
+        assert cache.get(str(tmp_path / 'a.png'), (20, 10)) is surface
+        assert cache.get(str(tmp_path / 'a.png'), (30, 30)) is not surface
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 2)
+
+    def test_changed_file_is_reloaded(self, tmp_path):
+        """Test replacing an image on disk invalidates the cached copy"""
+        path = str(tmp_path / 'a.png')
+        save_image(path)
+        cache = SurfaceCache(1024 * 1024)
+        cache.get(path, (10, 10))
+        save_image(path, (0, 0, 255))
+        os.utime(path, ns=(1, 1))
+        assert cache.get(path, (10, 10)).get_at((0, 0))[:3] == (0, 0, 255)
+        assert cache.stats()['misses'] == 2
+
+    def test_budget_evicts_least_recently_used(self, tmp_path):
+        """Test the oldest surfaces are dropped to stay within the memory budget"""
+        for name in 'abc':
+            save_image(tmp_path / f'{name}.png')
+        probe = SurfaceCache(0).get(str(tmp_path / 'a.png'), (10, 10))
+        entry_bytes = 10 * 10 * probe.get_bytesize()
+        cache = SurfaceCache(entry_bytes * 2)
+        cache.get(str(tmp_path / 'a.png'), (10, 10))
+        cache.get(str(tmp_path / 'b.png'), (10, 10))
+        cache.get(str(tmp_path / 'a.png'), (10, 10))
+        cache.get(str(tmp_path / 'c.png'), (10, 10))
+        assert [key[0] for key in cache.entries] == [str(tmp_path / 'a.png'), str(tmp_path / 'c.png')]
+        assert cache.stats()['evictions'] == 1
+        assert cache.size_bytes <= cache.budget_bytes
+        cache.set_budget(entry_bytes)
+        assert len(cache.entries) == 1
+
+
+class TestPrefetch:
+    def test_order_follows_direction(self):
+        """Test the cocktails in the swipe direction are loaded first, wrapping around the list"""
+        assert prefetch_order(0, 10, 2, direction=1) == [1, 2, 9, 8]
+        assert prefetch_order(0, 10, 2, direction=-1) == [9, 8, 1, 2]
+        assert prefetch_order(5, 10, 2) == [6, 4, 7, 3]
+
+    def test_order_small_lists(self):
+        """Test each cocktail is only loaded once and never the current one"""
+        assert prefetch_order(0, 3, 2, direction=1) == [1, 2]
+        assert prefetch_order(0, 1, 2) == []
+
+    def test_stale_loads_cancelled(self):
+        """Test queued loads that are no longer wanted are dropped and ready ones are announced"""
+        pygame.init()
+        started = threading.Event()
+        release = threading.Event()
+        loaded = []
+
+        def load(key):
+            started.set()
+            release.wait(5)
+            loaded.append(key)
+            return pygame.Surface((1, 1))
+
+        event_type = pygame.event.custom_type()
+        prefetcher = Prefetcher(load, event_type=event_type)
+        pygame.event.clear()
+        prefetcher.prefetch(['a', 'b', 'c'])
+        started.wait(5)
+        prefetcher.prefetch(['d'])
+        release.set()
+        prefetcher.executor.shutdown(wait=True)
+        # 'a' had already started, 'b' and 'c' were still queued
+        assert loaded == ['a', 'd']
+        assert [event.key for event in pygame.event.get(event_type)] == ['a', 'd']
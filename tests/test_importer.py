@@ -0,0 +1,81 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import helpers
+import importer
+import settings
+from store import CocktailStore
+
+
+class TestImporter:
+    def test_normalize_record(self):
+        """Test names and measurements are tidied up"""
+        cocktail = importer.normalize_record({'name': '  Rum   Punch ', 'ingredients': {' Dark  Rum': '1 1/2  oz', 'Bitters': '2 dashes'}})
+        assert cocktail == {'normal_name': 'Rum Punch', 'ingredients': {'Dark Rum': '1.5 oz', 'Bitters': '2 dashes'}}
+
+    @pytest.mark.parametrize('record', [
+        {'ingredients': {'Rum': '2 oz'}},
+        {'name': 'No Ingredients', 'ingredients': {}},
+        {'name': 'Muddled', 'ingredients': {'Mint': '4 leaves'}},
+        {'name': 'Bad Type', 'ingredients': 4},
+    ])
+    def test_invalid_records(self, record):
+        """Test records without a name or pourable ingredients are rejected"""
+        with pytest.raises(importer.InvalidRecord):
+            importer.normalize_record(record)
+
+    def test_dedupe_and_batches(self):
+        """Test duplicates by normalized name are dropped, including existing names, and batches are bounded"""
+        records = importer.read_jsonl(io.StringIO('\n'.join([
+            json.dumps({'name': 'Daiquiri', 'ingredients': {'Rum': '2 oz'}}),
+            json.dumps({'name': 'daiquiri!', 'ingredients': {'Rum': '2 oz'}}),
+            'not json',
+            json.dumps({'name': 'Gimlet', 'ingredients': {'Gin': '2 oz', 'Lime Juice': '1 oz'}}),
+            json.dumps({'name': 'Rum & Coke', 'ingredients': {'Rum': '2 oz', 'Cola': '4 oz'}}),
+            json.dumps({'name': 'Mojito', 'ingredients': {'Rum': '2 oz'}}),
+        ])))
+        batches = []
+        stats = importer.import_recipes(records, ['Mojito'], lambda batch: batches.append(list(batch)),
+                                        pump_ingredients=['rum', 'cola'], batch_size=2)
+        assert [[c['normal_name'] for c in batch] for batch in batches] == [['Daiquiri', 'Gimlet'], ['Rum & Coke']]
+        assert (stats.read, stats.imported, stats.duplicates, stats.invalid, stats.unmakeable) == (6, 3, 2, 1, 1)
+
+    def test_only_makeable(self):
+        """Test recipes needing an ingredient that isn't on a pump can be skipped"""
+        records = [{'name': 'Daiquiri', 'ingredients': {'Rum': '2 oz', 'Lime': '1 oz'}}, {'name': 'Neat', 'ingredients': {'Rum': '2 oz'}}]
+        imported = []
+        importer.import_recipes(records, [], imported.extend, pump_ingredients=['Rum'], only_makeable=True)
+        assert [c['normal_name'] for c in imported] == ['Neat']
+
+    def test_csv_formats(self):
+        """Test CSV with an ingredients column and with one row per ingredient"""
+        wide = io.StringIO('name,fun_name,ingredients\nDaiquiri,Sunny,Rum: 2 oz; Lime Juice: 1 oz\n')
+        long = io.StringIO('name,ingredient,measurement\nDaiquiri,Rum,2 oz\nDaiquiri,Lime Juice,1 oz\nNeat,Rum,2 oz\n')
+        assert [importer.normalize_record(r) for r in importer.read_csv(wide)] == [
+            {'normal_name': 'Daiquiri', 'fun_name': 'Sunny', 'ingredients': {'Rum': '2 oz', 'Lime Juice': '1 oz'}}
+        ]
+        assert [importer.normalize_record(r)['ingredients'] for r in importer.read_csv(long)] == [
+            {'Rum': '2 oz', 'Lime Juice': '1 oz'}, {'Rum': '2 oz'}
+        ]
+
+    def test_import_file_into_store(self, tmp_path, monkeypatch):
+        """Test a file is imported into the database in batches"""
+        path = tmp_path / 'recipes.jsonl'
+        path.write_text('\n'.join(json.dumps({'name': f'Cocktail {i}', 'ingredients': {'Rum': f'{i % 3 + 1} oz'}}) for i in range(250)))
+        monkeypatch.setattr(settings, 'COCKTAILS_FILE', str(tmp_path / 'cocktails.json'))
+        monkeypatch.setattr(settings, 'CONFIG_FILE', str(tmp_path / 'pump_config.json'))
+        monkeypatch.setattr(settings, 'COCKTAILS_DB', str(tmp_path / 'tipsy.db'))
+        monkeypatch.setattr(helpers, 'store', None)
+
+        stats = importer.import_file(str(path), batch_size=100)
+        assert stats.imported == 250
+        helpers.store.close()
+        cocktails = CocktailStore(str(tmp_path / 'tipsy.db')).load_cocktails()['cocktails']
+        assert len(cocktails) == 250
+        assert cocktails[4] == {'normal_name': 'Cocktail 4', 'ingredients': {'Rum': '2 oz'}}
@@ -0,0 +1,81 @@
+import logging
+import os
+import queue
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import log_pipeline
+
+
+def make_record(level=logging.DEBUG, lineno=1, msg='motor_forward called'):
+    return logging.LogRecord('controller', level, 'controller.py', lineno, msg, None, None)
+
+
+class TestLogPipeline:
+    def test_rate_limit(self):
+        """Test that a call site is limited to its rate, and warnings always get through"""
+        rate_filter = log_pipeline.RateLimitFilter(rate=3, per=60)
+        results = [rate_filter.filter(make_record()) for _ in range(5)]
+        assert results == [True, True, True, False, False]
+        # Other call sites have their own bucket
+        assert rate_filter.filter(make_record(lineno=2))
+        assert rate_filter.filter(make_record(level=logging.WARNING))
+
+    def test_rate_limit_reports_suppressed(self):
+        """Test that the next record through says how many were dropped"""
+        rate_filter = log_pipeline.RateLimitFilter(rate=1, per=0.01)
+        assert rate_filter.filter(make_record())
+        assert not rate_filter.filter(make_record())
+        import time
+        time.sleep(0.02)
+        record = make_record()
+        assert rate_filter.filter(record)
+        assert record.getMessage() == 'motor_forward called (1 similar messages suppressed)'
+
+    def test_full_queue_drops(self):
+        """Test that logging never blocks when the queue is full"""
+        handler = log_pipeline.DroppingQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(make_record())
+        handler.handle(make_record())
+        assert handler.dropped == 1
+
+    def test_setup_logging(self, tmp_path):
+        """Test that records reach the rotating file and a second setup replaces the first"""
+        root = logging.getLogger()
+        old_level = root.level
+        log_file = tmp_path / 'logs' / 'test.log'
+        try:
+            first = log_pipeline.setup_logging(logging.INFO, str(log_file), console=False)
+            logging.getLogger('test').info('first message')
+            second = log_pipeline.setup_logging(logging.INFO, str(log_file), console=False, max_bytes=200, backup_count=1)
+            # Stopping the first pipeline flushed its queue
+            assert 'first message' in log_file.read_text()
+            assert first.handler not in root.handlers
+            assert second.handler in root.handlers
+            for index in range(10):
+                logging.getLogger('test').info(f'message {index}')
+            second.stop()
+            assert second.handler not in root.handlers
+            assert 'message 9' in log_file.read_text()
+            assert log_file.stat().st_size <= 200
+            assert len(list((tmp_path / 'logs').iterdir())) == 2
+        finally:
+            log_pipeline.pipeline = None
+            root.setLevel(old_level)
+
+    def test_default_level_keeps_metrics(self, tmp_path):
+        """Test that the default level keeps the INFO records the interface reports its metrics with"""
+        root = logging.getLogger()
+        old_level = root.level
+        log_file = tmp_path / 'interface.log'
+        try:
+            pipeline = log_pipeline.setup_logging(log_file=str(log_file), console=False)
+            logging.getLogger('interface').info('Time to first frame: 850 ms')
+            logging.getLogger('interface').debug('motor_forward called')
+            pipeline.stop()
+            assert 'Time to first frame: 850 ms' in log_file.read_text()
+            assert 'motor_forward' not in log_file.read_text()
+        finally:
+            log_pipeline.pipeline = None
+            root.setLevel(old_level)
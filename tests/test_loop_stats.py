@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loop_stats import LoopStats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLoopStats:
+    def test_idle_and_busy_time(self):
+        """Test wakeups and CPU are split between waiting for events and running at full frame rate"""
+        clock, cpu = FakeClock(), FakeClock()
+        stats = LoopStats(window=10, clock=clock, cpu_clock=cpu)
+        # Four idle seconds waking once a second, using 10ms of CPU each time
+        for _ in range(4):
+            clock.now += 1
+            cpu.now += 0.01
+            stats.wake(idle=True)
+        # One second of a swipe at 60 fps, using half the CPU
+        for _ in range(60):
+            clock.now += 1 / 60
+            cpu.now += 0.5 / 60
+            stats.wake(idle=False)
+        snapshot = stats.snapshot()
+        assert snapshot['wakeups_per_second'] == 64 / 5
+        assert snapshot['idle_wakeups_per_second'] == 1
+        assert snapshot['idle_cpu_percent'] == 1
+        assert snapshot['cpu_percent'] == 10.8
+
+    def test_report_once_per_window(self):
+        """Test a report is only returned once a window has passed, and the counts start again"""
+        clock = FakeClock()
+        stats = LoopStats(window=10, clock=clock, cpu_clock=FakeClock())
+        clock.now = 5
+        stats.wake(idle=True)
+        assert stats.report() is None
+        clock.now = 10
+        assert stats.report()['idle_wakeups_per_second'] == 0.2
+        assert stats.last is not None and stats.wakeups == 0
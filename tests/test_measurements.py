@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from measurements import OZ_ML, format_measurement, parse_measurement, to_oz
+
+
+class TestMeasurements:
+    @pytest.mark.parametrize('text, oz', [
+        ('2 oz', 2),
+        ('1/2 oz', 0.5),
+        ('1 1/2 oz', 1.5),
+        ('½ oz', 0.5),
+        ('1½ oz', 1.5),
+        ('.75 oz', 0.75),
+        ('1.5 Ounces', 1.5),
+        ('2', 2),
+        ('3 cl', 30 / OZ_ML),
+        ('30 ml', 30 / OZ_ML),
+        ('2 tsp', 1 / 3),
+        ('1 tbsp', 0.5),
+        ('4 dashes', 0.125),
+        ('1 shot', 1.5),
+        ('2 Shots', 3),
+        ('1 oz fresh lime juice', 1),
+    ])
+    def test_pourable(self, text, oz):
+        """Test fractions, units and plain numbers (oz) convert to the right volume"""
+        measurement = parse_measurement(text)
+        assert to_oz(measurement) == pytest.approx(oz)
+        assert measurement.text == text
+
+    @pytest.mark.parametrize('text', ['4 leaves', 'to taste', '', '1/0 oz'])
+    def test_not_pourable(self, text):
+        """Test quantities that can't be poured have no volume"""
+        assert parse_measurement(text).ml is None
+
+    def test_format_keeps_unit(self):
+        """Test a new amount is written with the unit as it was written"""
+        assert format_measurement(parse_measurement('2 Dashes'), 3.0) == '3 Dashes'
+        assert format_measurement(parse_measurement('1 1/2 oz'), 1.25) == '1.25 oz'
+        assert format_measurement(parse_measurement('2'), 2.5) == '2.5'
+
+    def test_cached(self):
+        """Test each distinct string is parsed once"""
+        assert parse_measurement('2.25 oz') is parse_measurement('2.25 oz')
@@ -0,0 +1,91 @@
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import helpers
+import settings
+from menu_index import MenuIndex, bit_count
+
+
+COCKTAILS = [
+    {'normal_name': 'Rum and Coke', 'ingredients': {'Rum': '2 oz', 'Cola': '4 oz'}},
+    {'normal_name': 'Daiquiri', 'ingredients': {'Rum': '2 oz', 'Lime Juice': '1 oz', 'Simple Syrup': '0.5 oz'}},
+    {'normal_name': 'Gimlet', 'ingredients': {'Gin': '2 oz', 'Lime Juice': '1 oz'}},
+    {'normal_name': 'Mojito', 'ingredients': {'Rum': '2 oz', 'Mint': '4 leaves', 'Soda': '2 oz'}},
+]
+
+
+class TestMenuIndex:
+    def names(self, index, bits):
+        return [cocktail['normal_name'] for cocktail in index.select(bits)]
+
+    def test_coverage(self):
+        """Test makeable drinks, near misses and unlocks, matching ingredients like the controller does"""
+        index = MenuIndex(COCKTAILS)
+        coverage = index.coverage([' rum', 'COLA', 'lime juice'])
+        assert self.names(index, coverage.makeable) == ['Rum and Coke']
+        assert self.names(index, coverage.near_misses) == ['Daiquiri', 'Gimlet']
+        assert coverage.missing_by_cocktail == {1: 'simple syrup', 2: 'gin'}
+        assert sorted(coverage.unlocks) == [('gin', 1), ('simple syrup', 1)]
+
+    def test_unlocks_sorted(self):
+        """Test the ingredient that completes the most drinks comes first"""
+        index = MenuIndex(COCKTAILS + [{'normal_name': 'Rum Sour', 'ingredients': {'Rum': '2 oz', 'Lime Juice': '1 oz'}}])
+        coverage = index.coverage(['rum', 'cola', 'simple syrup', 'soda'])
+        assert coverage.unlocks == [('lime juice', 2), ('mint', 1)]
+
+    def test_cached_until_pumps_change(self):
+        """Test the same pumps give the cached coverage back"""
+        index = MenuIndex(COCKTAILS)
+        coverage = index.coverage(['rum', 'cola'])
+        assert index.coverage(['Cola', 'Rum']) is coverage
+        assert index.coverage(['rum']) is not coverage
+
+    def test_large_menu(self):
+        """Test a new pump configuration is covered quickly with thousands of recipes"""
+        rng = random.Random(1)
+        ingredients = [f'ingredient {i}' for i in range(300)]
+        cocktails = [
+            {'normal_name': f'Cocktail {i}', 'ingredients': {name: '1 oz' for name in rng.sample(ingredients, 4)}}
+            for i in range(5000)
+        ]
+        index = MenuIndex(cocktails)
+        start = time.perf_counter()
+        coverage = index.coverage(ingredients[:12])
+        elapsed = time.perf_counter() - start
+        expected = [c for c in cocktails if all(name in ingredients[:12] for name in c['ingredients'])]
+        assert index.select(coverage.makeable) == expected
+        assert bit_count(coverage.near_misses) == sum(
+            1 for c in cocktails if sum(name not in ingredients[:12] for name in c['ingredients']) == 1
+        )
+        # Generous to stay reliable on slow machines, typically well under a millisecond
+        assert elapsed < 0.05
+
+
+class TestHideUnmakeable:
+    def test_menu_filtered(self, tmp_path, monkeypatch):
+        """Test HIDE_UNMAKEABLE_COCKTAILS hides drinks the pumps can't make, and favoriting uses menu positions"""
+        cocktails_file = tmp_path / 'cocktails.json'
+        config_file = tmp_path / 'pump_config.json'
+        logo_folder = tmp_path / 'drink_logos'
+        logo_folder.mkdir()
+        for cocktail in COCKTAILS:
+            (logo_folder / helpers.get_safe_name(cocktail['normal_name'])).touch()
+        monkeypatch.setattr(settings, 'COCKTAILS_FILE', str(cocktails_file))
+        monkeypatch.setattr(settings, 'CONFIG_FILE', str(config_file))
+        monkeypatch.setattr(settings, 'LOGO_FOLDER', str(logo_folder))
+        monkeypatch.setattr(settings, 'HIDE_UNMAKEABLE_COCKTAILS', True)
+        helpers.save_cocktails({'cocktails': COCKTAILS}, append=False)
+        helpers.save_config({'Pump 1': 'Rum', 'Pump 2': 'Cola', 'Pump 3': 'Gin', 'Pump 4': 'Lime Juice'})
+
+        assert [c['normal_name'] for c in helpers.get_valid_cocktails()] == ['Rum and Coke', 'Gimlet']
+        assert helpers.favorite_cocktail(1) == 0
+        assert [c['normal_name'] for c in helpers.get_valid_cocktails()] == ['Gimlet', 'Rum and Coke']
+        helpers.favorite_writer.flush()
+
+        # Pump changes are picked up straight away
+        helpers.save_config({'Pump 1': 'Rum', 'Pump 2': 'Cola'})
+        assert [c['normal_name'] for c in helpers.get_valid_cocktails()] == ['Rum and Coke']
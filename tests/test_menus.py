@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from atomic_file import atomic_write_json, file_lock
+from catalog import CocktailCatalog
+from menus import Menus
+
+
+class TestMenus:
+    def get_menus(self, tmp_path, monkeypatch):
+        """Set up a plain cocktails file, pump config and logo folder in tmp_path, as the app leaves them"""
+        monkeypatch.chdir(tmp_path)
+        with open('cocktails.json', 'w') as f:
+            json.dump({'cocktails': [{'normal_name': 'Gin Fizz'}]}, f)
+        with open('pump_config.json', 'w') as f:
+            json.dump({'Pump 1': 'Gin'}, f)
+        os.makedirs('drink_logos')
+        with open('drink_logos/gin_fizz.png', 'wb') as f:
+            f.write(b'gin fizz')
+        return Menus('menus', 'active_menu', 'cocktails.json', 'pump_config.json', 'drink_logos')
+
+    def create_menu(self, menus, drink):
+        def populate(folder):
+            os.makedirs(os.path.join(folder, 'drink_logos'))
+            with open(os.path.join(folder, 'cocktails.json'), 'w') as f:
+                json.dump({'cocktails': [{'normal_name': drink}]}, f)
+            with open(os.path.join(folder, 'drink_logos', f'{drink.lower()}.png'), 'wb') as f:
+                f.write(drink.encode())
+        return menus.create(populate)
+
+    def test_activate(self, tmp_path, monkeypatch):
+        """Test activating a menu moves the current one aside and switches every path at once"""
+        menus = self.get_menus(tmp_path, monkeypatch)
+        name = self.create_menu(menus, 'Daiquiri')
+        menus.activate(name)
+
+        assert menus.active() == name
+        for path in ('cocktails.json', 'pump_config.json', 'drink_logos'):
+            assert os.path.islink(path)
+        with open('cocktails.json') as f:
+            assert json.load(f) == {'cocktails': [{'normal_name': 'Daiquiri'}]}
+        assert os.listdir('drink_logos') == ['daiquiri.png']
+        # The menu missing a pump config gets an empty one
+        with open('pump_config.json') as f:
+            assert json.load(f) == {}
+
+        # The original menu was kept and can be switched back to
+        original = [menu for menu in os.listdir('menus') if menu != name][0]
+        menus.activate(original)
+        with open('pump_config.json') as f:
+            assert json.load(f) == {'Pump 1': 'Gin'}
+        assert os.listdir('drink_logos') == ['gin_fizz.png']
+
+    def test_writes_go_to_active_menu(self, tmp_path, monkeypatch):
+        """Test atomic writes replace the file inside the active menu, not the symlink"""
+        menus = self.get_menus(tmp_path, monkeypatch)
+        menus.activate(self.create_menu(menus, 'Daiquiri'))
+        atomic_write_json('cocktails.json', {'cocktails': []})
+        assert os.path.islink('cocktails.json')
+        with open(os.path.join('menus', menus.active(), 'cocktails.json')) as f:
+            assert json.load(f) == {'cocktails': []}
+
+    def test_activate_waits_for_locked_write(self, tmp_path, monkeypatch):
+        """Test a switch waits for a save in progress, so the save lands in the menu it was read from"""
+        menus = self.get_menus(tmp_path, monkeypatch)
+        menus.ensure_layout()
+        original = menus.active()
+        name = self.create_menu(menus, 'Daiquiri')
+        activated = threading.Event()
+        thread = threading.Thread(target=lambda: (menus.activate(name), activated.set()))
+        with file_lock('cocktails.json'):
+            with open('cocktails.json') as f:
+                cocktails = json.load(f)
+            thread.start()
+            assert not activated.wait(0.2)
+            cocktails['cocktails'][0]['favorite'] = True
+            atomic_write_json('cocktails.json', cocktails)
+        thread.join(timeout=5)
+        assert menus.active() == name
+        with open('cocktails.json') as f:
+            assert json.load(f) == {'cocktails': [{'normal_name': 'Daiquiri'}]}
+        with open(os.path.join('menus', original, 'cocktails.json')) as f:
+            assert json.load(f) == {'cocktails': [{'normal_name': 'Gin Fizz', 'favorite': True}]}
+
+    def test_catalog_sees_switch(self, tmp_path, monkeypatch):
+        """Test the catalog reloads when the active menu changes"""
+        menus = self.get_menus(tmp_path, monkeypatch)
+        catalog = CocktailCatalog('cocktails.json', 'drink_logos')
+        catalog.refresh()
+        menus.activate(self.create_menu(menus, 'Daiquiri'))
+        assert catalog.refresh()
+        assert [cocktail['normal_name'] for cocktail in catalog.valid] == ['Daiquiri']
+
+    def test_prune(self, tmp_path, monkeypatch):
+        """Test only the newest inactive menus are kept"""
+        menus = self.get_menus(tmp_path, monkeypatch)
+        names = [self.create_menu(menus, drink) for drink in ('Daiquiri', 'Mojito', 'Negroni')]
+        menus.activate(names[-1])
+        assert len(os.listdir('menus')) == menus.keep + 1
+        assert menus.active() in os.listdir('menus')
@@ -120,3 +120,48 @@ class TestSettings:
         """Test that setting an invalid value for USE_GPT_TRANSPARENCY fails silently and sets the value to 0"""
         self.get_settings(USE_GPT_TRANSPARENCY='none')
         assert self.settings.USE_GPT_TRANSPARENCY == False
+
+    def get_registry(self, path):
+        """Get a settings registry backed by the given file, starting from the current settings"""
+        values = {name: getattr(self.settings, name) for name in self.settings.settings}
+        return self.settings.SettingsRegistry(str(path), self.settings.settings, values)
+
+    def test_registry_poll(self, tmp_path):
+        """Test that the registry reloads a changed settings file and notifies subscribers"""
+        self.get_settings(OZ_COEFFICIENT=10, INVERT_PUMP_PINS='true')
+        settings_file = tmp_path / '.env'
+        settings_file.write_text('OZ_COEFFICIENT=10\n')
+        registry = self.get_registry(settings_file)
+        changes = []
+        registry.subscribe(changes.append)
+
+        assert registry.poll() == {}
+        settings_file.write_text('OZ_COEFFICIENT=12.5\nINVERT_PUMP_PINS=false\nPUMP_CONCURRENCY=none\n')
+        assert registry.poll() == {'OZ_COEFFICIENT': 12.5, 'INVERT_PUMP_PINS': False}
+        assert changes == [{'OZ_COEFFICIENT': 12.5, 'INVERT_PUMP_PINS': False}]
+        assert registry.OZ_COEFFICIENT == 12.5
+        assert registry.PUMP_CONCURRENCY == 3
+        # Unchanged file is not re-read
+        assert registry.poll() == {}
+
+    def test_registry_set(self, tmp_path):
+        """Test that setting a value persists it and only notifies on real changes"""
+        self.get_settings(OZ_COEFFICIENT=10, INVERT_PUMP_PINS='true')
+        settings_file = tmp_path / '.env'
+        settings_file.write_text('')
+        registry = self.get_registry(settings_file)
+        namespace = {}
+        registry.namespace = namespace
+        changes = []
+        registry.subscribe(changes.append)
+
+        registry.set('OZ_COEFFICIENT', 9.5, persist=False)
+        assert settings_file.read_text() == ''
+        registry.set('OZ_COEFFICIENT', 9.5)
+        registry.set('INVERT_PUMP_PINS', False)
+        assert changes == [{'OZ_COEFFICIENT': 9.5}, {'INVERT_PUMP_PINS': False}]
+        assert namespace == {'OZ_COEFFICIENT': 9.5, 'INVERT_PUMP_PINS': False}
+        assert 'OZ_COEFFICIENT=9.5' in settings_file.read_text()
+        assert 'INVERT_PUMP_PINS=false' in settings_file.read_text()
+        # Our own writes are not reported again by the next poll
+        assert registry.poll() == {}
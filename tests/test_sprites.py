@@ -0,0 +1,39 @@
+import gc
+import os
+import sys
+
+import pygame
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sprites import SpriteCache
+
+
+class TestSpriteCache:
+    def test_rotations_rounded_to_step(self):
+        """Test angles within the same step share one frame, made once"""
+        cache = SpriteCache(angle_step=5)
+        surface = pygame.Surface((10, 20))
+        assert cache.rotated(surface, 91) is cache.rotated(surface, 89)
+        assert cache.rotated(surface, -270) is cache.rotated(surface, 90)
+        assert cache.rotated(surface, 90).get_size() == (20, 10)
+        assert (cache.hits, cache.misses) == (4, 1)
+
+    def test_warm_and_scaled(self):
+        """Test warming makes every rotation up front and scaled copies are kept per size"""
+        cache = SpriteCache(angle_step=5)
+        surface = pygame.Surface((10, 10))
+        cache.warm(surface)
+        assert cache.stats()['frames'] == 72
+        assert cache.scaled(surface, (20.7, 20.2)).get_size() == (20, 20)
+        assert cache.scaled(surface, (20, 20)) is cache.scaled(surface, (20.5, 20.5))
+
+    def test_frames_limited_and_released(self):
+        """Test at most max_frames are kept per surface, and none once the surface is gone"""
+        cache = SpriteCache(angle_step=5, max_frames=10)
+        surface = pygame.Surface((10, 10))
+        cache.warm(surface)
+        assert cache.stats()['frames'] == 10
+        del surface
+        gc.collect()
+        assert cache.stats()['surfaces'] == 0
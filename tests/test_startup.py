@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules the kiosk must not load until they are actually needed
+HEAVY_MODULES = ['rembg', 'onnxruntime', 'openai', 'qrcode', 'PIL', 'streamlit']
+
+# Budgets for importing the kiosk, with headroom over a desktop run. Override on slower machines.
+IMPORT_TIME_BUDGET = float(os.getenv('KIOSK_IMPORT_TIME_BUDGET', '2.0'))
+RSS_BUDGET_MB = float(os.getenv('KIOSK_RSS_BUDGET_MB', '120'))
+
+PROBE = f'''
+import json, resource, sys, time
+start = time.perf_counter()
+import interface
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'elapsed': elapsed,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+'''
+
+
+def probe_kiosk_import():
+    """Import the kiosk in a fresh interpreter and report what it cost"""
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', FULL_SCREEN='false', LOG_FOLDER='')
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestStartup:
+    def test_kiosk_import_budget(self):
+        """Test that importing the kiosk stays light: no heavy dependencies, bounded time and memory"""
+        report = probe_kiosk_import()
+        assert report['heavy'] == [], f'Kiosk startup imported heavy modules: {report["heavy"]}'
+        assert report['elapsed'] < IMPORT_TIME_BUDGET, f'Kiosk import took {report["elapsed"]:.2f}s'
+        assert report['rss_mb'] < RSS_BUDGET_MB, f'Kiosk import peaked at {report["rss_mb"]:.0f} MB'
+
+
+SIGTERM_PROBE = '''
+import signal, time
+import helpers, interface
+signal.signal(signal.SIGTERM, interface.handle_sigterm)
+helpers.favorite_writer.delay = helpers.favorite_writer.max_delay = 60
+helpers.favorite_writer.submit('Gin Fizz', True)
+print('ready', flush=True)
+time.sleep(30)
+'''
+
+
+class TestShutdown:
+    def test_sigterm_writes_pending_favorites(self, tmp_path):
+        """Test a favorite still waiting to be written lands when the supervisor stops the kiosk"""
+        cocktails_file = tmp_path / 'cocktails.json'
+        cocktails_file.write_text(json.dumps({'cocktails': [{'normal_name': 'Daiquiri'}, {'normal_name': 'Gin Fizz'}]}))
+        env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', FULL_SCREEN='false', LOG_FOLDER='',
+                   COCKTAILS_FILE=str(cocktails_file), COCKTAILS_DB='', PYGAME_HIDE_SUPPORT_PROMPT='1')
+        process = subprocess.Popen([sys.executable, '-c', SIGTERM_PROBE], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+        try:
+            assert process.stdout.readline().strip() == 'ready'
+            process.terminate()
+            assert process.wait(timeout=10) == 0
+        finally:
+            process.kill()
+        cocktails = json.loads(cocktails_file.read_text())['cocktails']
+        assert cocktails[0] == {'normal_name': 'Gin Fizz', 'favorite': True}
+
+
+MAINTENANCE_PROBE = '''
+import json, threading, time
+import controller, interface, supervisor
+
+class Kiosk:
+    started_wall_time = 0
+
+check = supervisor.heartbeat_check(interface.HEARTBEAT_FILE, max_age=1)
+done = threading.Event()
+results = []
+def sample():
+    # Past the heartbeat's max age from the start, checked a few times a second until priming ends
+    done.wait(1.5)
+    while not done.wait(0.2):
+        results.append(check(Kiosk))
+
+sampler = threading.Thread(target=sample)
+sampler.start()
+controller.MOTORS = controller.MOTORS[:2]
+# Drawn under the overlay, as the kiosk does once it is running
+interface.add_layer((0, 0, 0), function=interface.screen.fill, key='background', z=interface.Z_BACKGROUND, static=True)
+try:
+    interface.run_maintenance(controller.prime_pumps, duration=2)
+finally:
+    done.set()
+    sampler.join()
+print(json.dumps(results))
+'''
+
+
+class TestMaintenance:
+    def test_priming_keeps_heartbeat(self, tmp_path):
+        """Test priming the pumps, which takes longer than the heartbeat may be stale, doesn't fail the health check"""
+        env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', FULL_SCREEN='false', LOG_FOLDER='',
+                   HEARTBEAT_FILE=str(tmp_path / 'heartbeat'), PYGAME_HIDE_SUPPORT_PROMPT='1')
+        result = subprocess.run([sys.executable, '-c', MAINTENANCE_PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        results = json.loads(result.stdout.strip().splitlines()[-1])
+        assert len(results) > 5 and all(results), results
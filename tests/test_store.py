@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import helpers
+import settings
+from store import CocktailStore
+
+
+COCKTAILS = [
+    {'normal_name': 'Gin Fizz', 'fun_name': 'Fizzy', 'ingredients': {'Gin': '2 oz', 'Soda': '4 oz'}},
+    {'normal_name': 'Daiquiri', 'ingredients': {'Rum': '2 oz', 'Lime': '1 oz'}, 'favorite': True},
+    {'normal_name': 'Mojito', 'ingredients': {'Rum': '2 oz'}, 'favorite': False, 'glass': 'highball'},
+]
+
+
+class TestStore:
+    def get_store(self, tmp_path):
+        store = CocktailStore(str(tmp_path / 'tipsy.db'))
+        store.save_cocktails({'cocktails': COCKTAILS})
+        return store
+
+    def test_round_trip(self, tmp_path):
+        """Test that cocktails load back in file order with favorites first"""
+        store = self.get_store(tmp_path)
+        assert store.load_cocktails() == {'cocktails': [COCKTAILS[1], COCKTAILS[0], COCKTAILS[2]]}
+
+    def test_append_and_replace(self, tmp_path):
+        """Test appending skips duplicate names and replacing drops everything else"""
+        store = self.get_store(tmp_path)
+        assert store.save_cocktails({'cocktails': [{'normal_name': 'Gin Fizz'}, {'normal_name': 'Negroni'}]}) == 1
+        names = [cocktail['normal_name'] for cocktail in store.load_cocktails()['cocktails']]
+        assert names == ['Daiquiri', 'Gin Fizz', 'Mojito', 'Negroni']
+
+        store.save_cocktails({'cocktails': [{'normal_name': 'Negroni'}]}, append=False)
+        assert store.load_cocktails() == {'cocktails': [{'normal_name': 'Negroni'}]}
+
+    def test_set_favorite(self, tmp_path):
+        """Test favoriting moves a cocktail ahead without touching the others"""
+        store = self.get_store(tmp_path)
+        signature = store.signature()
+        store.set_favorite('Mojito', True)
+        assert store.signature() != signature
+        cocktails = store.load_cocktails()['cocktails']
+        assert [cocktail['normal_name'] for cocktail in cocktails] == ['Daiquiri', 'Mojito', 'Gin Fizz']
+        assert cocktails[1]['favorite'] is True
+        assert 'favorite' not in cocktails[2]
+
+    def test_update_ingredients(self, tmp_path):
+        """Test replacing one recipe's ingredients keeps their order"""
+        store = self.get_store(tmp_path)
+        store.update_ingredients('Gin Fizz', {'Soda': '3 oz', 'Gin': '1.5 oz'})
+        gin_fizz = store.load_cocktails()['cocktails'][1]
+        assert list(gin_fizz['ingredients'].items()) == [('Soda', '3 oz'), ('Gin', '1.5 oz')]
+
+    def test_ingredient_lookup_uses_index(self, tmp_path):
+        """Test ingredient lookups are case-insensitive and go through the ingredient index"""
+        store = self.get_store(tmp_path)
+        assert store.cocktails_with_ingredient('rum') == ['Daiquiri', 'Mojito']
+        plan = store.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT cocktail_id FROM ingredients WHERE name = ? COLLATE NOCASE', ('rum',)
+        ).fetchall()
+        assert any('ingredients_name' in row[-1] for row in plan)
+
+    def test_changes_from_other_connections(self, tmp_path):
+        """Test that a commit from another process changes the signature"""
+        store = self.get_store(tmp_path)
+        signature = store.signature()
+        CocktailStore(store.path).set_favorite('Gin Fizz', True)
+        assert store.signature() != signature
+
+
+class TestStoreHelpers:
+    def test_helpers_use_store(self, tmp_path, monkeypatch):
+        """Test that COCKTAILS_DB migrates the cocktails file and favorites go to the database"""
+        cocktails_file = tmp_path / 'cocktails.json'
+        cocktails_file.write_text(json.dumps({'cocktails': COCKTAILS}))
+        logo_folder = tmp_path / 'drink_logos'
+        logo_folder.mkdir()
+        for name in ('gin_fizz', 'daiquiri', 'mojito'):
+            (logo_folder / f'{name}.png').touch()
+        monkeypatch.setattr(settings, 'COCKTAILS_FILE', str(cocktails_file))
+        monkeypatch.setattr(settings, 'LOGO_FOLDER', str(logo_folder))
+        monkeypatch.setattr(settings, 'COCKTAILS_DB', str(tmp_path / 'tipsy.db'))
+        monkeypatch.setattr(helpers, 'store', None)
+
+        assert [cocktail['normal_name'] for cocktail in helpers.get_valid_cocktails()] == ['Daiquiri', 'Gin Fizz', 'Mojito']
+        assert helpers.favorite_cocktail(2) == 1
+        assert helpers.update_recipe('Gin Fizz', {'Gin': '1 oz'})
+        assert helpers.get_catalog().get('Gin Fizz')['ingredients'] == {'Gin': '1 oz'}
+        # The file is left alone once the database is in use
+        assert json.loads(cocktails_file.read_text()) == {'cocktails': COCKTAILS}
+        helpers.store.close()
+
+    def test_favorite_without_reload(self, tmp_path, monkeypatch):
+        """Test a favorite tap updates the catalog in place, while another connection's commit reloads it"""
+        cocktails_file = tmp_path / 'cocktails.json'
+        cocktails_file.write_text(json.dumps({'cocktails': COCKTAILS}))
+        logo_folder = tmp_path / 'drink_logos'
+        logo_folder.mkdir()
+        for name in ('gin_fizz', 'daiquiri', 'mojito'):
+            (logo_folder / f'{name}.png').touch()
+        monkeypatch.setattr(settings, 'COCKTAILS_FILE', str(cocktails_file))
+        monkeypatch.setattr(settings, 'LOGO_FOLDER', str(logo_folder))
+        monkeypatch.setattr(settings, 'COCKTAILS_DB', str(tmp_path / 'tipsy.db'))
+        monkeypatch.setattr(helpers, 'store', None)
+        helpers.get_valid_cocktails()
+        loads = []
+        real_load = CocktailStore.load_cocktails
+        monkeypatch.setattr(CocktailStore, 'load_cocktails', lambda self: loads.append(self) or real_load(self))
+
+        for index in (2, 1, 0, 1):
+            helpers.favorite_cocktail(index) if index != 0 else helpers.unfavorite_cocktail(index)
+            assert helpers.get_catalog().cocktails == real_load(helpers.store)['cocktails']
+        assert loads == []
+        CocktailStore(helpers.store.path).set_favorite('Mojito', False)
+        assert helpers.get_catalog().cocktails == real_load(helpers.store)['cocktails']
+        assert len(loads) == 1
+        helpers.store.close()
@@ -0,0 +1,113 @@
+import os
+import socket
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from supervisor import Component, Supervisor, heartbeat_check, port_check
+
+
+def python_command(code):
+    return [sys.executable, '-c', code]
+
+
+def wait_for_exit(component, timeout=10):
+    component.process.wait(timeout=timeout)
+
+
+class TestSupervisor:
+    def get_supervisor(self, tmp_path, *components, **kwargs):
+        return Supervisor(list(components), status_file=str(tmp_path / 'status.json'), **kwargs)
+
+    def test_restart_with_backoff(self, tmp_path):
+        """Test that a crashing component is restarted with growing backoff and its downtime recorded"""
+        component = Component('crasher', python_command('import sys; sys.exit(3)'))
+        supervisor = self.get_supervisor(tmp_path, component, min_backoff=1, max_backoff=3)
+        component.start(now=0)
+        wait_for_exit(component)
+
+        supervisor.check(now=10)
+        assert component.last_exit_code == 3
+        assert component.next_start == 11
+        supervisor.check(now=10.5)
+        assert component.restarts == 0
+        supervisor.check(now=11)
+        assert component.restarts == 1
+        assert component.downtime == 1
+        wait_for_exit(component)
+
+        supervisor.check(now=20)
+        assert component.next_start == 22
+        supervisor.check(now=22)
+        wait_for_exit(component)
+        supervisor.check(now=30)
+        # Backoff is capped
+        assert component.next_start == 33
+        assert component.status(now=31)['downtime'] == 4
+        assert component.status(now=31)['restarts'] == 2
+
+    def test_clean_exit_is_not_restarted(self, tmp_path):
+        """Test that a component exiting with code 0 is left stopped"""
+        component = Component('quitter', python_command('pass'))
+        supervisor = self.get_supervisor(tmp_path, component)
+        component.start(now=0)
+        wait_for_exit(component)
+        supervisor.check(now=1)
+        assert component.stopped
+        assert component.next_start is None
+
+    def test_unhealthy_component_is_restarted(self, tmp_path):
+        """Test that a hung component is stopped once it fails enough health checks"""
+        component = Component('hung', python_command('import time; time.sleep(60)'),
+                              health_check=lambda component: False, startup_grace=5, unhealthy_after=2)
+        supervisor = self.get_supervisor(tmp_path, component)
+        try:
+            component.start(now=0)
+            supervisor.check(now=1)
+            assert component.failed_checks == 0
+            supervisor.check(now=6)
+            assert component.running
+            supervisor.check(now=7)
+            assert not component.running
+            assert component.next_start == 8
+        finally:
+            component.stop()
+
+    def test_write_status(self, tmp_path):
+        """Test that the status file reports every component"""
+        import json
+        component = Component('crasher', python_command('import sys; sys.exit(1)'))
+        supervisor = self.get_supervisor(tmp_path, component)
+        component.start(now=0)
+        wait_for_exit(component)
+        supervisor.check(now=1)
+        supervisor.write_status(now=2)
+        with open(tmp_path / 'status.json') as f:
+            status = json.load(f)
+        assert status['crasher']['running'] == False
+        assert status['crasher']['last_exit_code'] == 1
+        assert status['crasher']['downtime'] == 1
+
+    def test_heartbeat_check(self, tmp_path):
+        """Test that the heartbeat check only passes for a fresh heartbeat from the current run"""
+        heartbeat = tmp_path / 'heartbeat'
+        component = Component('interface', [])
+        component.started_wall_time = time.time() - 1
+        check = heartbeat_check(str(heartbeat), max_age=30)
+        assert not check(component)
+        heartbeat.touch()
+        assert check(component)
+        os.utime(heartbeat, (time.time() - 60, time.time() - 60))
+        assert not check(component)
+
+    def test_port_check(self):
+        """Test that the port check passes only while something is listening"""
+        server = socket.socket()
+        server.bind(('localhost', 0))
+        server.listen()
+        port = server.getsockname()[1]
+        check = port_check('localhost', port)
+        assert check(None)
+        server.close()
+        assert not check(None)